@@ -49,6 +49,13 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = Field(default="redis://localhost:6379")
 
+    # Concurrency (por worker de uvicorn): executor por defecto para run_in_executor / to_thread
+    THREAD_POOL_SIZE: int = 64
+
+    # EU AI Act audit trail (write-behind): filas por INSERT y espera máxima para llenar un lote
+    AUDIT_TRAIL_BUFFER_BATCH_SIZE: int = 100
+    AUDIT_TRAIL_BUFFER_FLUSH_INTERVAL: float = 0.05
+
     # AI Providers
     OPENAI_API_KEY: str = Field(default="")
     ANTHROPIC_API_KEY: str = Field(default="")
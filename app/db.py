@@ -7,8 +7,10 @@ import uuid
 from datetime import datetime
 from decimal import Decimal
 
+import httpx
 import redis.asyncio as redis
-from supabase import Client, create_client
+from supabase import AsyncClient, Client, acreate_client, create_client
+from supabase.lib.client_options import AsyncClientOptions, SyncClientOptions
 
 from app.config import settings
 from app.utils import fast_json as json
@@ -17,9 +19,16 @@ logger = logging.getLogger("agentshield.db")
 
 # Lazy-loaded clients (don't create at import time for tests)
 _supabase_client: Client | None = None
+_async_supabase_client: AsyncClient | None = None
 _redis_client = None
 
 
+# Pool HTTP compartido por PostgREST/Auth/Storage: keep-alive + HTTP/2 (sin handshake TCP/TLS por query).
+# Sin él, cada sub-cliente abre su propio pool y se recrea al refrescar el token.
+SUPABASE_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=40, keepalive_expiry=30.0)
+SUPABASE_HTTP_TIMEOUT = 10.0
+
+
 def get_supabase() -> Client:
     """Lazy-load Supabase client."""
     global _supabase_client
@@ -30,24 +39,80 @@ def get_supabase() -> Client:
         if not url or not key:
             raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set in Environment.")
 
-        _supabase_client = create_client(url, key)
+        http_client = httpx.Client(
+            http2=True, limits=SUPABASE_HTTP_LIMITS, timeout=SUPABASE_HTTP_TIMEOUT, follow_redirects=True
+        )
+        _supabase_client = create_client(url, key, options=SyncClientOptions(httpx_client=http_client))
     return _supabase_client
 
 
+async def get_async_supabase() -> AsyncClient:
+    """
+    Lazy-load del cliente Supabase nativo async (httpx.AsyncClient).
+    No ocupa un hilo del ThreadPool durante el round-trip, a diferencia de run_in_executor.
+    """
+    global _async_supabase_client
+    if _async_supabase_client is None:
+        url = settings.SUPABASE_URL
+        key = settings.SUPABASE_SERVICE_KEY
+
+        if not url or not key:
+            raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set in Environment.")
+
+        http_client = httpx.AsyncClient(
+            http2=True, limits=SUPABASE_HTTP_LIMITS, timeout=SUPABASE_HTTP_TIMEOUT, follow_redirects=True
+        )
+        _async_supabase_client = await acreate_client(
+            url, key, options=AsyncClientOptions(httpx_client=http_client)
+        )
+    return _async_supabase_client
+
+
+async def close_supabase():
+    """Cierra los pools HTTP de Supabase (lifespan shutdown)."""
+    global _supabase_client, _async_supabase_client
+    if _async_supabase_client is not None:
+        await _async_supabase_client.options.httpx_client.aclose()
+        _async_supabase_client = None
+    if _supabase_client is not None:
+        _supabase_client.options.httpx_client.close()
+        _supabase_client = None
+
+
+# Pool compartido: con una sola conexión, cada await se serializa detrás del anterior.
+REDIS_MAX_CONNECTIONS = 64
+
+
 def get_redis():
-    """Lazy-load Redis client."""
+    """Lazy-load Redis client backed by a dedicated connection pool."""
     global _redis_client
     if _redis_client is None:
-        _redis_client = redis.from_url(
+        # decode_responses se mantiene (los consumidores esperan str); INCR devuelve int igualmente.
+        # retry_on_timeout=False: en el hot path preferimos fallar rápido (fail-open) a reintentar.
+        pool = redis.ConnectionPool.from_url(
             settings.REDIS_URL,
+            max_connections=REDIS_MAX_CONNECTIONS,
             decode_responses=True,
             socket_timeout=5.0,
             socket_connect_timeout=5.0,
-            retry_on_timeout=True,
+            socket_keepalive=True,
+            health_check_interval=30,
+            retry_on_timeout=False,
         )
+        _redis_client = redis.Redis(connection_pool=pool)
     return _redis_client
 
 
+async def warm_redis_pool(connections: int = 8):
+    """Abre conexiones del pool en el arranque para evitar el handshake en la primera request."""
+    try:
+        client = get_redis()
+        await asyncio.gather(*(client.ping() for _ in range(connections)))
+        logger.info(f"✅ Redis pool warmed ({connections} connections).")
+    except Exception as e:
+        logger.warning(f"Redis pool warmup failed: {e}")
+
+
 # Backwards-compatible aliases (lazy proxies)
 class _LazyClient:
     """Proxy that lazily calls get_* functions."""
@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
 from fastapi import Depends, FastAPI, HTTPException, Request
@@ -9,7 +10,7 @@ from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse, ORJSONResponse
 
 from app.config import settings
-from app.db import recover_pending_charges, redis_client, supabase
+from app.db import close_supabase, recover_pending_charges, redis_client, supabase, warm_redis_pool
 from app.middleware.auth import global_security_guard
 from app.middleware.security import security_guard_middleware
 from app.services.cache import init_semantic_cache_index
@@ -26,7 +27,13 @@ logger = logging.getLogger("agentshield")
 async def lifespan(app: FastAPI):
     logger.info("🚀 AgentShield Core Starting...")
 
+    # 0. Executor explícito: las llamadas síncronas a Supabase son I/O y no deben
+    #    competir por los min(32, cpu+4) hilos del executor por defecto de CPython
+    executor = ThreadPoolExecutor(max_workers=settings.THREAD_POOL_SIZE, thread_name_prefix="supabase-io")
+    asyncio.get_running_loop().set_default_executor(executor)
+
     # 1. Recovery & Initializations
+    asyncio.create_task(warm_redis_pool())
     asyncio.create_task(recover_pending_charges())
     asyncio.create_task(init_semantic_cache_index())
     asyncio.create_task(update_market_rules())
@@ -48,8 +55,25 @@ async def lifespan(app: FastAPI):
             logger.warning(f"⚠️ Warmup Partial Fail: {e}")
 
     asyncio.create_task(warmup_models())
+
+    # audit_chain: el import registra su buffer para start_audit_buffers()
+    from app.routers import admin_roles
+    from app.routers.admin_chat import preload_rate_limit_script
+    from app.services import audit_chain, catalog_cache, role_cache
+    from app.services.audit_buffer import start_audit_buffers, stop_audit_buffers
+    from app.services.carbon import carbon_governor
+
+    asyncio.create_task(preload_rate_limit_script())
+    asyncio.create_task(admin_roles.warm_up())
+    asyncio.create_task(carbon_governor.run_refresh_loop())
+    asyncio.create_task(catalog_cache.run_invalidation_listener())
+    asyncio.create_task(role_cache.run_invalidation_listener())
+    start_audit_buffers()
     yield
     logger.info("🛑 AgentShield Core Shutting Down...")
+    await stop_audit_buffers()
+    await close_supabase()
+    executor.shutdown(wait=False)
 
 
 app = FastAPI(
@@ -10,19 +10,24 @@ from app.services.event_bus import event_bus
 
 logger = logging.getLogger("agentshield.auth")
 
+# Tupla para resolver la whitelist con un único str.startswith (en C)
+AUTH_WHITELIST_PREFIXES = tuple(settings.AUTH_WHITELIST)
+
 
 async def global_security_guard(request: Request):
-    # 0. RECOLECCIÓN DE TELEMETRÍA
-    path = request.url.path
-    trace_id = getattr(request.state, "trace_id", "TRC-UNKNOWN")
-    client_ip = get_real_ip_address(request)
+    # 0. Fast path: preflight CORS y whitelist se resuelven desde el scope ASGI,
+    # antes de construir URL, leer cabeceras o tocar Redis.
+    scope = request.scope
+    if scope["method"] == "OPTIONS":
+        return
 
     # 1. Whitelist con soporte de prefijos (para /docs/, /health/, etc.)
-    if any(path.startswith(prefix) for prefix in settings.AUTH_WHITELIST):
+    if scope["path"].startswith(AUTH_WHITELIST_PREFIXES):
         return
 
-    if request.method == "OPTIONS":
-        return
+    # RECOLECCIÓN DE TELEMETRÍA
+    trace_id = getattr(request.state, "trace_id", "TRC-UNKNOWN")
+    client_ip = get_real_ip_address(request)
 
     # 2. Protección Brute Force (Pre-auth IP Check)
     block_key = f"auth_block:{client_ip}"
@@ -30,7 +35,7 @@ async def global_security_guard(request: Request):
     try:
         if await redis_client.get(block_key):
             logger.warning(
-                f"🛑 [Block] Brute Force attempt blocked from {client_ip} | Trace: {trace_id}"
+                "🛑 [Block] Brute Force attempt blocked from %s | Trace: %s", client_ip, trace_id
             )
 
             # SIEM ALERT (Info level since it's already blocked)
@@ -48,7 +53,7 @@ async def global_security_guard(request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"⚠️ [Auth] Redis error in Brute Force check: {e} | Trace: {trace_id}")
+        logger.error("⚠️ [Auth] Redis error in Brute Force check: %s | Trace: %s", e, trace_id)
         # Degradamos suavemente: Permitimos continuar si Redis falla (Disponibilidad > Brute Force)
 
     # 3. Exigir credenciales e Inyectar Estado
@@ -82,7 +87,10 @@ async def global_security_guard(request: Request):
             if fails >= settings.AUTH_BRUTE_FORCE_LIMIT:
                 await redis_client.setex(block_key, settings.AUTH_BRUTE_FORCE_WINDOW, "blocked")
                 logger.error(
-                    f"🚨 [Auth] IP {client_ip} reached fail limit ({fails}). Blocking. | Trace: {trace_id}"
+                    "🚨 [Auth] IP %s reached fail limit (%s). Blocking. | Trace: %s",
+                    client_ip,
+                    fails,
+                    trace_id,
                 )
                 # SIEM ALERT (Critical)
                 await event_bus.publish(
@@ -93,6 +101,6 @@ async def global_security_guard(request: Request):
                     trace_id=trace_id,
                 )
         except Exception as re:
-            logger.error(f"⚠️ Could not update Brute Force counter: {re} | Trace: {trace_id}")
+            logger.error("⚠️ Could not update Brute Force counter: %s | Trace: %s", re, trace_id)
 
         raise e
@@ -1,64 +1,105 @@
-
 import time
 import logging
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response, JSONResponse
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.db import redis_client
 
 logger = logging.getLogger("agentshield.middleware")
 
-class SecurityMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+# Middlewares ASGI puros: BaseHTTPMiddleware añade un TaskGroup por request y
+# re-emite el body a través de un memory stream. Aquí solo tocamos el mensaje
+# http.response.start para inyectar cabeceras.
+
+# Rutas resueltas antes de cualquier trabajo de middleware (sin construir Request).
+# OPTIONS (preflight CORS) y /health no necesitan métricas ni rate limit; las cabeceras
+# de seguridad sí van en todas las respuestas.
+FAST_PATHS = frozenset({"/health"})
+
+
+def is_fast_path(scope: Scope) -> bool:
+    return scope["method"] == "OPTIONS" or scope["path"] in FAST_PATHS
+
+
+SECURITY_HEADERS = (
+    ("X-Frame-Options", "DENY"),
+    ("X-Content-Type-Options", "nosniff"),
+    ("Strict-Transport-Security", "max-age=31536000; includeSubDomains"),
+)
+
+
+class SecurityMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Fast path: cabeceras sí, pero sin cronometrar ni registrar requests lentas
+        timed = not is_fast_path(scope)
         start_time = time.time()
-        
+
         # 1. IP Blocklist Check (Basic)
-        client_ip = request.client.host
-        # In prod: if await redis_client.sismember("blocked_ips", client_ip): return 403
-        
+        # In prod: if await redis_client.sismember("blocked_ips", scope["client"][0]): return 403
+
         # 2. Add Security Headers
-        response = await call_next(request)
-        
-        process_time = time.time() - start_time
-        response.headers["X-Process-Time"] = str(process_time)
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if timed:
+                    headers["X-Process-Time"] = str(time.time() - start_time)
+                for name, value in SECURITY_HEADERS:
+                    headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+        if not timed:
+            return
+
         # 3. Simple Audit Log for Slow Requests
+        process_time = time.time() - start_time
         if process_time > 2.0:
-            logger.warning(f"🐢 Slow Request: {request.method} {request.url.path} took {process_time:.2f}s")
-            
-        return response
+            logger.warning("🐢 Slow Request: %s %s took %.2fs", scope["method"], scope["path"], process_time)
+
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+class RateLimitMiddleware:
     """
     Global Rate Limiter backed by Redis.
     Applies strict limits to unauthenticated endpoints.
     Authenticated endpoints have their own quota system in Pipeline.
     """
-    async def dispatch(self, request: Request, call_next):
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         # Skip for health checks or static
-        if request.url.path == "/health" or request.method == "OPTIONS":
-             return await call_next(request)
-             
-        client_ip = request.client.host
+        if scope["type"] != "http" or is_fast_path(scope):
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
         key = f"rl:global:{client_ip}"
-        
+
         try:
-             # Max 100 requests per minute per IP for public endpoints
-             current = await redis_client.incr(key)
-             if current == 1:
-                 await redis_client.expire(key, 60)
-                 
-             if current > 100:
-                 return JSONResponse(
-                     status_code=429, 
-                     content={"detail": "Too Many Requests (Global Shield)"}
-                 )
+            # Max 100 requests per minute per IP for public endpoints
+            current = await redis_client.incr(key)
+            if current == 1:
+                await redis_client.expire(key, 60)
+
+            if current > 100:
+                response = JSONResponse(
+                    status_code=429,
+                    content={"detail": "Too Many Requests (Global Shield)"}
+                )
+                await response(scope, receive, send)
+                return
         except Exception:
             # Fail open if Redis is down
             pass
-            
-        return await call_next(request)
+
+        await self.app(scope, receive, send)
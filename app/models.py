@@ -1,9 +1,9 @@
 # app/models.py
 from datetime import datetime
 from enum import Enum
-from typing import Dict, Optional
+from typing import Any, Dict, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class TenantRegion(str, Enum):
@@ -11,6 +11,11 @@ class TenantRegion(str, Enum):
     US = "us"
 
 
+# Tipo de wire: pydantic-core valida un Literal con un lookup directo (sin coerción a Enum).
+# Usar TenantRegion(value) solo donde se necesite el Enum.
+Region = Literal["eu", "us"]
+
+
 class AIUseCase(str, Enum):
     # Categorías basadas en EU AI Act Annex III
     GENERAL_PURPOSE = "general_purpose"  # Chatbots, Coding (Riesgo Mínimo)
@@ -21,6 +26,17 @@ class AIUseCase(str, Enum):
     LEGAL_ASSIST = "legal_assist"  # Justicia (Alto Riesgo)
 
 
+# Tipo de wire para AIUseCase (mismos valores). Usar AIUseCase(value) solo donde se necesite el Enum.
+UseCase = Literal[
+    "general_purpose",
+    "hr_recruitment",
+    "credit_scoring",
+    "medical_advice",
+    "biometric_id",
+    "legal_assist",
+]
+
+
 class FunctionConfig(BaseModel):
     """
     Configuración dinámica por función (Function-ID).
@@ -54,6 +70,9 @@ class SovereignConfig(BaseModel):
 
 
 class AuthorizeRequest(BaseModel):
+    # Hot path de /v1/authorize: sin dict de extras y objetos inmutables (hash cacheable)
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     actor_id: str = Field(..., description="ID del agente o usuario que ejecuta")
     cost_center_id: str = Field(..., description="ID del proyecto o centro de costes")
     # MODIFICAR: Hacer provider/model opcionales si se usa function_id
@@ -66,12 +85,13 @@ class AuthorizeRequest(BaseModel):
     )
 
     # NUEVO CAMPO: Obligatorio para compliance
-    use_case: AIUseCase = Field(
-        default=AIUseCase.GENERAL_PURPOSE, description="Categoría legal del uso según EU AI Act"
+    use_case: UseCase = Field(
+        default="general_purpose", description="Categoría legal del uso según EU AI Act"
     )
     max_amount: float = Field(..., gt=0, description="Límite de gasto autorizado")
     currency: str = Field("EUR", description="Moneda del límite")
-    metadata: dict | None = Field(default_factory=dict)
+    # None == sin metadata: evitamos instanciar un dict vacío por request
+    metadata: dict[str, Any] | None = None
 
     # DATOS PARA ESTIMACIÓN INTELIGENTE
     est_input_tokens: int = Field(0, description="Deprecated: Use input_unit_count")
@@ -83,6 +103,8 @@ class AuthorizeRequest(BaseModel):
 
 
 class AuthorizeResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     decision: str  # APPROVED, DENIED
     execution_mode: str = "ACTIVE"  # ACTIVE, SHADOW_SIMULATION
     aut_token: str | None = None
@@ -6,29 +6,60 @@ API endpoints for the "Semantic Policy Copilot" (Admin Chat).
 - **Semantic Policy Generation:** Converts natural language (e.g., "Block Junior Devs from using GPT-4") into structured JSON policies using `policy_copilot`.
 - **Pre-Flight Simulation:** Automatically calculates "Blast Radius" (how many past requests *would* have been blocked) to warn admins before applying rules.
 - **Conflict Detection:** Prevents creating duplicate or contradictory policies for the same role/tool scope.
+- **Streaming:** SSE variant emits the draft as it is generated and starts the simulation as soon as `tool_name` is known.
 - **Rate Limited:** Protects LLM resources with a Redis-backed token bucket (10 req/min/admin).
 
 **Security Constraints:**
-- **RBAC:** Strictly `admin`, `manager`, or `owner` only.
+- **RBAC:** Exact match against `ALLOWED_ROLES` (`admin`, `manager`, `owner`, `superadmin`, `tenant_admin`, `org_admin`); no substring matching.
 - **Audit Logging:** Every generated draft and created policy is logged to the immutable ledger.
 """
 import logging
 import asyncio
+import math
+import re
 import time
-from typing import Literal, Optional, Dict, Any
-from pydantic import BaseModel, Field
+from typing import Any, AsyncIterator, Dict, Literal, Optional
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 
-from fastapi import APIRouter, Body, Depends, HTTPException, BackgroundTasks, Request
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from postgrest.exceptions import APIError
 
-from app.db import supabase, redis_client
+from app.db import get_async_supabase, redis_client
+from app.services.audit_buffer import AuditLogBuffer
+from app.services.catalog_cache import resolve_dept_id, resolve_tool_id
 from app.services.identity import VerifiedIdentity, verify_identity_envelope
-from app.services.policy_copilot import generate_policy_json
+from app.services.policy_copilot import cached_generate, stream_policy_json
+from app.utils import fast_json
+from app.utils.tasks import fire
 
 logger = logging.getLogger("agentshield.admin_chat")
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 # Constantes de seguridad
-ALLOWED_ROLES = {"admin", "manager", "owner"}
+# Lista explícita (sin subcadenas: "not_admin" no debe colarse). Los roles propios del tenant
+# que administran el Copilot (p. ej. "org_admin") se declaran aquí.
+ALLOWED_ROLES = frozenset({"admin", "manager", "owner", "superadmin", "tenant_admin", "org_admin"})
+
+
+def _is_admin(identity: VerifiedIdentity) -> bool:
+    return (identity.role or "").lower() in ALLOWED_ROLES
+
+
+async def require_admin_identity(
+    identity: VerifiedIdentity = Depends(verify_identity_envelope),
+) -> VerifiedIdentity:
+    """RBAC compartido: corta con 403 antes de entrar al endpoint."""
+    if not _is_admin(identity):
+        logger.warning(f"⛔ Unauthorized Admin Access: {identity.email} tried to access Copilot.")
+        raise HTTPException(status_code=403, detail="Access Denied: Admin privileges required.")
+    # El tenant sale SOLO del envelope verificado (JWT/perfil): nunca de cabeceras del cliente
+    if not identity.tenant_id:
+        raise HTTPException(status_code=400, detail="Identity has no tenant association.")
+    return identity
+
+# PostgREST: la función RPC no existe (migración no aplicada)
+RPC_NOT_FOUND = "PGRST202"
 
 # --- Pydantic Data Models (Swagger Docs + Validation) ---
 class CopilotPrompt(BaseModel):
@@ -43,21 +74,99 @@ class PolicyDraft(BaseModel):
     argument_rules: Dict[str, Any] = Field(default_factory=dict)
     explanation: Optional[str] = None
 
+# Validador compilado una sola vez (pydantic-core) para los borradores que produce el LLM.
+_DRAFT_ADAPTER = TypeAdapter(PolicyDraft)
+
+
+def _validate_draft(draft: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        return _DRAFT_ADAPTER.validate_python(draft).model_dump()
+    except ValidationError as e:
+        logger.warning(f"⚠️ Copilot produced an invalid draft: {e.error_count()} errors")
+        raise HTTPException(
+            status_code=422,
+            detail={"message": "The Copilot produced an invalid policy draft. Please rephrase.", "errors": e.errors(include_url=False, include_context=False)},
+        )
+
 # --- Rate Limiter ---
+# Token bucket atómico en Redis: refill + consumo + TTL en un solo EVALSHA (1 RTT).
+# KEYS[1] = bucket | ARGV = capacity, refill_per_ms, now_ms, cost
+# Devuelve {allowed, retry_after_ms}
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'last_refill')
+local tokens = tonumber(state[1]) or capacity
+local last = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - last) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = math.ceil((cost - tokens) / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'last_refill', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1000)
+return {allowed, retry_after}
+"""
+
+COPILOT_BUCKET_CAPACITY = 10
+COPILOT_REFILL_PER_MS = COPILOT_BUCKET_CAPACITY / 60_000  # 10 peticiones/minuto
+
+_token_bucket_script = None
+
+
+def _get_token_bucket_script():
+    """Registra el script una sola vez (redis-py usa EVALSHA y recarga si hay NOSCRIPT)."""
+    global _token_bucket_script
+    if _token_bucket_script is None:
+        _token_bucket_script = redis_client.register_script(TOKEN_BUCKET_LUA)
+    return _token_bucket_script
+
+
+async def preload_rate_limit_script():
+    """Carga el script en Redis al arrancar para que la primera petición ya use EVALSHA."""
+    try:
+        await redis_client.script_load(TOKEN_BUCKET_LUA)
+    except Exception as e:
+        logger.warning(f"Could not preload Copilot rate limit script: {e}")
+
+
 async def check_admin_rate_limit(identity: VerifiedIdentity):
-    """Límite simple: 10 peticiones/minuto por admin para evitar abuso de LLM."""
+    """Token bucket: 10 peticiones/minuto por admin para evitar abuso de LLM."""
     key = f"ratelimit:admin:{identity.user_id}:copilot"
-    current = await redis_client.incr(key)
-    if current == 1:
-        await redis_client.expire(key, 60)
-    
-    if current > 10:
-        raise HTTPException(status_code=429, detail="Rate limit exceeded for Copilot. Please wait.")
+    now_ms = int(time.time() * 1000)
+    allowed, retry_after_ms = await _get_token_bucket_script()(
+        keys=[key], args=[COPILOT_BUCKET_CAPACITY, COPILOT_REFILL_PER_MS, now_ms, 1]
+    )
+
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded for Copilot. Please wait.",
+            headers={"Retry-After": str(max(1, math.ceil(int(retry_after_ms) / 1000)))},
+        )
+
 
-@router.post("/v1/admin/copilot/policy", response_model=Dict[str, Any])
+async def enforce_copilot_rate_limit(identity: VerifiedIdentity = Depends(require_admin_identity)):
+    """Dependencia: la identidad se resuelve una sola vez por request (caché de FastAPI)."""
+    await check_admin_rate_limit(identity)
+
+@router.post(
+    "/v1/admin/copilot/policy",
+    dependencies=[Depends(enforce_copilot_rate_limit)],
+)
 async def copilot_create_policy(
     prompt: CopilotPrompt,
-    identity: VerifiedIdentity = Depends(verify_identity_envelope),
+    response: Response,
+    identity: VerifiedIdentity = Depends(require_admin_identity),
 ):
     """
     **Semantic Policy Copilot.**
@@ -65,36 +174,36 @@ async def copilot_create_policy(
     Generates a structured policy draft from natural language intent using an LLM.
     
     **God Tier Feature:**
-    - **Simulation Mode:** Uses `simulate_policy_impact` to run a "Dry Run" against the last 1000 requests in basic logs.
+    - **Simulation Mode:** Uses `simulate_policy_impact` to run a "Dry Run" against the last 24h of tool mentions (hourly rollup).
     - **Rate Limiting:** Enforces strict quotas via Redis to prevent LLM abuse.
+    - **Draft Cache:** Identical prompts (per tenant) are served from Redis for 24h or until the tool catalog changes (`X-Cache: HIT/MISS`). Only schema-valid drafts are cached.
     
     Args:
         prompt (CopilotPrompt): User's natural language intention (e.g., "Stop marketing from using code-interpreter").
+        response (Response): Used to expose the `X-Cache` header.
         identity (VerifiedIdentity): Authenticated Admin user.
 
     Returns:
         dict: A structured JSON "draft" ready for review + Impact Assessment Score.
     """
-    # 1. SEGURIDAD: Validación CRÍTICA de Roles
-    user_role = (identity.role or "").lower()
-    if user_role not in ALLOWED_ROLES and "admin" not in user_role:
-        logger.warning(f"⛔ Unauthorized Admin Access: {identity.email} tried to access Copilot.")
-        raise HTTPException(status_code=403, detail="Access Denied: Admin privileges required.")
-
-    # 2. Rate Limiting
-    await check_admin_rate_limit(identity)
-
+    # 1-2. SEGURIDAD (RBAC) + Rate Limiting: resueltos en las dependencias
     logger.info(f"🤖 Copilot (Async) creating policy for {identity.email}...")
 
-    # 3. PERFORMANCE: llamada asíncrona real
-    policy_draft = await generate_policy_json(identity.tenant_id, prompt.text)
+    # 3. PERFORMANCE: caché de borradores en Redis -> singleflight -> LLM
+    # Anti-Hallucination: el borrador debe cumplir el schema antes de mostrarlo o de cachearse
+    policy_draft, cache_hit = await cached_generate(identity.tenant_id, prompt.text, validate=_validate_draft)
+    response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
 
     # 4. SIMULATION MODE (Revolutionary Feature)
     # Analizamos impacto REAL antes de sugerir
     impact_count = 0
     if "tool_name" in policy_draft:
         impact_count = await simulate_policy_impact(identity.tenant_id, policy_draft["tool_name"])
-    
+
+    return _copilot_result(policy_draft, impact_count)
+
+
+def _copilot_result(policy_draft: Dict[str, Any], impact_count: int) -> Dict[str, Any]:
     sim_msg = f"Simulación: Esta regla habría afectado a {impact_count} peticiones recientes."
     if impact_count > 0:
         sim_msg += " ⚠️ Impacto alto detectado."
@@ -108,11 +217,87 @@ async def copilot_create_policy(
     }
 
 
+# `tool_name` aparece pronto en el JSON del LLM: en cuanto lo vemos lanzamos la simulación
+TOOL_NAME_RE = re.compile(r'"tool_name"\s*:\s*"([^"]+)"')
+
+
+def _sse(event: str, data: Any) -> str:
+    # Formato SSE estándar: event: nombre \n data: json \n\n
+    return f"event: {event}\ndata: {fast_json.dumps(data)}\n\n"
+
+
+async def _copilot_event_stream(identity: VerifiedIdentity, text: str) -> AsyncIterator[str]:
+    """
+    Eventos: `draft_partial` (fragmentos del LLM), `tool_name`, `simulation`, `done` | `error`.
+    La consulta de simulación se solapa con la cola de la generación.
+    """
+    buf = ""
+    sim_task: Optional[asyncio.Task] = None
+    streamed_tool: Optional[str] = None
+    try:
+        try:
+            async for delta in stream_policy_json(identity.tenant_id, text):
+                buf += delta
+                yield _sse("draft_partial", {"delta": delta})
+                if sim_task is None:
+                    match = TOOL_NAME_RE.search(buf)
+                    if match:
+                        streamed_tool = match.group(1)
+                        sim_task = asyncio.create_task(simulate_policy_impact(identity.tenant_id, streamed_tool))
+                        yield _sse("tool_name", {"tool_name": streamed_tool})
+
+            policy_draft = _validate_draft(fast_json.loads(buf))
+        except HTTPException as e:
+            yield _sse("error", {"status_code": e.status_code, "detail": e.detail})
+            return
+        except Exception as e:
+            logger.error(f"Copilot stream error: {e}")
+            yield _sse("error", {"status_code": 502, "detail": "Failed to generate policy"})
+            return
+
+        # El JSON final manda: si el nombre parcial no coincide, recalculamos
+        if sim_task is None or policy_draft["tool_name"] != streamed_tool:
+            if sim_task is not None:
+                sim_task.cancel()
+            sim_task = asyncio.create_task(simulate_policy_impact(identity.tenant_id, policy_draft["tool_name"]))
+        impact_count = await sim_task
+        yield _sse("simulation", {"impact_score": impact_count})
+        yield _sse("done", _copilot_result(policy_draft, impact_count))
+    finally:
+        if sim_task is not None and not sim_task.done():
+            sim_task.cancel()
+
+
+@router.post(
+    "/v1/admin/copilot/policy/stream",
+    dependencies=[Depends(enforce_copilot_rate_limit)],
+)
+async def copilot_create_policy_stream(
+    prompt: CopilotPrompt,
+    identity: VerifiedIdentity = Depends(require_admin_identity),
+):
+    """
+    **Semantic Policy Copilot (Streaming).**
+
+    Same contract as `/v1/admin/copilot/policy`, delivered as Server-Sent Events so the
+    UI can render the draft while it is generated. The "Blast Radius" simulation starts
+    as soon as `tool_name` is parsed, overlapping the tail of the LLM response.
+
+    Returns:
+        StreamingResponse: `text/event-stream`; the final `done` event carries the full result.
+    """
+    logger.info(f"🤖 Copilot (Stream) creating policy for {identity.email}...")
+    return StreamingResponse(
+        _copilot_event_stream(identity, prompt.text),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/v1/admin/policies", status_code=201)
 async def create_policy_from_draft(
     policy: PolicyDraft,
-    identity: VerifiedIdentity = Depends(verify_identity_envelope),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    identity: VerifiedIdentity = Depends(require_admin_identity),
 ):
     """
     **Policy Commitment Engine.**
@@ -120,101 +305,32 @@ async def create_policy_from_draft(
     Validates and commits a confirmed Policy Draft to the database.
     
     **God Tier Safety:**
-    - **Conflict Detection:** Checks `check_policy_conflicts` to ensure no overlapping rules exist for the same Target/Tool.
+    - **Conflict Detection:** Ensures no overlapping rules exist for the same Target/Tool.
     - **Anti-Hallucination Check:** Verifies validity of `tool_name` against the Tool Catalog before inserting. (Prevents creating policies for non-existent tools).
-    - **Background Audit:** Asynchronously commits the creation event to the immutable Audit Log.
+    - **Atomic Commit:** Lookup, conflict check and insert run in one Postgres transaction (`create_policy_atomic` RPC).
+    - **Batched Audit:** Enqueues the creation event; a background worker commits it to the immutable Audit Log in batches.
     
     Args:
         policy (PolicyDraft): The confirmed JSON structure.
         identity (VerifiedIdentity): Admin user.
-        background_tasks (BackgroundTasks): For non-blocking audit logging.
 
     Returns:
         dict: Success status and new Policy ID.
     """
-    # 1. SEGURIDAD
-    user_role = (identity.role or "").lower()
-    if user_role not in ALLOWED_ROLES and "admin" not in user_role:
-        raise HTTPException(status_code=403, detail="Access Denied")
-
+    # 1. SEGURIDAD: resuelta en require_admin_identity
     try:
-        loop = asyncio.get_running_loop()
-        
-        # 2. DB PERFORMANCE: Ejecutar I/O bloqueante en ThreadPool
-        # Paso A: Buscar Tool ID
-        def _get_tool():
-            return (
-                supabase.table("tool_definitions")
-                .select("id")
-                .eq("name", policy.tool_name)
-                .eq("tenant_id", identity.tenant_id)
-                .execute()
-            )
-        
-        res_tool = await loop.run_in_executor(None, _get_tool)
-
-        tool_id = None
-        if res_tool.data:
-            tool_id = res_tool.data[0]["id"]
-        else:
-            # 3. ANTI-PATTERN FIX: No crear herramientas basura automáticamente.
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Tool '{policy.tool_name}' does not exist. Please register the tool in the catalog first."
-            )
-
-        # 3.5 CONFLICT DETECTION (God Tier Safety)
-        has_conflict = await check_policy_conflicts(identity.tenant_id, tool_id, policy.target_role)
-        if has_conflict:
-             raise HTTPException(
-                status_code=409, 
-                detail=f"Conflict: A policy for tool '{policy.tool_name}' and role '{policy.target_role or 'ALL'}' already exists."
-            )
-
-        # Paso B: Buscar Departamento (Opcional)
-        target_dept_id = None
-        if policy.target_dept:
-            def _get_dept():
-                return (
-                    supabase.table("departments")
-                    .select("id")
-                    .ilike("name", policy.target_dept)
-                    .eq("tenant_id", identity.tenant_id)
-                    .execute()
-                )
-            res_dept = await loop.run_in_executor(None, _get_dept)
-            if res_dept.data:
-                target_dept_id = res_dept.data[0]["id"]
-
-        # Paso C: Insertar Política
-        new_row = {
-            "tenant_id": identity.tenant_id,
-            "tool_id": tool_id,
-            "target_dept_id": target_dept_id,
-            "target_role": policy.target_role,
-            "argument_rules": policy.argument_rules,
-            "action": policy.action,
-            "approval_group": policy.approval_group,
-            "is_active": True,
-            "created_by": identity.email
-        }
-
-        def _insert_policy():
-            return supabase.table("tool_policies").insert(new_row).execute()
-
-        res = await loop.run_in_executor(None, _insert_policy)
-
-        # 5. SIMULATION / AUDIT (Background)
-        # En background, podríamos recalcular métricas o invalidar caché
-        background_tasks.add_task(
-            log_audit_event, 
-            identity.tenant_id, 
-            "POLICY_CREATED", 
+        # 2. DB PERFORMANCE: Tool lookup + Conflict check + Dept lookup + Insert en 1 RPC atómica
+        policy_id = await _create_policy_atomic(policy, identity)
+
+        # 5. AUDIT (Fire-and-forget + Batched): la respuesta no espera ni al backpressure de la cola
+        fire(log_audit_event(
+            identity.tenant_id,
+            "POLICY_CREATED",
             f"Policy for '{policy.tool_name}' created by {identity.email}",
             identity.user_id
-        )
+        ))
 
-        return {"status": "success", "id": res.data[0]["id"] if res.data else "unknown"}
+        return {"status": "success", "id": policy_id or "unknown"}
 
     except HTTPException as he:
         raise he
@@ -222,68 +338,181 @@ async def create_policy_from_draft(
         logger.error(f"Failed to save policy: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-async def log_audit_event(tenant_id, event, details, user_id):
+
+async def _noop():
+    return None
+
+
+def _tool_missing_error(policy: PolicyDraft) -> HTTPException:
+    # ANTI-PATTERN FIX: No crear herramientas basura automáticamente.
+    return HTTPException(
+        status_code=400,
+        detail=f"Tool '{policy.tool_name}' does not exist. Please register the tool in the catalog first."
+    )
+
+
+def _conflict_error(policy: PolicyDraft) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail=f"Conflict: A policy for tool '{policy.tool_name}' and role '{policy.target_role or 'ALL'}' already exists."
+    )
+
+
+async def _create_policy_atomic(policy: PolicyDraft, identity: VerifiedIdentity) -> Optional[str]:
     """
-    Escribe en la tabla real de auditoría.
+    Crea la política con la RPC `create_policy_atomic` (1 round-trip, sin carrera check-then-insert).
+    Si la RPC no está desplegada, cae al flujo legacy de varios pasos.
     """
+    db = await get_async_supabase()
+
     try:
-        loop = asyncio.get_running_loop()
-        await loop.run_in_executor(
-            None,
-            lambda: supabase.table("audit_logs").insert({
-                "tenant_id": tenant_id,
-                "event_type": event,
-                "details": details,
-                "user_id": user_id,
-                "severity": "INFO"
-            }).execute()
-        )
-    except Exception as e:
-        logger.error(f"Failed to write audit log: {e}")
+        res = await db.rpc(
+            "create_policy_atomic",
+            {
+                "p_tenant_id": identity.tenant_id,
+                "p_tool_name": policy.tool_name,
+                "p_dept_name": policy.target_dept,
+                "p_target_role": policy.target_role,
+                "p_action": policy.action,
+                "p_argument_rules": policy.argument_rules,
+                "p_approval_group": policy.approval_group,
+                "p_created_by": identity.email,
+            }
+        ).execute()
+    except APIError as e:
+        message = e.message or ""
+        if message.startswith("TOOL_MISSING"):
+            raise _tool_missing_error(policy)
+        if message.startswith("CONFLICT"):
+            raise _conflict_error(policy)
+        if e.code != RPC_NOT_FOUND:
+            raise
+        logger.warning("create_policy_atomic RPC not deployed, using legacy multi-step insert.")
+        return await _create_policy_legacy(policy, identity)
+
+    return res.data
+
+
+async def _create_policy_legacy(policy: PolicyDraft, identity: VerifiedIdentity) -> Optional[str]:
+    """Fallback: (Tool lookup || Dept lookup) -> Conflict check -> Insert."""
+    # Paso A + B: Tool ID y Departamento (opcional) desde la caché de catálogo, en paralelo
+    get_dept = (
+        resolve_dept_id(identity.tenant_id, policy.target_dept) if policy.target_dept else _noop()
+    )
+
+    tool_id, target_dept_id = await asyncio.gather(
+        resolve_tool_id(identity.tenant_id, policy.tool_name), get_dept
+    )
+
+    if not tool_id:
+        raise _tool_missing_error(policy)
+
+    # CONFLICT DETECTION (God Tier Safety)
+    if await check_policy_conflicts(identity.tenant_id, tool_id, policy.target_role):
+        raise _conflict_error(policy)
+
+    # Paso C: Insertar Política
+    new_row = {
+        "tenant_id": identity.tenant_id,
+        "tool_id": tool_id,
+        "target_dept_id": target_dept_id,
+        "target_role": policy.target_role,
+        "argument_rules": policy.argument_rules,
+        "action": policy.action,
+        "approval_group": policy.approval_group,
+        "is_active": True,
+        "created_by": identity.email
+    }
+
+    db = await get_async_supabase()
+    res = await db.table("tool_policies").insert(new_row).execute()
+    return res.data[0]["id"] if res.data else None
+
+# --- Audit Log Buffer ---
+# Un único consumidor agrupa hasta 100 filas por INSERT (1 RTT por lote en vez de por evento).
+audit_buffer = AuditLogBuffer("audit_logs", batch_size=100)
+
+
+async def log_audit_event(tenant_id, event, details, user_id):
+    """
+    Encola el evento para la tabla real de auditoría (escritura por lotes en `audit_buffer`).
+    """
+    await audit_buffer.put({
+        "tenant_id": tenant_id,
+        "event_type": event,
+        "details": details,
+        "user_id": user_id,
+        "severity": "INFO"
+    })
+
+
+IMPACT_WINDOW_HOURS = 24
+
 
 async def simulate_policy_impact(tenant_id: str, tool_name: str) -> int:
     """
     Simula cuántas peticiones recientes habrían sido afectadas por esta regla.
-    Busca en 'request_logs' por menciones de la herramienta.
+    Lee el rollup horario `tool_mention_rollup` (lookup indexado, RPC `get_tool_impact`).
     """
     try:
-        loop = asyncio.get_running_loop()
-        def _search_logs():
-            # Busco en los últimos 1000 logs menciones de la herramienta
-            # Esto es una heurística "fuzz" para simulación rápida
-            return supabase.table("request_logs")\
-                .select("id", count="exact")\
-                .eq("tenant_id", tenant_id)\
-                .ilike("prompt_text", f"%{tool_name}%")\
-                .limit(1000)\
-                .execute()
-        
-        result = await loop.run_in_executor(None, _search_logs)
-        return result.count or 0
+        # Una tool que no está en el catálogo no puede tener impacto: evitamos el scan
+        if not await resolve_tool_id(tenant_id, tool_name):
+            return 0
+
+        db = await get_async_supabase()
+        try:
+            res = await db.rpc(
+                "get_tool_impact",
+                {"p_tenant_id": tenant_id, "p_tool_name": tool_name, "p_hours": IMPACT_WINDOW_HOURS}
+            ).execute()
+            return int(res.data or 0)
+        except APIError as e:
+            if e.code != RPC_NOT_FOUND:
+                raise
+            logger.warning("get_tool_impact RPC not deployed, scanning request_logs.")
+            return await _search_logs(db, tenant_id, tool_name)
     except:
         return 0
 
+async def _search_logs(db, tenant_id: str, tool_name: str) -> int:
+    """Fallback: ILIKE sobre request_logs (heurística "fuzz", máx. 1000 filas)."""
+    result = await db.table("request_logs")\
+        .select("id", count="exact")\
+        .eq("tenant_id", tenant_id)\
+        .ilike("prompt_text", f"%{tool_name}%")\
+        .limit(1000)\
+        .execute()
+    return result.count or 0
+
 async def check_policy_conflicts(tenant_id: str, tool_id: str, role: Optional[str]) -> bool:
     """
     Verifica si ya existe una política conflictiva para esa herramienta/rol.
+    RPC `policy_conflict_exists`: un EXISTS sobre índice parcial, devuelve solo un bool.
     """
     try:
-        loop = asyncio.get_running_loop()
-        def _check_conflict():
-            q = supabase.table("tool_policies")\
-                .select("id")\
-                .eq("tenant_id", tenant_id)\
-                .eq("tool_id", tool_id)\
-                .eq("is_active", True)
-            
-            if role:
-                q = q.eq("target_role", role)
-            else:
-                 q = q.is_("target_role", "null")
-            
-            return q.execute()
-
-        res = await loop.run_in_executor(None, _check_conflict)
+        db = await get_async_supabase()
+        try:
+            res = await db.rpc(
+                "policy_conflict_exists",
+                {"p_tenant_id": tenant_id, "p_tool_id": tool_id, "p_role": role}
+            ).execute()
+            return bool(res.data)
+        except APIError as e:
+            if e.code != RPC_NOT_FOUND:
+                raise
+
+        q = db.table("tool_policies")\
+            .select("id")\
+            .eq("tenant_id", tenant_id)\
+            .eq("tool_id", tool_id)\
+            .eq("is_active", True)
+
+        if role:
+            q = q.eq("target_role", role)
+        else:
+             q = q.is_("target_role", "null")
+
+        res = await q.limit(1).execute()
         return len(res.data) > 0
     except:
         return False
@@ -12,20 +12,28 @@ API endpoints for Advanced Role-Based Access Control (RBAC) & Governance.
 - **Rank Enforcement:** Owner (100) > Admin (80) > Manager (60) > Member (20).
 - **Tenant Isolation:** Strict enforcement of `tenant_id` in all DB queries.
 """
-from typing import List, Optional, Any, Dict
-from datetime import datetime
+from typing import List, Optional, Any, Dict, Tuple
 import asyncio
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
 import logging
-from fastapi import APIRouter, Depends, Request, HTTPException, status
-from pydantic import BaseModel, Field
-
-from app.db import supabase
-from app.services.identity import VerifiedIdentity, verify_identity_envelope
+import re
+from operator import itemgetter
+import time
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, TypeAdapter
+
+from app.db import get_async_supabase
+from app.services.audit_buffer import AuditLogBuffer
+from app.services.identity import Rank, VerifiedIdentity, rank_for_role, verify_identity_envelope, warm_up_verifier
 from app.services.role_architect import role_architect
+from app.services.role_cache import get_role_def, invalidate_role
+from app.utils.tasks import fire
 
 logger = logging.getLogger("agentshield.admin_roles")
 
-router = APIRouter(prefix="/v1/admin/roles", tags=["Admin Roles"])
+router = APIRouter(prefix="/v1/admin/roles", tags=["Admin Roles"], default_response_class=ORJSONResponse)
 
 # --- Models ---
 class RoleCreate(BaseModel):
@@ -45,6 +53,54 @@ class RoleResponse(BaseModel):
     metadata: Dict[str, Any]
     created_at: str
 
+# Proyección explícita: solo las columnas que serializa RoleResponse
+ROLE_COLUMNS = ",".join(RoleResponse.model_fields)
+
+# Adaptador compilado una sola vez (pydantic-core): valida y serializa a JSON en un paso,
+# sin la pasada de re-validación de response_model (que se mantiene solo para OpenAPI)
+_ROLE_ADAPTER = TypeAdapter(RoleResponse)
+
+@dataclass(slots=True)
+class RoleRow:
+    """Lightweight read-path shuttle for trusted `role_definitions` rows (no per-field validation)."""
+    id: int
+    tenant_id: str
+    department: str
+    function: str
+    system_persona: str
+    pii_policy: str
+    allowed_modes: List[str]
+    metadata: Dict[str, Any]
+    created_at: str
+
+# Constructor precomputado: itemgetter en C, falla (500) si falta una columna proyectada
+_ROLE_ROW_VALUES = itemgetter(*(f.name for f in fields(RoleRow)))
+
+def _json_response(adapter: TypeAdapter, data: Any) -> Response:
+    return Response(content=adapter.dump_json(adapter.validate_python(data)), media_type="application/json")
+
+# Fila de muestra para el warmup (nunca se persiste)
+_WARMUP_ROLE = {
+    "id": 0, "tenant_id": "warmup", "department": "", "function": "", "system_persona": "",
+    "pii_policy": "REDACT", "allowed_modes": [], "metadata": {}, "created_at": "1970-01-01T00:00:00+00:00",
+}
+
+async def warm_up() -> None:
+    """
+    Startup warmup for the first admin call: opens the PostgREST connection (TLS + HTTP/2)
+    with one cheap read, loads the JWT verifier and runs the RoleResponse adapter once.
+    """
+    try:
+        db = await get_async_supabase()
+        await db.table("role_definitions").select("id").limit(1).execute()
+    except Exception as e:
+        logger.warning(f"⚠️ Admin warmup: PostgREST round trip failed: {e}")
+    try:
+        warm_up_verifier()
+        _json_response(_ROLE_ADAPTER, _WARMUP_ROLE)
+    except Exception as e:
+        logger.warning(f"⚠️ Admin warmup: verifier/adapter failed: {e}")
+
 class SimulationRequest(BaseModel):
     role_id: Optional[int] = None
     role_definition: Optional[Dict[str, Any]] = None
@@ -57,70 +113,117 @@ class SimulationResponse(BaseModel):
 
 # --- Helper Logic ---
 
-RANKING = {
-    "owner": 100,
-    "admin": 80,
-    "manager": 60,
-    "member": 20,
-    "observer": 10
-}
+# Compat: vista dict de la jerarquía (fuente única: identity.Rank)
+RANKING = {rank.name.lower(): int(rank) for rank in Rank}
+
+def get_role_rank(role_name: Optional[str]) -> int:
+    return rank_for_role(role_name)
 
-def get_role_rank(role_name: str) -> int:
-    return RANKING.get(role_name.lower(), 0)
+# Funciones que provisionan un rol de rango alto (subcadena, igual que el chequeo original)
+_HIGH_RANK_RE = re.compile(r"admin|owner", re.IGNORECASE)
 
-def check_hierarchical_integrity(actor_role: str, target_rank_level: int):
+def check_hierarchical_integrity(actor_rank: int, target_rank_level: int):
     """
     God Tier Security: 'King Slayer Protection'.
     Prevents a lower-ranked actor from creating/modifying a higher-ranked role.
+    `actor_rank` is `VerifiedIdentity.role_rank`, resolved once at JWT verification.
     """
-    actor_rank = get_role_rank(actor_role)
     if actor_rank < target_rank_level:
         raise HTTPException(
             status_code=403, 
             detail=f"Hierarchical Violation: Your rank ({actor_rank}) cannot manage rank ({target_rank_level})."
         )
 
+# Acciones conocidas -> (modo requerido, sensible a PII): una búsqueda en dict en vez de
+# casefold + escaneos de subcadena. Debe coincidir con lo que daría la ruta difusa.
+_ACTION_RULES: Dict[str, Tuple[Optional[str], bool]] = {
+    "execute_code": ("coding", False),
+    "code.execute": ("coding", False),
+    "pii.bypass": (None, True),
+    "pii.read": (None, True),
+    "budget.update": (None, False),
+    "budget.read": (None, False),
+}
+
+def _action_rule(action_to_test: str) -> Tuple[Optional[str], bool]:
+    rule = _ACTION_RULES.get(action_to_test)
+    if rule is not None:
+        return rule
+    # Ruta difusa para acciones libres
+    action = action_to_test.casefold()
+    return ("coding" if "code" in action else None), "pii" in action
+
+# Ráfagas de provisioning masivo: un INSERT por lote en vez de uno por acción
+audit_buffer = AuditLogBuffer("admin_audit_logs", batch_size=200)
+
+
+# (milisegundo, ISO-8601): las ráfagas de eventos dentro del mismo ms reutilizan el string
+_last_ts = (0, "")
+
+def _audit_timestamp() -> str:
+    """UTC ISO-8601 timestamp (ms precision), formatted at most once per millisecond."""
+    global _last_ts
+    now = time.time()
+    ms = int(now * 1000)
+    if ms != _last_ts[0]:
+        iso = datetime.fromtimestamp(ms / 1000, tz=timezone.utc).isoformat(timespec="milliseconds")
+        _last_ts = (ms, iso)
+    return _last_ts[1]
+
 async def log_audit_event(tenant_id: str, actor: str, action: str, details: Dict[str, Any]):
-    """Async audit logging context-free"""
-    try:
-        loop = asyncio.get_running_loop()
-        def _insert():
-            supabase.table("admin_audit_logs").insert({
-                "tenant_id": tenant_id,
-                "actor_id": actor,
-                "action": action,
-                "details": details,
-                "timestamp": datetime.utcnow().isoformat()
-            }).execute()
-        await loop.run_in_executor(None, _insert)
-    except Exception as e:
-        logger.error(f"Audit Log Failed: {e}")
+    """Async audit logging context-free (encola; el buffer escribe por lotes)"""
+    await audit_buffer.put({
+        "tenant_id": tenant_id,
+        "actor_id": actor,
+        "action": action,
+        "details": details,
+        "timestamp": _audit_timestamp()
+    })
+
+# Singleflight: polls concurrentes del dashboard (varias pestañas, mismo tenant) comparten un fetch
+_inflight_roles: Dict[str, asyncio.Task] = {}
+
+async def _fetch_roles(tenant_id: str) -> List[RoleRow]:
+    db = await get_async_supabase()
+    res = await db.table("role_definitions").select(ROLE_COLUMNS).eq("tenant_id", tenant_id).execute()
+    return [RoleRow(*_ROLE_ROW_VALUES(row)) for row in res.data]
+
+def _release_inflight_roles(key: str, task: asyncio.Task) -> None:
+    # Solo si sigue siendo la entrada vigente (una escritura pudo haberla reemplazado)
+    if _inflight_roles.get(key) is task:
+        del _inflight_roles[key]
+
+def _forget_inflight_roles(tenant_id: str) -> None:
+    """After a write, later list_roles callers must not join a fetch that may predate it."""
+    _inflight_roles.pop(str(tenant_id), None)
 
 # --- Endpoints ---
 
 @router.get("/", response_model=List[RoleResponse])
 async def list_roles(
-    request: Request,
     driver: bool = False, # Parameter to force DB fetch if needed
     identity: VerifiedIdentity = Depends(verify_identity_envelope),
 ):
     """
     List all defined roles for the tenant.
     """
+    key = str(identity.tenant_id)
+    task = _inflight_roles.get(key)
+    if task is None:
+        task = asyncio.create_task(_fetch_roles(identity.tenant_id))
+        _inflight_roles[key] = task
+        task.add_done_callback(lambda done: _release_inflight_roles(key, done))
     try:
-        loop = asyncio.get_running_loop()
-        res = await loop.run_in_executor(
-            None, 
-            lambda: supabase.table("role_definitions").select("*").eq("tenant_id", identity.tenant_id).execute()
-        )
-        return res.data
+        # shield: si una pestaña se desconecta, el fetch sigue para las demás
+        rows = await asyncio.shield(task)
     except Exception as e:
         logger.error(f"List Roles Error: {e}")
         raise HTTPException(status_code=500, detail="Could not fetch roles")
+    # Lectura confiable desde la DB: orjson serializa los dataclasses directamente
+    return ORJSONResponse(rows)
 
 @router.post("/provision", response_model=RoleResponse)
 async def provision_role(
-    request: Request,
     payload: RoleCreate,
     identity: VerifiedIdentity = Depends(verify_identity_envelope),
 ):
@@ -135,7 +238,6 @@ async def provision_role(
     - **Auto-Policy Generation:** Converts natural language into JSON permissions (`allowed_modes`, `pii_policy`).
     
     Args:
-        request (Request): Raw request.
         payload (RoleCreate): Department, Function, and Description.
         identity (VerifiedIdentity): Authenticated user.
 
@@ -146,17 +248,19 @@ async def provision_role(
     # We estimate the rank of the requested role based on keywords or explicit metadata if passed.
     # For now, we assume AI generated roles are 'member' level unless specified.
     # If the user tries to put 'admin' in the function name, we treat it as high rank.
-    target_rank = 20 # Default Member
-    if "admin" in payload.function.lower() or "owner" in payload.function.lower():
-        target_rank = 80
+    target_rank = Rank.ADMIN if _HIGH_RANK_RE.search(payload.function) else Rank.MEMBER # Default Member
     
-    check_hierarchical_integrity(identity.role, target_rank)
+    check_hierarchical_integrity(identity.role_rank, target_rank)
 
     # 2. AI Architect Generation
     role_data = await role_architect.auto_configure_role(
         str(identity.tenant_id), payload.description, user_id=identity.user_id
     )
     
+    # Upsert por (tenant, dept, function): puede sobrescribir un rol cacheado
+    await invalidate_role(str(identity.tenant_id))
+    _forget_inflight_roles(identity.tenant_id)
+
     # 3. Audit Log
     await log_audit_event(
         str(identity.tenant_id), 
@@ -167,7 +271,7 @@ async def provision_role(
 
     # The architect returns the raw dict, we might need to fetch the inserted ID to return strictly RoleResponse
     # or just return the dict if it matches keys. Assuming RoleArquitect returns the DB row.
-    return role_data
+    return _json_response(_ROLE_ADAPTER, role_data)
 
 @router.delete("/{role_id}")
 async def delete_role(
@@ -192,62 +296,51 @@ async def delete_role(
         dict: Status message.
     """
     # 1. Integrity Check (Can only delete if you are admin+)
-    check_hierarchical_integrity(identity.role, 60) # Must be at least Manager to delete
+    check_hierarchical_integrity(identity.role_rank, Rank.MANAGER) # Must be at least Manager to delete
 
-    loop = asyncio.get_running_loop()
+    db = await get_async_supabase()
 
     # 2. Check for active users
     # Assuming 'users' table or 'profile' table links to role_definitions via role_id or composite key.
-    # For now, let's look up role definition to get dept/func keys
-    role_def = await loop.run_in_executor(
-        None,
-        lambda: supabase.table("role_definitions")
-            .select("*")
-            .eq("id", role_id)
-            .eq("tenant_id", identity.tenant_id)
-            .single()
-            .execute()
-    )
-    
-    # ... (fetched role_def) ...
-    if not role_def.data:
+    # For now, let's look up role definition to get dept/func keys (L1 cache)
+    role_def = await get_role_def(identity.tenant_id, role_id)
+    if not role_def:
          raise HTTPException(status_code=404, detail="Role not found")
          
-    role_name = role_def.data.get("function")
+    role_name = role_def.get("function")
 
     # 2. Check for active users (REAL CHECK)
     # We assume 'profiles' table uses the role function name as the role identifier
-    active_users = await loop.run_in_executor(
-        None,
-        lambda: supabase.table("profiles")
-            .select("id", count="exact")
-            .eq("tenant_id", identity.tenant_id)
-            .eq("role", role_name) 
-            .execute()
-    )
-
-    if active_users.count and active_users.count > 0:
+    # Basta con saber si existe alguno: LIMIT 1 en vez de count="exact" (sin escaneo completo)
+    active_users = await db.table("profiles")\
+        .select("id")\
+        .eq("tenant_id", identity.tenant_id)\
+        .eq("role", role_name)\
+        .limit(1)\
+        .execute()
+
+    if active_users.data:
          raise HTTPException(
              status_code=409, 
-             detail=f"Cannot delete role '{role_name}': {active_users.count} active users assigned. Please reassign them first."
+             detail=f"Cannot delete role '{role_name}': it still has active users assigned. Please reassign them first."
          )
 
     # 3. Delete
-    await loop.run_in_executor(
-        None,
-        lambda: supabase.table("role_definitions")
-            .delete()
-            .eq("id", role_id)
-            .eq("tenant_id", identity.tenant_id)
-            .execute()
-    )
+    await db.table("role_definitions")\
+        .delete()\
+        .eq("id", role_id)\
+        .eq("tenant_id", identity.tenant_id)\
+        .execute()
+    await invalidate_role(identity.tenant_id, role_id)
+    _forget_inflight_roles(identity.tenant_id)
     
-    await log_audit_event(
+    # 4. Audit (fire-and-forget): la respuesta no espera al INSERT
+    fire(log_audit_event(
         str(identity.tenant_id), 
         identity.user_id, 
         "ROLE_DELETE", 
         {"role_id": role_id, "role_name": role_name}
-    )
+    ))
 
     return {"status": "deleted"}
 
@@ -275,14 +368,8 @@ async def simulate_access(
     """
     role_def = payload.role_definition
     if not role_def and payload.role_id:
-        # Fetch real role
-        loop = asyncio.get_running_loop()
-        res = await loop.run_in_executor(
-            None, 
-            lambda: supabase.table("role_definitions").select("*").eq("id", payload.role_id).single().execute()
-        )
-        if res.data:
-            role_def = res.data
+        # Fetch real role (L1 cache, siempre acotado al tenant del actor)
+        role_def = await get_role_def(identity.tenant_id, payload.role_id)
 
     if not role_def:
         raise HTTPException(404, "Role definition not found for simulation")
@@ -295,8 +382,10 @@ async def simulate_access(
     allowed = True
     reason = "Access granted by default policies."
     
+    required_mode, pii_sensitive = _action_rule(payload.action_to_test)
+
     # 1. Check PII Policy
-    if "pii" in payload.action_to_test.lower():
+    if pii_sensitive:
         if pii_policy == "BLOCK":
             allowed = False
             reason = "Role PII Policy is STRICT BLOCK."
@@ -305,9 +394,9 @@ async def simulate_access(
 
     # 2. Check Allowed Modes (if action implies a mode)
     # E.g. action "execute_code" implies "planning" or "coding" mode
-    if "code" in payload.action_to_test.lower() and "coding" not in allowed_modes:
+    if required_mode and required_mode not in allowed_modes:
          allowed = False
-         reason = f"Role does not have 'coding' mode enabled. Modes: {allowed_modes}"
+         reason = f"Role does not have '{required_mode}' mode enabled. Modes: {allowed_modes}"
 
     return {
         "allowed": allowed,
@@ -317,8 +406,8 @@ async def simulate_access(
 
 # --- Legacy Aliases ---
 @router.post("/ai-provision")
-async def ai_provision_legacy(request: Request, description: str, identity: VerifiedIdentity = Depends(verify_identity_envelope)):
+async def ai_provision_legacy(description: str, identity: VerifiedIdentity = Depends(verify_identity_envelope)):
     # Adapter for legacy query param style to new body style
     # We construct a synthetic body
     payload = RoleCreate(department="General", function="AI_Gen", description=description)
-    return await provision_role(request, payload, identity)
+    return await provision_role(payload, identity)
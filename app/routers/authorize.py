@@ -171,10 +171,14 @@ async def authorize_transaction(
                 )
 
             # B. Model Swapping (El Cambiazo)
+            # AuthorizeRequest es inmutable: aplicamos el override sobre una copia
+            overrides = {}
             if func_conf.get("force_model"):
-                req.model = func_conf["force_model"]
+                overrides["model"] = func_conf["force_model"]
             if func_conf.get("force_provider"):
-                req.provider = func_conf["force_provider"]
+                overrides["provider"] = func_conf["force_provider"]
+            if overrides:
+                req = req.model_copy(update=overrides)
 
             # C. Budget Check
             budget = func_conf.get("budget_daily", 0)
@@ -195,7 +199,8 @@ async def authorize_transaction(
     # 1. PREDICT: Estimación Multimodal (Zero-History)
     # Obtenemos el tipo de tarea de la política (configuración) o metadatos
     # Prioridad: Metadata > Policy > Default
-    task_type = req.metadata.get("task_type") or policy.get("task_type", "DEFAULT")
+    metadata = req.metadata or {}
+    task_type = metadata.get("task_type") or policy.get("task_type", "DEFAULT")
 
     # Determinar cantidad de entrada (Tokens, Minutos, Imagenes)
     # Usamos input_unit_count si viene, sino est_input_tokens (backward compatibility)
@@ -205,16 +210,16 @@ async def authorize_transaction(
 
     # Caso especial: Si es IMG_GENERATION y no viene count, buscamos en metadata 'num_images'
     if "IMG_GENERATION" in task_type and input_qty <= 1:
-        input_qty = float(req.metadata.get("num_images", 1))
+        input_qty = float(metadata.get("num_images", 1))
 
     # Caso especial: Si es AUDIO y no viene count, buscamos 'duration_seconds'
     if "AUDIO" in task_type and input_qty <= 1:
-        secs = float(req.metadata.get("duration_seconds", 60))
+        secs = float(metadata.get("duration_seconds", 60))
         input_qty = secs / 60.0  # Minutos
 
     # Calcular Coste Estimado
     cost_estimated = await estimator.estimate_cost(
-        model=req.model, task_type=task_type, input_unit_count=input_qty, metadata=req.metadata
+        model=req.model, task_type=task_type, input_unit_count=input_qty, metadata=metadata
     )
 
     # --- 0. EU AI ACT COMPLIANCE CHECK (2026) ---
@@ -223,7 +228,7 @@ async def authorize_transaction(
 
     # Determinamos la acción legal basada en el caso de uso
     # Default a ALLOW si no está definido (o si es policy vieja 1.0)
-    action = risk_rules.get(req.use_case.value, "ALLOW")
+    action = risk_rules.get(req.use_case, "ALLOW")
 
     # LÓGICA DE RIESGOS
     if action == "PROHIBITED":
@@ -231,18 +236,18 @@ async def authorize_transaction(
         return AuthorizeResponse(
             decision="DENIED",
             authorization_id="risk-block",  # No generamos ID formal si es prohibido
-            reason_code=f"EU AI Act Violation: Usage '{req.use_case.value}' is PROHIBITED.",
+            reason_code=f"EU AI Act Violation: Usage '{req.use_case}' is PROHIBITED.",
             execution_mode="BLOCKED",
         )
 
     elif action == "HUMAN_CHECK":
         # Caso: RRHH o Medicina -> Forzamos "Pending Approval"
         decision = "PENDING_APPROVAL"
-        reason = f"High Risk Use Case ({req.use_case.value}). Human verification required by law."
+        reason = f"High Risk Use Case ({req.use_case}). Human verification required by law."
 
     elif action == "LOG_AUDIT":
         # Caso: Finanzas -> Marcamos para auditoría extendida
-        req.metadata["compliance_level"] = "high_risk_audit"
+        metadata = {**metadata, "compliance_level": "high_risk_audit"}
 
     # 2. CHECK: Reglas de Presupuesto GLOBAL
     monthly_limit = policy.get("limits", {}).get("monthly", 0)
@@ -323,7 +328,7 @@ async def authorize_transaction(
                         model=fallback_model,
                         task_type=task_type,
                         input_unit_count=input_qty,
-                        metadata=req.metadata,
+                        metadata=metadata,
                     )
 
                     # 3. Check presupuesto con nuevo coste
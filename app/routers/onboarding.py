@@ -9,7 +9,7 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
 
 from app.db import supabase
-from app.models import TenantRegion
+from app.models import Region
 
 logger = logging.getLogger("agentshield.onboarding")
 router = APIRouter(tags=["Onboarding"])
@@ -19,7 +19,7 @@ class SignupRequest(BaseModel):
     company_name: str
     email: str | None = None  # Realmente opcional ahora
     owner_id: str  # UUID de Supabase Auth
-    region: TenantRegion = TenantRegion.EU
+    region: Region = "eu"
     accept_tos: bool
     tos_version_seen: str = "v1.0"
 
@@ -61,10 +61,10 @@ async def signup_tenant(
         tenant_data = {
             "name": req.company_name,
             "user_id": target_user_id,
-            "region": req.region.value,
+            "region": req.region,
             "registration_method": "OAUTH" if "@" not in (req.email or "") else "EMAIL",
             "slug": slug,
-            "compliance_framework": "EU_AI_ACT" if req.region == TenantRegion.EU else "NIST_AI_RMF",
+            "compliance_framework": "EU_AI_ACT" if req.region == "eu" else "NIST_AI_RMF",
             "brand_config": {
                 "logo_url": None,
                 "favicon_url": None,
@@ -147,3 +147,17 @@ async def generate_legal_discovery_package(receipt_id: str):
         media_type="application/zip",
         headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
+
+
+@router.get("/.well-known/agentshield-key.pem", include_in_schema=False)
+async def get_signing_public_key():
+    """
+    Public Ed25519 key (SPKI PEM) that verifies receipt, incident and conformity signatures.
+    """
+    from app.services.crypto_signer import get_public_key_pem
+
+    return Response(
+        content=get_public_key_pem(),
+        media_type="application/x-pem-file",
+        headers={"Cache-Control": "public, max-age=3600"},
+    )
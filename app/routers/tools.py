@@ -4,7 +4,8 @@ from typing import Any, Dict, Optional
 from fastapi import APIRouter, Body, Depends, HTTPException
 from pydantic import BaseModel
 
-from app.db import supabase
+from app.db import get_async_supabase
+from app.services.catalog_cache import invalidate_catalog
 from app.services.identity import VerifiedIdentity, verify_identity_envelope
 
 router = APIRouter(tags=["Tools & Governance"])
@@ -39,8 +40,9 @@ async def get_pending_approvals(identity: VerifiedIdentity = Depends(verify_iden
     # Join con tool_definitions para mostrar detalles bonitos si es posible
     # Supabase-py 'select' con foreign keys: select("*, tool_definitions(description)")
     try:
-        res = (
-            supabase.table("tool_approvals")
+        db = await get_async_supabase()
+        res = await (
+            db.table("tool_approvals")
             .select("*, tool_definitions(description)")
             .eq("tenant_id", identity.tenant_id)
             .eq("status", "PENDING")
@@ -68,8 +70,9 @@ async def decide_approval(
 
     try:
         # Actualizamos el estado
-        res = (
-            supabase.table("tool_approvals")
+        db = await get_async_supabase()
+        res = await (
+            db.table("tool_approvals")
             .update(
                 {
                     "status": status,
@@ -99,10 +102,13 @@ async def create_policy_from_copilot(
     ):
         raise HTTPException(403, "Only admins define policies")
 
+    # Cliente async nativo (pool httpx HTTP/2 compartido): sin saltos al executor
+    db = await get_async_supabase()
+
     # 1. Resolver ID de herramienta
     # Buscamos por nombre.
-    tool_res = (
-        supabase.table("tool_definitions")
+    tool_res = await (
+        db.table("tool_definitions")
         .select("id")
         .eq("name", policy.tool_name)
         .eq("tenant_id", identity.tenant_id)
@@ -114,8 +120,8 @@ async def create_policy_from_copilot(
         tool_id = tool_res.data[0]["id"]
     else:
         # Auto-crear si no existe (Flexibilidad para el Copilot)
-        new_tool = (
-            supabase.table("tool_definitions")
+        new_tool = await (
+            db.table("tool_definitions")
             .insert(
                 {
                     "tenant_id": identity.tenant_id,
@@ -128,6 +134,7 @@ async def create_policy_from_copilot(
         )
         if new_tool.data:
             tool_id = new_tool.data[0]["id"]
+            await invalidate_catalog(identity.tenant_id)
 
     if not tool_id:
         raise HTTPException(500, "Failed to resolve tool ID")
@@ -135,8 +142,8 @@ async def create_policy_from_copilot(
     # 2. Resolver ID de departamento (si aplica)
     dept_id = None
     if policy.target_dept:
-        dept_res = (
-            supabase.table("departments").select("id").ilike("name", policy.target_dept).execute()
+        dept_res = await (
+            db.table("departments").select("id").ilike("name", policy.target_dept).execute()
         )
         if dept_res.data:
             dept_id = dept_res.data[0]["id"]
@@ -155,7 +162,7 @@ async def create_policy_from_copilot(
             "is_active": True,
         }
 
-        res = supabase.table("tool_policies").insert(data).execute()
+        res = await db.table("tool_policies").insert(data).execute()
         return {"status": "policy_active", "data": res.data}
 
     except Exception as e:
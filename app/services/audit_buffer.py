@@ -0,0 +1,168 @@
+# app/services/audit_buffer.py
+"""
+Batched audit-log writer.
+
+Producers enqueue rows (no DB round-trip on the request path); a single consumer
+per table drains the queue and issues one bulk INSERT per batch.
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.db import get_async_supabase, redis_client
+
+logger = logging.getLogger("agentshield.audit_buffer")
+
+
+_buffers: List["AuditLogBuffer"] = []
+
+
+class AuditLogBuffer:
+    """
+    Bounded producer/consumer buffer for one audit table.
+
+    - Batches up to `batch_size` rows, waiting at most `flush_interval` seconds to fill a batch.
+    - Backpressure: when the queue is full, producers wait `backpressure_delay` once;
+      if it is still full the row is dropped and counted in `dropped`.
+      With `lossless=True` (regulatory tables) producers wait for space instead.
+    - A failed bulk INSERT is retried row by row; rows that still fail go to the
+      Redis dead-letter list `audit:dead_letter:<table>` and are counted in `dead_lettered`.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        batch_size: int = 100,
+        maxsize: int = 10_000,
+        flush_interval: float = 0.25,
+        backpressure_delay: float = 0.05,
+        lossless: bool = False,
+    ):
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.backpressure_delay = backpressure_delay
+        self.lossless = lossless
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.dead_lettered = 0
+        self._worker: Optional[asyncio.Task] = None
+        # INSERT en curso: sobrevive a la cancelación del worker y stop() lo espera
+        self._write_task: Optional[asyncio.Task] = None
+        _buffers.append(self)
+
+    async def put(self, row: Dict[str, Any]) -> None:
+        if self.lossless:
+            # Filas regulatorias: esperar hueco en la cola antes que descartar
+            await self.queue.put(row)
+            return
+        if self.queue.full():
+            await asyncio.sleep(self.backpressure_delay)
+        try:
+            self.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"⚠️ Audit buffer '{self.table}' full, event dropped (total dropped: {self.dropped})")
+
+    async def flush_batch(self) -> int:
+        """Espera al primer evento y agrupa los siguientes hasta `batch_size` o `flush_interval`."""
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        try:
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+                except TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            # Shutdown a mitad de lote: lo ya extraído de la cola no se pierde
+            await self._write(batch)
+            raise
+
+        # shield: cancelar el worker no aborta un INSERT en curso (stop() lo espera antes de cerrar el cliente)
+        self._write_task = asyncio.create_task(self._write(batch))
+        await asyncio.shield(self._write_task)
+        return len(batch)
+
+    @property
+    def dead_letter_key(self) -> str:
+        return f"audit:dead_letter:{self.table}"
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            db = await get_async_supabase()
+            await db.table(self.table).insert(batch).execute()
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                await self._dead_letter(batch[0], e)
+                return
+            logger.error(f"Failed to write {len(batch)} rows to {self.table}, retrying row by row: {e}")
+
+        # Una fila inválida no debe arrastrar al resto del lote
+        for row in batch:
+            try:
+                db = await get_async_supabase()
+                await db.table(self.table).insert(row).execute()
+            except Exception as e:
+                await self._dead_letter(row, e)
+
+    async def _dead_letter(self, row: Dict[str, Any], error: Exception) -> None:
+        """DEAD LETTER QUEUE (DLQ): la fila se conserva en Redis para reprocesarla luego."""
+        self.dead_lettered += 1
+        payload = json.dumps({"row": row, "error": str(error)}, default=str)
+        logger.error(f"Audit row for {self.table} failed, sent to dead letter: {error}")
+        try:
+            await redis_client.rpush(self.dead_letter_key, payload)
+        except Exception as redis_e:
+            logger.critical(f"🔥 CATASTROPHIC FAILURE: Could not save audit row to DLQ either: {redis_e} | {payload}")
+
+    async def _run(self):
+        while True:
+            await self.flush_batch()
+
+    def start(self):
+        """Arranca el consumidor (lifespan startup)."""
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Detiene el consumidor, espera el INSERT en curso y vuelca lo pendiente (nada se pierde en el shutdown)."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._write_task is not None:
+            await self._write_task
+            self._write_task = None
+
+        while not self.queue.empty():
+            batch = []
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            await self._write(batch)
+
+
+def start_audit_buffers():
+    """Lifespan startup: un consumidor por tabla registrada."""
+    for buffer in _buffers:
+        buffer.start()
+
+
+async def stop_audit_buffers():
+    """Lifespan shutdown: vuelca todas las colas pendientes."""
+    await asyncio.gather(*(buffer.stop() for buffer in _buffers))
@@ -0,0 +1,32 @@
+# app/services/audit_chain.py
+"""
+Write-behind appends to the EU AI Act audit trail (Article 12).
+
+Endpoints hand rows to `append_async` and return; one consumer drains the queue
+and inserts up to `AUDIT_TRAIL_BUFFER_BATCH_SIZE` rows (default 100) per PostgREST
+round trip, or whatever arrived within `AUDIT_TRAIL_BUFFER_FLUSH_INTERVAL` (50ms).
+
+The hash chain stays in Postgres: the `set_ai_act_audit_hash` trigger runs per row
+under the tenant's chain-head row lock, so the rows of a batch are chained in
+insert order and the single-writer invariant holds across replicas too.
+
+Rows are never dropped: a full queue makes the (background) producer wait, and rows
+a batch INSERT rejects are retried one by one, then parked in the Redis dead letter.
+"""
+from typing import Any, Dict
+
+from app.config import settings
+from app.services.audit_buffer import AuditLogBuffer
+from app.utils.tasks import fire
+
+ai_act_audit_buffer = AuditLogBuffer(
+    "ai_act_audit_log",
+    batch_size=settings.AUDIT_TRAIL_BUFFER_BATCH_SIZE,
+    flush_interval=settings.AUDIT_TRAIL_BUFFER_FLUSH_INTERVAL,
+    lossless=True,
+)
+
+
+def append_async(row: Dict[str, Any]) -> None:
+    """Fire-and-forget: encola la fila sin bloquear la respuesta (ni por backpressure)."""
+    fire(ai_act_audit_buffer.put(row))
@@ -10,7 +10,31 @@ from app.services.carbon_oracle import fetch_real_carbon_intensity
 logger = logging.getLogger("agentshield.carbon")
 
 
+# Cada cuánto se refresca el snapshot de factores de energía (dato de cambio lento)
+ENERGY_CONFIG_REFRESH_SECONDS = 60
+
+
 class CarbonGovernor:
+    def __init__(self):
+        # Snapshot en memoria: los endpoints lo leen sin await (ver run_refresh_loop)
+        self._energy_config: dict = {"default": 0.001}
+
+    def get_dynamic_config_cached(self) -> dict:
+        """Último snapshot de get_dynamic_config (read-only, sin I/O)."""
+        return self._energy_config
+
+    async def run_refresh_loop(self, interval: float = ENERGY_CONFIG_REFRESH_SECONDS):
+        """Background task (lifespan): refresca el snapshot periódicamente."""
+        while True:
+            try:
+                # Reemplazo atómico: un lector nunca ve un dict a medio actualizar
+                self._energy_config = await self.get_dynamic_config()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Energy config refresh failed: {e}")
+            await asyncio.sleep(interval)
+
     async def get_dynamic_config(self) -> dict:
         """Obtiene factores de energía y límites de la DB/Redis."""
         try:
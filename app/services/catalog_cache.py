@@ -0,0 +1,110 @@
+# app/services/catalog_cache.py
+"""
+In-process TTL cache for catalog name -> UUID lookups (tools & departments).
+
+Names change rarely but every policy creation used to resolve them against
+Supabase. Hits are served from memory; other replicas are told to drop stale
+entries through a Redis pub/sub channel whenever the catalog is written.
+"""
+import asyncio
+import json
+import logging
+from typing import Dict, Optional
+
+from cachetools import TTLCache
+
+from app.db import get_async_supabase, redis_client
+
+logger = logging.getLogger("agentshield.catalog_cache")
+
+CATALOG_INVALIDATION_CHANNEL = "catalog:invalidate"
+
+
+def catalog_version_key(tenant_id: str) -> str:
+    """Contador por tenant que avanza en cada escritura del catálogo (versiona cachés derivadas)."""
+    return f"catalog:version:{tenant_id}"
+
+
+# (kind, tenant_id, name) -> id
+_cache: TTLCache = TTLCache(maxsize=10_000, ttl=300)
+# Singleflight: una sola consulta en vuelo por clave; todos los que llegan mientras tanto
+# comparten su resultado (también el "no existe", que no se cachea)
+_inflight: Dict[tuple, asyncio.Task] = {}
+
+
+async def _lookup(kind: str, tenant_id: str, name: str) -> Optional[str]:
+    db = await get_async_supabase()
+    if kind == "tool":
+        q = db.table("tool_definitions").select("id").eq("name", name)
+    else:
+        q = db.table("departments").select("id").ilike("name", name)
+    res = await q.eq("tenant_id", tenant_id).limit(1).execute()
+    return res.data[0]["id"] if res.data else None
+
+
+async def _resolve(kind: str, tenant_id: str, name: str) -> Optional[str]:
+    key = (kind, tenant_id, name.lower() if kind == "dept" else name)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    # Un solo fetch por clave aunque lleguen N peticiones a la vez (anti-stampede)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_lookup_and_cache(key, kind, tenant_id, name))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: si un llamante se cancela, la consulta sigue para el resto
+    return await asyncio.shield(task)
+
+
+async def _lookup_and_cache(key: tuple, kind: str, tenant_id: str, name: str) -> Optional[str]:
+    value = await _lookup(kind, tenant_id, name)
+    # Los "no existe" no se cachean: el Copilot puede registrar la tool en cualquier momento
+    if value is not None:
+        _cache[key] = value
+    return value
+
+
+async def resolve_tool_id(tenant_id: str, name: str) -> Optional[str]:
+    """Returns the tool_definitions.id for `name` in the tenant catalog, or None."""
+    return await _resolve("tool", tenant_id, name)
+
+
+async def resolve_dept_id(tenant_id: str, name: str) -> Optional[str]:
+    """Returns the departments.id matching `name` (case-insensitive), or None."""
+    return await _resolve("dept", tenant_id, name)
+
+
+def invalidate_local(tenant_id: str) -> None:
+    for key in [k for k in list(_cache.keys()) if k[1] == tenant_id]:
+        _cache.pop(key, None)
+
+
+async def invalidate_catalog(tenant_id: str) -> None:
+    """Drops the tenant entries here and on every other replica, and bumps the catalog version."""
+    invalidate_local(tenant_id)
+    try:
+        await redis_client.incr(catalog_version_key(tenant_id))
+        await redis_client.publish(CATALOG_INVALIDATION_CHANNEL, json.dumps({"tenant_id": tenant_id}))
+    except Exception as e:
+        logger.warning(f"⚠️ Catalog invalidation publish failed: {e}")
+
+
+async def run_invalidation_listener():
+    """Background subscriber (lifespan): applies invalidations published by other replicas."""
+    try:
+        pubsub = redis_client.pubsub()
+        await pubsub.subscribe(CATALOG_INVALIDATION_CHANNEL)
+        async for message in pubsub.listen():
+            if message.get("type") != "message":
+                continue
+            try:
+                invalidate_local(json.loads(message["data"])["tenant_id"])
+            except (ValueError, KeyError, TypeError):
+                continue
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        # Sin Redis el TTL (5 min) sigue acotando la obsolescencia
+        logger.warning(f"⚠️ Catalog invalidation listener stopped: {e}")
@@ -6,7 +6,7 @@ from datetime import datetime, timedelta
 
 from fpdf import FPDF
 
-import app.services.crypto_signer as crypto_signer  # Reutilizamos tu motor de firma RSA
+import app.services.crypto_signer as crypto_signer  # Reutilizamos tu motor de firma Ed25519
 from app.config import settings
 from app.db import supabase
 
@@ -5,9 +5,9 @@ import json
 import logging
 import os
 
-from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
 
 logger = logging.getLogger("agentshield.crypto")
 
@@ -41,9 +41,9 @@ def load_private_key():
 
     # 2. Fallback: Archivo Local (Desarrollo)
     if not os.path.exists(PRIVATE_KEY_PATH):
-        logger.info("🔑 Generating new RSA 2048 Keypair for Digital Notary...")
+        logger.info("🔑 Generating new Ed25519 Keypair for Digital Notary...")
         # Generar una si no existe (Solo para setup inicial)
-        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        private_key = Ed25519PrivateKey.generate()
 
         # Guardar en disco (¡Protege este archivo!)
         os.makedirs(CERT_DIR, exist_ok=True)
@@ -74,6 +74,21 @@ def load_private_key():
 # Singleton loader
 _signer_key = load_private_key()
 
+# Las claves RSA ya desplegadas (ENV / certs) siguen firmando con PSS para no romper a los verificadores;
+# toda clave nueva es Ed25519 (firma ~10x más barata y 64 bytes en vez de 256)
+SIGNATURE_ALGORITHM = "Ed25519" if isinstance(_signer_key, Ed25519PrivateKey) else "RSA-PSS-SHA256"
+if SIGNATURE_ALGORITHM != "Ed25519":
+    logger.warning("⚠️ Legacy RSA signing key loaded. Rotate to Ed25519 to cut signing cost.")
+
+
+def canonical_json(payload) -> bytes:
+    """
+    Bytes deterministas que se firman: keys ordenadas, sin espacios y non-ASCII escapado (\\uXXXX).
+    Es la forma canónica histórica (json.dumps); los verificadores externos la reconstruyen byte a byte,
+    así que no debe cambiar con el algoritmo de firma (orjson emitiría UTF-8 crudo).
+    """
+    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
 
 def sign_payload(payload: dict) -> str:
     """
@@ -81,15 +96,17 @@ def sign_payload(payload: dict) -> str:
     Garantiza: Autenticidad (Fuiste tú) e Integridad (No se modificó ni un bit).
     """
     # 1. Canonicalizar el JSON (ordenar keys para que el hash sea estable)
-    # separators=(',', ':') elimina espacios en blanco para consistencia estricta
-    payload_bytes = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
-
-    # 2. Firmar con SHA256 + RSA PSS (Probabilistic Signature Scheme - Recommended)
-    signature = _signer_key.sign(
-        payload_bytes,
-        padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH),
-        hashes.SHA256(),
-    )
+    payload_bytes = canonical_json(payload)
+
+    # 2. Firmar: Ed25519 (determinista) o, para claves heredadas, SHA256 + RSA PSS
+    if isinstance(_signer_key, Ed25519PrivateKey):
+        signature = _signer_key.sign(payload_bytes)
+    else:
+        signature = _signer_key.sign(
+            payload_bytes,
+            padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH),
+            hashes.SHA256(),
+        )
 
     return base64.b64encode(signature).decode("utf-8")
 
@@ -100,26 +117,15 @@ def hash_content(data: dict) -> str:
     return hashlib.sha256(payload_bytes).hexdigest()
 
 
+_public_key_pem = _signer_key.public_key().public_bytes(
+    encoding=serialization.Encoding.PEM,
+    format=serialization.PublicFormat.SubjectPublicKeyInfo,
+).decode("utf-8")
+
+
 def get_public_key_pem() -> str:
     """
     Retorna la clave pública en formato PEM para adjuntar en paquetes de evidencia.
+    Se deriva de la clave que firma, así nunca se publica una clave que no corresponde.
     """
-    # 1. Intentar desde ENV
-    en_pub = os.getenv("PUBLIC_KEY_PEM")
-    if en_pub:
-        return en_pub
-
-    # 2. Intentar desde archivo
-    if os.path.exists(PUBLIC_KEY_PATH):
-        with open(PUBLIC_KEY_PATH, "r") as f:
-            return f.read()
-
-    # 3. Extraer del objeto signer (fallback final)
-    if _signer_key:
-        public_key = _signer_key.public_key()
-        return public_key.public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo,
-        ).decode("utf-8")
-
-    return "-----BEGIN PUBLIC KEY-----\nKEY_NOT_CONFIGURED\n-----END PUBLIC KEY-----"
+    return _public_key_pem
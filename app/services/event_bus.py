@@ -3,6 +3,7 @@ import json
 import logging
 
 import httpx
+from pydantic import BaseModel
 
 from app.db import redis_client, supabase
 
@@ -15,14 +16,18 @@ class EventBus:
         tenant_id: str,
         event_type: str,
         severity: str,
-        details: dict,
+        details: BaseModel | dict,
         actor_id: str = None,
         trace_id: str = None,
     ):
         """
         Publica un evento en el sistema.
         Dispara: Persistencia -> Notificaciones -> Automatización.
+        `details` puede ser el modelo Pydantic tal cual: se serializa aquí, fuera del request.
         """
+        if isinstance(details, BaseModel):
+            details = details.model_dump(mode="json")
+
         # 1. PERSISTENCIA (Audit Log)
         try:
             event_data = {
@@ -3,12 +3,13 @@
 EU AI Act Human-in-the-Loop Workflow (Article 14).
 Manages approval queue for HIGH_RISK AI operations.
 """
+import asyncio
 import logging
 from typing import Dict, Optional
 from uuid import UUID
 from datetime import datetime, timedelta
 
-from app.database import get_supabase
+from app.db import get_async_supabase
 from app.services.eu_ai_act_classifier import RiskLevel, RiskCategory
 
 logger = logging.getLogger("agentshield.human_approval")
@@ -18,11 +19,9 @@ class HumanApprovalQueue:
     """
     Revolutionary Human-in-the-Loop System (EU AI Act Article 14).
     Manages approval workflow for HIGH_RISK operations.
+    All queries go through the native async Supabase client (no executor hops).
     """
     
-    def __init__(self):
-        self.supabase = get_supabase()
-    
     async def create_approval_request(
         self,
         tenant_id: str,
@@ -36,8 +35,6 @@ class HumanApprovalQueue:
         classification_confidence: float
     ) -> str:
         """Create a new approval request in the queue."""
-        import asyncio
-        loop = asyncio.get_running_loop()
         try:
             data = {
                 "tenant_id": tenant_id,
@@ -53,10 +50,8 @@ class HumanApprovalQueue:
                 "expires_at": (datetime.utcnow() + timedelta(hours=24)).isoformat()
             }
             
-            def _insert():
-                return self.supabase.table("ai_act_approval_queue").insert(data).execute()
-
-            result = await loop.run_in_executor(None, _insert)
+            db = await get_async_supabase()
+            result = await db.table("ai_act_approval_queue").insert(data).execute()
             
             approval_id = result.data[0]["id"]
             
@@ -77,26 +72,27 @@ class HumanApprovalQueue:
     async def approve_request(
         self,
         approval_id: str,
+        tenant_id: str,
         approver_id: str,
         approval_note: Optional[str] = None
     ) -> bool:
-        """Approve a pending request."""
-        import asyncio
-        loop = asyncio.get_running_loop()
+        """
+        Approve a pending request of the tenant.
+        Tenant isolation lives in the UPDATE's WHERE: False means not found, foreign or already decided.
+        """
         try:
-            def _update():
-                return self.supabase.table("ai_act_approval_queue")\
-                    .update({
-                        "status": "APPROVED",
-                        "approver_id": approver_id,
-                        "approval_note": approval_note,
-                        "decided_at": datetime.utcnow().isoformat()
-                    })\
-                    .eq("id", approval_id)\
-                    .eq("status", "PENDING")\
-                    .execute()
-
-            result = await loop.run_in_executor(None, _update)
+            db = await get_async_supabase()
+            result = await db.table("ai_act_approval_queue")\
+                .update({
+                    "status": "APPROVED",
+                    "approver_id": approver_id,
+                    "approval_note": approval_note,
+                    "decided_at": datetime.utcnow().isoformat()
+                })\
+                .eq("id", approval_id)\
+                .eq("tenant_id", tenant_id)\
+                .eq("status", "PENDING")\
+                .execute()
             
             if result.data:
                 logger.info(f"✅ Approval granted: {approval_id} by approver {approver_id}")
@@ -112,26 +108,24 @@ class HumanApprovalQueue:
     async def reject_request(
         self,
         approval_id: str,
+        tenant_id: str,
         approver_id: str,
         rejection_reason: str
     ) -> bool:
-        """Reject a pending request."""
-        import asyncio
-        loop = asyncio.get_running_loop()
+        """Reject a pending request of the tenant (same single-UPDATE isolation as approve_request)."""
         try:
-            def _update():
-                return self.supabase.table("ai_act_approval_queue")\
-                    .update({
-                        "status": "REJECTED",
-                        "approver_id": approver_id,
-                        "rejection_reason": rejection_reason,
-                        "decided_at": datetime.utcnow().isoformat()
-                    })\
-                    .eq("id", approval_id)\
-                    .eq("status", "PENDING")\
-                    .execute()
-
-            result = await loop.run_in_executor(None, _update)
+            db = await get_async_supabase()
+            result = await db.table("ai_act_approval_queue")\
+                .update({
+                    "status": "REJECTED",
+                    "approver_id": approver_id,
+                    "rejection_reason": rejection_reason,
+                    "decided_at": datetime.utcnow().isoformat()
+                })\
+                .eq("id", approval_id)\
+                .eq("tenant_id", tenant_id)\
+                .eq("status", "PENDING")\
+                .execute()
             
             if result.data:
                 logger.info(f"❌ Approval rejected: {approval_id} by approver {approver_id}")
@@ -143,46 +137,56 @@ class HumanApprovalQueue:
             logger.error(f"Failed to reject request: {e}")
             return False
     
-    async def get_pending_approvals(self, tenant_id: str, limit: int = 50) -> list:
-        """Get pending approvals for a tenant."""
-        import asyncio
-        loop = asyncio.get_running_loop()
+    async def get_pending_approvals(self, tenant_id: str, limit: int = 50, columns: str = "*") -> list:
+        """Get pending approvals for a tenant (`columns` narrows the projection, e.g. to skip full_request)."""
         try:
-            def _select():
-                return self.supabase.table("ai_act_approval_queue")\
-                    .select("*")\
-                    .eq("tenant_id", tenant_id)\
-                    .eq("status", "PENDING")\
-                    .order("created_at", desc=True)\
-                    .limit(limit)\
-                    .execute()
-
-            result = await loop.run_in_executor(None, _select)
+            db = await get_async_supabase()
+            result = await db.table("ai_act_approval_queue")\
+                .select(columns)\
+                .eq("tenant_id", tenant_id)\
+                .eq("status", "PENDING")\
+                .order("created_at", desc=True)\
+                .limit(limit)\
+                .execute()
             return result.data
             
         except Exception as e:
             logger.error(f"Failed to get pending approvals: {e}")
             return []
     
-    async def get_approval_status(self, approval_id: str) -> Optional[Dict]:
-        """Check status of an approval request."""
-        import asyncio
-        loop = asyncio.get_running_loop()
+    async def get_approval_status(self, approval_id: str, columns: str = "*") -> Optional[Dict]:
+        """Check status of an approval request (`columns` narrows the projection for pollers)."""
         try:
-            def _select():
-                return self.supabase.table("ai_act_approval_queue")\
-                    .select("*")\
-                    .eq("id", approval_id)\
-                    .single()\
-                    .execute()
-
-            result = await loop.run_in_executor(None, _select)
-            return result.data
+            db = await get_async_supabase()
+            result = await db.table("ai_act_approval_queue")\
+                .select(columns)\
+                .eq("id", approval_id)\
+                .limit(1)\
+                .execute()
+            return result.data[0] if result.data else None
             
         except Exception as e:
             logger.error(f"Failed to get approval status: {e}")
             return None
     
+    async def get_approval_for_tenant(
+        self, approval_id: str, tenant_id: str, columns: str = "*"
+    ) -> Optional[Dict]:
+        """Fetch an approval only if it belongs to `tenant_id` (foreign and missing look the same)."""
+        try:
+            db = await get_async_supabase()
+            result = await db.table("ai_act_approval_queue")\
+                .select(columns)\
+                .eq("id", approval_id)\
+                .eq("tenant_id", tenant_id)\
+                .limit(1)\
+                .execute()
+            return result.data[0] if result.data else None
+
+        except Exception as e:
+            logger.error(f"Failed to get approval for tenant: {e}")
+            return None
+    
     async def wait_for_approval(
         self,
         approval_id: str,
@@ -192,12 +196,11 @@ class HumanApprovalQueue:
         Wait for approval decision (polling).
         Returns True if approved, False if rejected/expired/timeout.
         """
-        import asyncio
-        
         start_time = datetime.utcnow()
         
         while True:
-            status = await self.get_approval_status(approval_id)
+            # Solo la columna que decide el bucle: cada sondeo trae unos bytes, no el full_request
+            status = await self.get_approval_status(approval_id, columns="status")
             
             if not status:
                 return False
@@ -224,22 +227,19 @@ class HumanApprovalQueue:
         risk_category: RiskCategory
     ):
         """Send notifications to designated approvers."""
-        import asyncio
-        loop = asyncio.get_running_loop()
 
         logger.info(
             f"📧 Notification sent for approval {approval_id} "
             f"(tenant: {tenant_id}, category: {risk_category})"
         )
         
-        # Mark notification as sent (using executor)
+        # Mark notification as sent
         try:
-            def _update_notif():
-                self.supabase.table("ai_act_approval_queue")\
-                    .update({"notification_sent": True})\
-                    .eq("id", approval_id)\
-                    .execute()
-            await loop.run_in_executor(None, _update_notif)
+            db = await get_async_supabase()
+            await db.table("ai_act_approval_queue")\
+                .update({"notification_sent": True})\
+                .eq("id", approval_id)\
+                .execute()
         except:
             pass
 
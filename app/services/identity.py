@@ -1,6 +1,8 @@
 import asyncio
 import json
 import logging
+from enum import IntEnum
+from typing import Optional
 
 from fastapi import Header, HTTPException
 from jose import JWTError, jwt
@@ -14,6 +16,29 @@ SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 
 
+class Rank(IntEnum):
+    """Jerarquía RBAC: mayor valor = más autoridad."""
+
+    OBSERVER = 10
+    MEMBER = 20
+    MANAGER = 60
+    ADMIN = 80
+    OWNER = 100
+
+
+_RANK_BY_ROLE = {rank.name.lower(): int(rank) for rank in Rank}
+
+
+def rank_for_role(role: Optional[str]) -> int:
+    """Rank of a role name (case-insensitive); 0 for unknown or missing roles."""
+    if not role:
+        return 0
+    rank = _RANK_BY_ROLE.get(role)
+    if rank is None:
+        rank = _RANK_BY_ROLE.get(role.lower(), 0)
+    return rank
+
+
 class VerifiedIdentity:
     def __init__(self, user_id, email, dept_id, tenant_id, role):
         self.user_id = user_id
@@ -21,6 +46,13 @@ class VerifiedIdentity:
         self.dept_id = dept_id  # El "Cost Center" departamental
         self.tenant_id = tenant_id  # La Empresa
         self.role = role  # admin, manager, user
+        # Resuelto una vez al verificar el JWT: los chequeos jerárquicos son una comparación de enteros
+        self.role_rank = rank_for_role(role)
+
+
+def warm_up_verifier() -> None:
+    """Arranque: firma y verifica un token desechable para cargar el backend criptográfico de jose."""
+    jwt.decode(jwt.encode({"sub": "warmup"}, SECRET_KEY, algorithm=ALGORITHM), SECRET_KEY, algorithms=[ALGORITHM])
 
 
 async def verify_identity_envelope(authorization: str = Header(...)) -> VerifiedIdentity:
@@ -1,11 +1,14 @@
 # app/services/policy_copilot.py
+import asyncio
+import hashlib
 import json
 import logging
-from typing import Dict, List
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
 
 from litellm import completion
 
-from app.db import supabase
+from app.db import get_async_supabase, redis_client
+from app.services.catalog_cache import catalog_version_key
 
 logger = logging.getLogger("agentshield.copilot")
 
@@ -49,15 +52,13 @@ Output: {{ "tool_name": "google_ads", "target_dept": "marketing", "action": "REQ
 """
 
 
-async def generate_policy_json(tenant_id: str, user_prompt: str) -> dict:
-    """
-    Toma una orden verbal y devuelve la estructura para 'tool_policies'.
-    """
-
+async def _build_messages(tenant_id: str, user_prompt: str) -> List[Dict[str, str]]:
+    """Prompt de sistema con el catálogo real del tenant + intención del admin."""
     # 1. Obtener herramientas reales para dar contexto a la IA
     try:
-        res = (
-            supabase.table("tool_definitions")
+        db = await get_async_supabase()
+        res = await (
+            db.table("tool_definitions")
             .select("name, description")
             .eq("tenant_id", tenant_id)
             .execute()
@@ -74,6 +75,17 @@ async def generate_policy_json(tenant_id: str, user_prompt: str) -> dict:
 
     # 2. Inyectar en el Prompt
     final_prompt = SYSTEM_PROMPT_TEMPLATE.format(tools_catalog=catalog_str)
+    return [
+        {"role": "system", "content": final_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+async def generate_policy_json(tenant_id: str, user_prompt: str) -> dict:
+    """
+    Toma una orden verbal y devuelve la estructura para 'tool_policies'.
+    """
+    messages = await _build_messages(tenant_id, user_prompt)
 
     # 3. Llamada al LLM Asíncrona (Non-blocking)
     try:
@@ -81,10 +93,7 @@ async def generate_policy_json(tenant_id: str, user_prompt: str) -> dict:
         
         response = await acompletion(
             model="gpt-4o",
-            messages=[
-                {"role": "system", "content": final_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+            messages=messages,
             temperature=0.0,
             response_format={"type": "json_object"},
         )
@@ -101,6 +110,90 @@ async def generate_policy_json(tenant_id: str, user_prompt: str) -> dict:
         }
 
 
+# Singleflight: prompts idénticos en vuelo (mismo tenant) comparten una sola llamada al LLM
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+def _prompt_key(tenant_id: str, user_prompt: str) -> str:
+    normalized = " ".join(user_prompt.lower().split())
+    return hashlib.blake2b(f"{tenant_id}|{normalized}".encode(), digest_size=16).hexdigest()
+
+
+async def coalesced_generate(tenant_id: str, user_prompt: str) -> dict:
+    """
+    `generate_policy_json` con coalescing de peticiones concurrentes duplicadas
+    (doble submit de la UI, varios admins probando la misma regla).
+    """
+    key = _prompt_key(tenant_id, user_prompt)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(generate_policy_json(tenant_id, user_prompt))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: si un cliente se desconecta, la generación sigue para el resto
+    return await asyncio.shield(task)
+
+
+# Borradores cacheados por contenido (tenant + prompt normalizado): 0 tokens para prompts repetidos.
+# Cada entrada guarda la versión del catálogo con la que se generó: un cambio de herramientas la invalida.
+DRAFT_CACHE_TTL = 86400  # 24h
+
+
+async def cached_generate(
+    tenant_id: str,
+    user_prompt: str,
+    validate: Optional[Callable[[dict], dict]] = None,
+) -> Tuple[dict, bool]:
+    """
+    Redis (compartido entre workers) -> singleflight -> LLM.
+    Devuelve (draft, cache_hit). Los errores del LLM no se cachean; con `validate`, tampoco
+    los borradores que no lo superan (la excepción del validador se propaga sin escribir en Redis).
+    """
+    key = f"copilot:draft:{_prompt_key(tenant_id, user_prompt)}"
+    version = None
+    try:
+        # Un solo round-trip: borrador + versión actual del catálogo del tenant
+        cached, version = await redis_client.mget(key, catalog_version_key(tenant_id))
+        if cached:
+            entry = json.loads(cached)
+            if "draft" in entry and entry.get("catalog_version") == version:
+                return entry["draft"], True
+    except Exception as e:
+        logger.warning(f"Copilot draft cache read failed: {e}")
+
+    draft = await coalesced_generate(tenant_id, user_prompt)
+    if "error" in draft:
+        return draft, False
+    if validate is not None:
+        draft = validate(draft)
+    try:
+        entry = {"catalog_version": version, "draft": draft}
+        await redis_client.set(key, json.dumps(entry), ex=DRAFT_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Copilot draft cache write failed: {e}")
+    return draft, False
+
+
+async def stream_policy_json(tenant_id: str, user_prompt: str) -> AsyncIterator[str]:
+    """
+    Igual que `generate_policy_json` pero emite los fragmentos de texto del LLM según llegan.
+    El consumidor acumula el JSON (y puede actuar en cuanto aparece `tool_name`).
+    """
+    from litellm import acompletion
+
+    response = await acompletion(
+        model="gpt-4o",
+        messages=await _build_messages(tenant_id, user_prompt),
+        temperature=0.0,
+        response_format={"type": "json_object"},
+        stream=True,
+    )
+    async for chunk in response:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            yield delta
+
+
 async def generate_custom_pii_rule(user_prompt: str) -> dict:
     """
     Genera una regla Regex a partir de una descripción natural.
@@ -10,7 +10,7 @@ from typing import Any
 
 from app.db import supabase
 from app.services.carbon import carbon_governor
-from app.services.crypto_signer import hash_content, sign_payload
+from app.services.crypto_signer import SIGNATURE_ALGORITHM, hash_content, sign_payload
 from app.services.market_pricing import estimate_cost
 
 logger = logging.getLogger("agentshield.auditor")
@@ -21,7 +21,7 @@ async def create_forensic_receipt(
 ) -> dict:
     """
     Genera un recibo firmado, encadenado al anterior y listo para auditoría.
-    Implementa: Hash Chaining + RSA Signing con DATOS REALES.
+    Implementa: Hash Chaining + Ed25519 Signing con DATOS REALES.
     """
 
     # 1. OBTENER EL ÚLTIMO HASH (CHAINING)
@@ -56,7 +56,7 @@ async def create_forensic_receipt(
         "transaction": transaction_data,
         "governance": policy_snapshot,
         "integrity": {
-            "signature_algorithm": "RSA-SHA256",
+            "signature_algorithm": SIGNATURE_ALGORITHM,
             "policy_version_hash": hash_content(policy_snapshot),
         },
     }
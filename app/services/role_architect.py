@@ -2,7 +2,7 @@ import json
 import logging
 from typing import Any, Dict, Optional
 
-from app.db import supabase
+from app.db import get_async_supabase
 from app.services.llm_gateway import execute_with_resilience
 
 logger = logging.getLogger("agentshield.role_architect")
@@ -56,8 +56,10 @@ class RoleArchitect:
 
             # Persistimos en la tabla de definiciones
             # Upsert logic: if exists based on unique constraint (tenant, dept, function)
-            res = (
-                supabase.table("role_definitions")
+            # Cliente async nativo (pool httpx HTTP/2 compartido): sin saltos al executor
+            db = await get_async_supabase()
+            res = await (
+                db.table("role_definitions")
                 .upsert(
                     {
                         "tenant_id": tenant_id,
@@ -0,0 +1,96 @@
+# app/services/role_cache.py
+"""
+L1 in-process cache for `role_definitions` rows keyed by (tenant_id, role_id).
+
+Role definitions rarely change but `delete_role` / `simulate_access` used to
+fetch them on every call. Writes invalidate locally and broadcast on a Redis
+channel so other replicas drop their copy too (L2 invalidation).
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+
+from app.db import get_async_supabase, redis_client
+
+logger = logging.getLogger("agentshield.role_cache")
+
+ROLE_INVALIDATION_CHANNEL = "roles:invalidate"
+
+# Lo que leen delete_role y simulate_access; evita traer metadata/blobs al caché
+ROLE_DEF_COLUMNS = "id,tenant_id,function,system_persona,pii_policy,allowed_modes"
+
+_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+# Locks fragmentados: acotan la memoria y evitan N fetches concurrentes de la misma clave
+_LOCK_SHARDS = 16
+_locks = [asyncio.Lock() for _ in range(_LOCK_SHARDS)]
+
+
+async def _fetch(tenant_id: str, role_id: int) -> Optional[Dict[str, Any]]:
+    db = await get_async_supabase()
+    res = await db.table("role_definitions")\
+        .select(ROLE_DEF_COLUMNS)\
+        .eq("id", role_id)\
+        .eq("tenant_id", tenant_id)\
+        .limit(1)\
+        .execute()
+    return res.data[0] if res.data else None
+
+
+async def get_role_def(tenant_id: str, role_id: int) -> Optional[Dict[str, Any]]:
+    """Returns the tenant's role definition row, or None if it does not exist."""
+    key = (str(tenant_id), role_id)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    async with _locks[hash(key) % _LOCK_SHARDS]:
+        cached = _cache.get(key)
+        if cached is not None:
+            return cached
+        row = await _fetch(tenant_id, role_id)
+        if row is not None:
+            _cache[key] = row
+        return row
+
+
+def invalidate_local(tenant_id: str, role_id: Optional[int] = None) -> None:
+    tenant_id = str(tenant_id)
+    if role_id is not None:
+        _cache.pop((tenant_id, role_id), None)
+        return
+    for key in [k for k in list(_cache.keys()) if k[0] == tenant_id]:
+        _cache.pop(key, None)
+
+
+async def invalidate_role(tenant_id: str, role_id: Optional[int] = None) -> None:
+    """Drops one role (or every role of the tenant) here and on every other replica."""
+    invalidate_local(tenant_id, role_id)
+    try:
+        await redis_client.publish(
+            ROLE_INVALIDATION_CHANNEL, json.dumps({"tenant_id": str(tenant_id), "role_id": role_id})
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Role invalidation publish failed: {e}")
+
+
+async def run_invalidation_listener():
+    """Background subscriber (lifespan): applies invalidations published by other replicas."""
+    try:
+        pubsub = redis_client.pubsub()
+        await pubsub.subscribe(ROLE_INVALIDATION_CHANNEL)
+        async for message in pubsub.listen():
+            if message.get("type") != "message":
+                continue
+            try:
+                payload = json.loads(message["data"])
+                invalidate_local(payload["tenant_id"], payload.get("role_id"))
+            except (ValueError, KeyError, TypeError):
+                continue
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        # Sin Redis el TTL (60s) sigue acotando la obsolescencia
+        logger.warning(f"⚠️ Role invalidation listener stopped: {e}")
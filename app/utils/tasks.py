@@ -0,0 +1,61 @@
+# agentshield_core/app/utils/tasks.py
+import asyncio
+import inspect
+import logging
+from typing import Any, Callable, Coroutine, List, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger("agentshield.tasks")
+
+# El event loop solo guarda referencias débiles a las tareas: sin este set,
+# una tarea "fire-and-forget" puede ser recolectada por el GC a mitad de ejecución.
+_bg_tasks: set = set()
+
+
+def fire(coro: Coroutine) -> asyncio.Task:
+    """
+    Lanza una corrutina desacoplada de la request (no bloquea la respuesta
+    ni el ciclo de cleanup de BackgroundTasks). Los errores se registran, no se propagan.
+    """
+    task = asyncio.create_task(coro)
+    _bg_tasks.add(task)
+    task.add_done_callback(_on_done)
+    return task
+
+
+def _on_done(task: asyncio.Task) -> None:
+    _bg_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background task failed: {task.exception()!r}")
+
+
+class GatherBackgroundTasks:
+    """
+    Post-response tasks that run concurrently (`asyncio.gather`) instead of one after
+    another like Starlette's `BackgroundTasks`: wall time is max(N), not sum(N).
+
+    Register the whole group as a single task on the request's `BackgroundTasks`:
+    `background_tasks.add_task(group)`. A failing task is logged and never cancels its siblings.
+    """
+
+    def __init__(self):
+        # Se guardan las llamadas, no corrutinas: nada queda sin await si la request falla antes
+        self.tasks: List[Tuple[Callable, tuple, dict]] = []
+
+    def add_task(self, func: Callable, *args: Any, **kwargs: Any) -> None:
+        self.tasks.append((func, args, kwargs))
+
+    async def __call__(self) -> None:
+        results = await asyncio.gather(
+            *(
+                func(*args, **kwargs)
+                if inspect.iscoroutinefunction(func)
+                else run_in_threadpool(func, *args, **kwargs)
+                for func, args, kwargs in self.tasks
+            ),
+            return_exceptions=True,
+        )
+        for (func, _, _), result in zip(self.tasks, results, strict=True):
+            if isinstance(result, Exception):
+                logger.error(f"Background task {getattr(func, '__name__', func)!r} failed: {result!r}")
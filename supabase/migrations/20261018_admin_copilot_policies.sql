@@ -0,0 +1,62 @@
+-- Admin Copilot: Atomic Policy Creation
+-- Resolves tool/department, checks conflicts and inserts the policy in ONE transaction
+-- (replaces 3-4 sequential PostgREST round-trips and closes the check-then-insert race)
+
+CREATE OR REPLACE FUNCTION create_policy_atomic(
+    p_tenant_id UUID,
+    p_tool_name TEXT,
+    p_dept_name TEXT,
+    p_target_role TEXT,
+    p_action TEXT,
+    p_argument_rules JSONB,
+    p_approval_group TEXT,
+    p_created_by TEXT
+)
+RETURNS UUID AS $$
+DECLARE
+    v_tool_id UUID;
+    v_dept_id UUID;
+    v_policy_id UUID;
+BEGIN
+    -- 1. Anti-Hallucination: the tool must exist in the tenant catalog
+    SELECT id INTO v_tool_id
+    FROM tool_definitions
+    WHERE tenant_id = p_tenant_id AND name = p_tool_name
+    LIMIT 1;
+
+    IF v_tool_id IS NULL THEN
+        RAISE EXCEPTION 'TOOL_MISSING: %', p_tool_name;
+    END IF;
+
+    -- 2. Serialize concurrent creations for the same tenant/tool scope
+    PERFORM pg_advisory_xact_lock(hashtext(p_tenant_id::TEXT || ':' || v_tool_id::TEXT));
+
+    -- 3. Conflict Detection (NULL role = applies to ALL roles)
+    --    policy_conflict_exists: see 20261018_policy_conflict_exists.sql (partial index probe)
+    IF policy_conflict_exists(p_tenant_id, v_tool_id, p_target_role) THEN
+        RAISE EXCEPTION 'CONFLICT: %', p_tool_name;
+    END IF;
+
+    -- 4. Optional department scope
+    IF p_dept_name IS NOT NULL THEN
+        SELECT id INTO v_dept_id
+        FROM departments
+        WHERE tenant_id = p_tenant_id AND name ILIKE p_dept_name
+        LIMIT 1;
+    END IF;
+
+    -- 5. Insert
+    INSERT INTO tool_policies (
+        tenant_id, tool_id, target_dept_id, target_role, argument_rules,
+        action, approval_group, is_active, created_by
+    ) VALUES (
+        p_tenant_id, v_tool_id, v_dept_id, p_target_role, COALESCE(p_argument_rules, '{}'::jsonb),
+        p_action, p_approval_group, true, p_created_by
+    )
+    RETURNING id INTO v_policy_id;
+
+    RETURN v_policy_id;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION create_policy_atomic IS 'Admin Copilot: resolve tool/dept + conflict check + insert in one transaction';
@@ -0,0 +1,106 @@
+-- EU AI Act: Audit Chain Head Pointer (Article 12)
+-- The hash-chain trigger used to look up the previous hash with
+-- "ORDER BY created_at DESC LIMIT 1" on every append, and two concurrent appends
+-- could both read the same predecessor (forked chain). One row per tenant now
+-- holds the chain head: a primary-key lookup under FOR UPDATE serializes appends.
+
+ALTER TABLE ai_act_audit_log ADD COLUMN IF NOT EXISTS chain_seq BIGINT;
+
+CREATE TABLE IF NOT EXISTS ai_act_audit_chain_head (
+    tenant_id UUID PRIMARY KEY REFERENCES tenants(id) ON DELETE CASCADE,
+    last_hash TEXT,
+    last_seq BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Row Level Security: sin políticas para clientes. Solo el trigger (SECURITY DEFINER)
+-- lee y avanza la cabeza; anon/authenticated no pueden leerla ni reescribir last_hash/last_seq
+ALTER TABLE ai_act_audit_chain_head ENABLE ROW LEVEL SECURITY;
+REVOKE ALL ON TABLE ai_act_audit_chain_head FROM anon, authenticated;
+
+-- Backfill: existing rows get their position in creation order, heads point at the newest row
+UPDATE ai_act_audit_log l
+SET chain_seq = s.seq
+FROM (
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY tenant_id ORDER BY created_at, id) AS seq
+    FROM ai_act_audit_log
+) s
+WHERE l.id = s.id AND l.chain_seq IS NULL;
+
+INSERT INTO ai_act_audit_chain_head (tenant_id, last_hash, last_seq)
+SELECT DISTINCT ON (tenant_id) tenant_id, audit_hash, chain_seq
+FROM ai_act_audit_log
+ORDER BY tenant_id, chain_seq DESC
+ON CONFLICT (tenant_id) DO NOTHING;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ai_act_audit_chain ON ai_act_audit_log(tenant_id, chain_seq);
+
+-- 1. Append: read + advance the head in the same transaction as the INSERT
+CREATE OR REPLACE FUNCTION set_ai_act_audit_hash()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_previous_hash TEXT;
+    v_seq BIGINT;
+BEGIN
+    INSERT INTO ai_act_audit_chain_head (tenant_id)
+    VALUES (NEW.tenant_id)
+    ON CONFLICT (tenant_id) DO NOTHING;
+
+    -- Row lock held until commit: concurrent appends of the same tenant queue here
+    SELECT last_hash, last_seq + 1 INTO v_previous_hash, v_seq
+    FROM ai_act_audit_chain_head
+    WHERE tenant_id = NEW.tenant_id
+    FOR UPDATE;
+
+    NEW.audit_hash := compute_ai_act_audit_hash(
+        NEW.trace_id,
+        NEW.risk_level,
+        NEW.request_hash,
+        v_previous_hash
+    );
+    NEW.previous_audit_hash := v_previous_hash;
+    NEW.chain_seq := v_seq;
+
+    UPDATE ai_act_audit_chain_head
+    SET last_hash = NEW.audit_hash, last_seq = v_seq, updated_at = NOW()
+    WHERE tenant_id = NEW.tenant_id;
+
+    RETURN NEW;
+END;
+$$;
+
+-- 2. Server-side verification: recompute every link in chain order
+CREATE OR REPLACE FUNCTION verify_ai_act_audit_chain(p_tenant_id UUID)
+RETURNS TABLE (checked BIGINT, first_broken_trace_id TEXT) AS $$
+DECLARE
+    r RECORD;
+    v_prev TEXT := NULL;
+    v_checked BIGINT := 0;
+BEGIN
+    FOR r IN
+        SELECT trace_id, risk_level, request_hash, audit_hash, previous_audit_hash
+        FROM ai_act_audit_log
+        WHERE tenant_id = p_tenant_id
+        ORDER BY chain_seq
+    LOOP
+        IF r.previous_audit_hash IS DISTINCT FROM v_prev
+           OR r.audit_hash IS DISTINCT FROM compute_ai_act_audit_hash(
+                r.trace_id, r.risk_level, r.request_hash, r.previous_audit_hash
+           ) THEN
+            RETURN QUERY SELECT v_checked, r.trace_id;
+            RETURN;
+        END IF;
+        v_prev := r.audit_hash;
+        v_checked := v_checked + 1;
+    END LOOP;
+
+    RETURN QUERY SELECT v_checked, NULL::TEXT;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+COMMENT ON TABLE ai_act_audit_chain_head IS 'EU AI Act Article 12 - per-tenant head of the audit hash chain (serializes appends)';
+COMMENT ON FUNCTION verify_ai_act_audit_chain IS 'EU AI Act Article 12 - walks a tenant chain; first_broken_trace_id is NULL when intact';
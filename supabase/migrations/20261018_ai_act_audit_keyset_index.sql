@@ -0,0 +1,20 @@
+-- EU AI Act: Audit Trail Keyset Index (Article 12)
+-- GET /ai-act/audit pages with ORDER BY created_at DESC, trace_id DESC and a
+-- (created_at, trace_id) < cursor predicate. This index matches that order per tenant
+-- and carries the response columns, so each page is an index-only range scan
+-- with no sort and no heap fetch.
+
+CREATE INDEX IF NOT EXISTS idx_ai_act_audit_tenant_keyset ON ai_act_audit_log (
+    tenant_id, created_at DESC, trace_id DESC
+) INCLUDE (
+    risk_level,
+    risk_category,
+    classification_confidence,
+    required_human_approval,
+    approval_status,
+    transparency_disclosure_shown,
+    audit_hash
+);
+
+-- The new index leads with tenant_id, so the single-column one only adds write cost
+DROP INDEX IF EXISTS idx_ai_act_audit_tenant;
@@ -0,0 +1,38 @@
+-- EU AI Act: Compliance Summary (Article 12 reporting)
+-- One pass over the (tenant_id, risk_level, created_at) index with FILTER aggregates,
+-- so /ai-act/compliance-summary never ships audit rows to the application
+
+CREATE OR REPLACE FUNCTION get_compliance_summary(
+    p_tenant_id UUID,
+    p_from_date DATE,
+    p_to_date DATE
+)
+RETURNS JSONB AS $$
+    WITH per_level AS (
+        SELECT
+            risk_level,
+            COUNT(*) AS total,
+            COUNT(*) FILTER (WHERE required_human_approval) AS approvals_required,
+            COUNT(*) FILTER (WHERE approval_status = 'APPROVED') AS approved
+        FROM ai_act_audit_log
+        WHERE tenant_id = p_tenant_id
+          AND created_at >= p_from_date
+          AND created_at <= p_to_date
+        GROUP BY risk_level
+    )
+    SELECT jsonb_build_object(
+        'total_requests', COALESCE(SUM(total), 0),
+        'prohibited_blocked', COALESCE(SUM(total) FILTER (WHERE risk_level = 'PROHIBITED'), 0),
+        'high_risk_approvals_required', COALESCE(SUM(approvals_required), 0),
+        'high_risk_approved', COALESCE(SUM(approved), 0),
+        'risk_distribution', jsonb_build_object(
+            'PROHIBITED', COALESCE(SUM(total) FILTER (WHERE risk_level = 'PROHIBITED'), 0),
+            'HIGH_RISK', COALESCE(SUM(total) FILTER (WHERE risk_level = 'HIGH_RISK'), 0),
+            'LIMITED_RISK', COALESCE(SUM(total) FILTER (WHERE risk_level = 'LIMITED_RISK'), 0),
+            'MINIMAL_RISK', COALESCE(SUM(total) FILTER (WHERE risk_level = 'MINIMAL_RISK'), 0)
+        )
+    )
+    FROM per_level;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION get_compliance_summary IS 'EU AI Act: per-tenant compliance counters for a date range (Article 12 reports)';
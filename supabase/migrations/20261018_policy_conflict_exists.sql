@@ -0,0 +1,25 @@
+-- Admin Copilot: Policy Conflict Check
+-- Single EXISTS probe over a partial index (no row payload, one predicate for NULL roles)
+
+-- COALESCE(target_role, '') folds the NULL role ("applies to ALL roles") into an indexable key.
+-- Equivalent to IS NOT DISTINCT FROM because roles are never the empty string.
+CREATE INDEX IF NOT EXISTS tool_policies_conflict_idx
+    ON tool_policies (tenant_id, tool_id, (COALESCE(target_role, '')))
+    WHERE is_active;
+
+CREATE OR REPLACE FUNCTION policy_conflict_exists(
+    p_tenant_id UUID,
+    p_tool_id UUID,
+    p_role TEXT
+)
+RETURNS BOOLEAN AS $$
+    SELECT EXISTS (
+        SELECT 1 FROM tool_policies
+        WHERE tenant_id = p_tenant_id
+          AND tool_id = p_tool_id
+          AND is_active
+          AND COALESCE(target_role, '') = COALESCE(p_role, '')
+    );
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION policy_conflict_exists IS 'Admin Copilot: true if an active policy already covers tenant/tool/role';
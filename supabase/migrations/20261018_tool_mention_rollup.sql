@@ -0,0 +1,97 @@
+-- Admin Copilot: Policy Impact Rollup
+-- Hourly per-(tenant, tool) mention counters maintained on insert into request_logs,
+-- so the "Blast Radius" simulation is an indexed lookup instead of an ILIKE scan + exact count
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE TABLE IF NOT EXISTS tool_mention_rollup (
+    tenant_id UUID NOT NULL,
+    tool_name TEXT NOT NULL,
+    hour TIMESTAMP WITH TIME ZONE NOT NULL,
+    cnt BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (tenant_id, tool_name, hour)
+);
+
+-- Solo el backend (service_role) y el trigger (SECURITY DEFINER) tocan el rollup
+ALTER TABLE tool_mention_rollup ENABLE ROW LEVEL SECURITY;
+REVOKE ALL ON TABLE tool_mention_rollup FROM anon, authenticated;
+
+-- 1. Trigger: one pass over the prompt scores every catalog tool at once
+--    (prompt lowercased once; the set-based upsert touches only the tools that matched).
+--    tool_definitions has no unique (tenant_id, name): DISTINCT lower(name) keeps the upsert
+--    from touching the same rollup row twice, and any error is downgraded to a WARNING so
+--    the rollup can never abort the request_logs INSERT.
+CREATE OR REPLACE FUNCTION bump_tool_mention_rollup()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_prompt TEXT;
+BEGIN
+    IF NEW.prompt_text IS NULL OR NEW.prompt_text = '' THEN
+        RETURN NEW;
+    END IF;
+
+    v_prompt := lower(NEW.prompt_text);
+
+    BEGIN
+        INSERT INTO tool_mention_rollup (tenant_id, tool_name, hour, cnt)
+        SELECT DISTINCT NEW.tenant_id, lower(td.name), date_trunc('hour', COALESCE(NEW.created_at, NOW())), 1
+        FROM tool_definitions td
+        WHERE td.tenant_id = NEW.tenant_id
+          AND length(td.name) <= length(v_prompt)
+          AND strpos(v_prompt, lower(td.name)) > 0
+        ON CONFLICT (tenant_id, tool_name, hour)
+        DO UPDATE SET cnt = tool_mention_rollup.cnt + 1;
+    EXCEPTION WHEN OTHERS THEN
+        RAISE WARNING 'tool_mention_rollup skipped for tenant %: %', NEW.tenant_id, SQLERRM;
+    END;
+
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_tool_mention_rollup ON request_logs;
+CREATE TRIGGER trg_tool_mention_rollup
+    AFTER INSERT ON request_logs
+    FOR EACH ROW EXECUTE FUNCTION bump_tool_mention_rollup();
+
+-- Backfill de la última semana: sin él, get_tool_impact devolvería 0 hasta que entren logs nuevos.
+-- CREATE TRIGGER mantiene el lock sobre request_logs hasta el COMMIT, así que ninguna fila
+-- entra por el trigger mientras corre; DO NOTHING hace la migración re-ejecutable sin duplicar
+INSERT INTO tool_mention_rollup (tenant_id, tool_name, hour, cnt)
+SELECT rl.tenant_id, t.name, date_trunc('hour', rl.created_at), COUNT(*)
+FROM request_logs rl
+JOIN (SELECT DISTINCT tenant_id, lower(name) AS name FROM tool_definitions) t
+  ON t.tenant_id = rl.tenant_id
+WHERE rl.created_at > NOW() - INTERVAL '7 days'
+  AND rl.prompt_text IS NOT NULL
+  AND strpos(lower(rl.prompt_text), t.name) > 0
+GROUP BY rl.tenant_id, t.name, date_trunc('hour', rl.created_at)
+ON CONFLICT (tenant_id, tool_name, hour) DO NOTHING;
+
+-- 2. Read path used by simulate_policy_impact
+CREATE OR REPLACE FUNCTION get_tool_impact(
+    p_tenant_id UUID,
+    p_tool_name TEXT,
+    p_hours INTEGER DEFAULT 24
+)
+RETURNS BIGINT AS $$
+    SELECT COALESCE(SUM(cnt), 0)
+    FROM tool_mention_rollup
+    WHERE tenant_id = p_tenant_id
+      AND tool_name = lower(p_tool_name)
+      AND hour > NOW() - make_interval(hours => p_hours);
+$$ LANGUAGE sql STABLE;
+
+REVOKE EXECUTE ON FUNCTION get_tool_impact(UUID, TEXT, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION get_tool_impact(UUID, TEXT, INTEGER) TO service_role;
+
+-- 3. Fallback for ad-hoc patterns (legacy ILIKE path) without a sequential scan
+CREATE INDEX IF NOT EXISTS idx_request_logs_prompt_trgm
+    ON request_logs USING GIN (prompt_text gin_trgm_ops);
+
+COMMENT ON TABLE tool_mention_rollup IS 'Admin Copilot: hourly tool mention counters for policy impact simulation';
+COMMENT ON FUNCTION get_tool_impact IS 'Admin Copilot: mentions of a tool in the last p_hours (rollup lookup)';
@@ -0,0 +1,65 @@
+"""
+Shared fixtures - a recording stand-in for the async Supabase (PostgREST) client.
+"""
+
+import asyncio
+
+import pytest
+
+
+class FakeResult:
+    def __init__(self, data=None, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    """Chainable query builder: every call (select / eq / ilike / insert / ...) is recorded."""
+
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+
+    def __getattr__(self, method):
+        def _chain(*args, **kwargs):
+            self.db.calls.append((self.name, method, args))
+            return self
+
+        return _chain
+
+    async def execute(self):
+        self.db.executed.append(self.name)
+        # Cede el loop como un round trip real (deja competir a las peticiones concurrentes)
+        await asyncio.sleep(0)
+        return self.db.results.get(self.name, FakeResult([]))
+
+
+class FakeDb:
+    """
+    `results` maps a table (or "rpc:<function>") to the FakeResult its queries return.
+    `calls` records (table, method, args) for every chained call; `executed` one entry per round trip.
+    """
+
+    def __init__(self, results=None):
+        self.results = results or {}
+        self.calls = []
+        self.executed = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        self.calls.append((f"rpc:{name}", "rpc", (params,)))
+        return FakeQuery(self, f"rpc:{name}")
+
+    def calls_to(self, name, method="eq"):
+        """Args of every `method` call on `name` (default: the `.eq()` filters), in call order."""
+        return [args for table, called, args in self.calls if table == name and called == method]
+
+    async def get_async_supabase(self):
+        return self
+
+
+@pytest.fixture
+def fake_db():
+    return FakeDb()
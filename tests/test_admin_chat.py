@@ -0,0 +1,379 @@
+"""
+Tests for Admin Copilot - policy commitment error mapping & audit events.
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+from postgrest.exceptions import APIError
+
+import app.routers.admin_chat as admin_chat
+from app.routers.admin_chat import PolicyDraft
+from app.services.audit_buffer import AuditLogBuffer
+from tests.conftest import FakeDb, FakeResult
+
+
+class _Identity:
+    user_id = "user-1"
+    email = "admin@acme.test"
+    tenant_id = "tenant-1"
+    role = "admin"
+
+
+class _RpcRaising:
+    def __init__(self, error):
+        self.error = error
+
+    def rpc(self, name, params):
+        return self
+
+    async def execute(self):
+        raise self.error
+
+
+class _RpcReturning:
+    def __init__(self, data):
+        self.data = data
+
+    def rpc(self, name, params):
+        return self
+
+    async def execute(self):
+        return self
+
+
+def _use_db(monkeypatch, db):
+    async def _get_db():
+        return db
+
+    monkeypatch.setattr(admin_chat, "get_async_supabase", _get_db)
+
+
+def _draft(**overrides):
+    data = {"tool_name": "code-interpreter", "action": "BLOCK", "target_role": "junior"}
+    data.update(overrides)
+    return PolicyDraft(**data)
+
+
+class TestCreatePolicyAtomic:
+    """Tests for the create_policy_atomic RPC path."""
+
+    @pytest.mark.asyncio
+    async def test_returns_policy_id(self, monkeypatch):
+        _use_db(monkeypatch, _RpcReturning("policy-123"))
+        assert await admin_chat._create_policy_atomic(_draft(), _Identity()) == "policy-123"
+
+    @pytest.mark.asyncio
+    async def test_missing_tool_maps_to_400(self, monkeypatch):
+        error = APIError({"message": "TOOL_MISSING: code-interpreter", "code": "P0001"})
+        _use_db(monkeypatch, _RpcRaising(error))
+        with pytest.raises(HTTPException) as exc:
+            await admin_chat._create_policy_atomic(_draft(), _Identity())
+        assert exc.value.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_conflict_maps_to_409(self, monkeypatch):
+        error = APIError({"message": "CONFLICT: code-interpreter", "code": "P0001"})
+        _use_db(monkeypatch, _RpcRaising(error))
+        with pytest.raises(HTTPException) as exc:
+            await admin_chat._create_policy_atomic(_draft(), _Identity())
+        assert exc.value.status_code == 409
+
+    @pytest.mark.asyncio
+    async def test_missing_rpc_falls_back_to_legacy(self, monkeypatch):
+        error = APIError({"message": "Could not find the function", "code": "PGRST202"})
+        _use_db(monkeypatch, _RpcRaising(error))
+
+        async def _legacy(policy, identity):
+            return "legacy-id"
+
+        monkeypatch.setattr(admin_chat, "_create_policy_legacy", _legacy)
+        assert await admin_chat._create_policy_atomic(_draft(), _Identity()) == "legacy-id"
+
+
+class TestCreatePolicyLegacy:
+    """Tests for the multi-step fallback path."""
+
+    @pytest.fixture(autouse=True)
+    def _catalog(self, monkeypatch):
+        catalog = {"code-interpreter": "tool-1", "Marketing": "dept-1"}
+
+        async def _resolve(tenant_id, name):
+            return catalog.get(name)
+
+        monkeypatch.setattr(admin_chat, "resolve_tool_id", _resolve)
+        monkeypatch.setattr(admin_chat, "resolve_dept_id", _resolve)
+
+    @pytest.mark.asyncio
+    async def test_resolves_tool_and_dept(self, monkeypatch):
+        db = FakeDb({"tool_policies": FakeResult([{"id": "policy-9"}])})
+        _use_db(monkeypatch, db)
+
+        async def _no_conflict(*args):
+            return False
+
+        monkeypatch.setattr(admin_chat, "check_policy_conflicts", _no_conflict)
+        policy_id = await admin_chat._create_policy_legacy(_draft(target_dept="Marketing"), _Identity())
+        assert policy_id == "policy-9"
+        assert db.executed == ["tool_policies"]
+        ((row,),) = [args for _, method, args in db.calls if method == "insert"]
+        assert row["tenant_id"] == "tenant-1"
+
+    @pytest.mark.asyncio
+    async def test_unknown_tool_maps_to_400(self, monkeypatch):
+        _use_db(monkeypatch, FakeDb())
+        with pytest.raises(HTTPException) as exc:
+            await admin_chat._create_policy_legacy(_draft(tool_name="ghost-tool"), _Identity())
+        assert exc.value.status_code == 400
+
+
+class TestLogAuditEvent:
+    """Tests for the Copilot audit producer."""
+
+    @pytest.mark.asyncio
+    async def test_enqueues_without_db_round_trip(self, monkeypatch):
+        buffer = AuditLogBuffer("audit_logs")
+        monkeypatch.setattr(admin_chat, "audit_buffer", buffer)
+        await admin_chat.log_audit_event("tenant-1", "POLICY_CREATED", "created", "user-1")
+
+        row = buffer.queue.get_nowait()
+        assert row["event_type"] == "POLICY_CREATED"
+        assert row["severity"] == "INFO"
+
+
+class TestSimulatePolicyImpact:
+    """Tests for the rollup-backed blast radius estimate."""
+
+    @pytest.fixture(autouse=True)
+    def _catalog(self, monkeypatch):
+        async def _resolve(tenant_id, name):
+            return "tool-1" if name == "code-interpreter" else None
+
+        monkeypatch.setattr(admin_chat, "resolve_tool_id", _resolve)
+
+    @pytest.mark.asyncio
+    async def test_reads_rollup_rpc(self, monkeypatch):
+        _use_db(monkeypatch, _RpcReturning(42))
+        assert await admin_chat.simulate_policy_impact("tenant-1", "code-interpreter") == 42
+
+    @pytest.mark.asyncio
+    async def test_unknown_tool_has_no_impact(self, monkeypatch):
+        _use_db(monkeypatch, _RpcReturning(42))
+        assert await admin_chat.simulate_policy_impact("tenant-1", "ghost-tool") == 0
+
+    @pytest.mark.asyncio
+    async def test_missing_rpc_falls_back_to_scan(self, monkeypatch):
+        error = APIError({"message": "Could not find the function", "code": "PGRST202"})
+        _use_db(monkeypatch, _RpcRaising(error))
+
+        async def _scan(db, tenant_id, tool_name):
+            return 7
+
+        monkeypatch.setattr(admin_chat, "_search_logs", _scan)
+        assert await admin_chat.simulate_policy_impact("tenant-1", "code-interpreter") == 7
+
+
+class TestValidateDraft:
+    """Tests for LLM draft validation."""
+
+    def test_valid_draft_is_normalized(self):
+        draft = admin_chat._validate_draft({"tool_name": "stripe_payment", "action": "BLOCK"})
+        assert draft["tool_name"] == "stripe_payment"
+        assert draft["argument_rules"] == {}
+        assert draft["target_role"] is None
+
+    def test_invalid_action_maps_to_422(self):
+        with pytest.raises(HTTPException) as exc:
+            admin_chat._validate_draft({"tool_name": "stripe_payment", "action": "DELETE_EVERYTHING"})
+        assert exc.value.status_code == 422
+
+    def test_missing_tool_name_maps_to_422(self):
+        with pytest.raises(HTTPException) as exc:
+            admin_chat._validate_draft({"action": "BLOCK"})
+        assert exc.value.status_code == 422
+
+
+class TestIsAdmin:
+    """Tests for the RBAC role check."""
+
+    @pytest.mark.parametrize("role", ["admin", "Manager", "OWNER", "superadmin", "tenant_admin", "Org_Admin"])
+    def test_allowed_roles(self, role):
+        identity = _Identity()
+        identity.role = role
+        assert admin_chat._is_admin(identity)
+
+    @pytest.mark.parametrize("role", [None, "", "member", "observer", "not_admin", "adminless", "Billing-Admin"])
+    def test_rejected_roles(self, role):
+        identity = _Identity()
+        identity.role = role
+        assert not admin_chat._is_admin(identity)
+
+
+def _client(role, tenant_id="tenant-1"):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    identity = _Identity()
+    identity.role = role
+    identity.tenant_id = tenant_id
+    resolved = []
+
+    async def _verify():
+        resolved.append(identity)
+        return identity
+
+    app = FastAPI()
+    app.include_router(admin_chat.router)
+    app.dependency_overrides[admin_chat.verify_identity_envelope] = _verify
+    return TestClient(app), resolved
+
+
+class TestRequireAdminIdentity:
+    """Tests for the shared RBAC / rate-limit dependencies."""
+
+    @pytest.fixture(autouse=True)
+    def _stubs(self, monkeypatch):
+        self.rate_limited = []
+
+        async def _rate_limit(identity):
+            self.rate_limited.append(identity.user_id)
+
+        async def _create(policy, identity):
+            return "policy-1"
+
+        async def _audit(*args):
+            return None
+
+        monkeypatch.setattr(admin_chat, "check_admin_rate_limit", _rate_limit)
+        monkeypatch.setattr(admin_chat, "_create_policy_atomic", _create)
+        monkeypatch.setattr(admin_chat, "log_audit_event", _audit)
+
+    def test_non_admin_is_rejected_before_rate_limit(self, monkeypatch):
+        client, _ = _client("member")
+        res = client.post("/v1/admin/copilot/policy", json={"text": "Block interns from Stripe"})
+        assert res.status_code == 403
+        assert self.rate_limited == []
+
+    def test_non_admin_cannot_commit_policy(self, monkeypatch):
+        client, _ = _client("member")
+        res = client.post("/v1/admin/policies", json={"tool_name": "stripe", "action": "BLOCK"})
+        assert res.status_code == 403
+
+    def test_admin_without_tenant_is_rejected(self):
+        client, _ = _client("admin", tenant_id=None)
+        res = client.post("/v1/admin/policies", json={"tool_name": "stripe", "action": "BLOCK"})
+        assert res.status_code == 400
+
+    def test_admin_commits_policy(self, monkeypatch):
+        client, resolved = _client("admin")
+        res = client.post("/v1/admin/policies", json={"tool_name": "stripe", "action": "BLOCK"})
+        assert res.status_code == 201
+        assert res.json() == {"status": "success", "id": "policy-1"}
+        assert len(resolved) == 1
+
+    def test_identity_resolved_once_with_rate_limit(self, monkeypatch):
+        async def _draft(tenant_id, text, validate=None):
+            return {"error": "Failed to generate policy"}, False
+
+        monkeypatch.setattr(admin_chat, "cached_generate", _draft)
+        client, resolved = _client("admin")
+        res = client.post("/v1/admin/copilot/policy", json={"text": "Block interns from Stripe"})
+        assert res.status_code == 200
+        assert len(resolved) == 1
+        assert self.rate_limited == ["user-1"]
+        assert res.headers["X-Cache"] == "MISS"
+
+
+def _events(chunks):
+    events = []
+    for raw in "".join(chunks).strip().split("\n\n"):
+        name, data = raw.split("\n", 1)
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+class TestCopilotEventStream:
+    """Tests for the SSE Copilot stream."""
+
+    @pytest.fixture(autouse=True)
+    def _simulation(self, monkeypatch):
+        self.simulated = []
+
+        async def _simulate(tenant_id, tool_name):
+            self.simulated.append(tool_name)
+            return 3
+
+        monkeypatch.setattr(admin_chat, "simulate_policy_impact", _simulate)
+
+    def _llm(self, monkeypatch, parts):
+        async def _stream(tenant_id, text):
+            for part in parts:
+                yield part
+
+        monkeypatch.setattr(admin_chat, "stream_policy_json", _stream)
+
+    async def _collect(self):
+        return [chunk async for chunk in admin_chat._copilot_event_stream(_Identity(), "Block Stripe")]
+
+    @pytest.mark.asyncio
+    async def test_emits_tool_name_before_draft_completes(self, monkeypatch):
+        self._llm(monkeypatch, ['{"tool_name": "stripe_pay', 'ment", ', '"action": "BLOCK"}'])
+        events = _events(await self._collect())
+        names = [name for name, _ in events]
+
+        assert names == ["draft_partial", "draft_partial", "tool_name", "draft_partial", "simulation", "done"]
+        assert events[2][1] == {"tool_name": "stripe_payment"}
+        assert events[-1][1]["draft"]["action"] == "BLOCK"
+        assert events[-1][1]["impact_score"] == 3
+        assert self.simulated == ["stripe_payment"]
+
+    @pytest.mark.asyncio
+    async def test_invalid_draft_emits_error(self, monkeypatch):
+        self._llm(monkeypatch, ['{"tool_name": "stripe", "action": "NUKE"}'])
+        name, data = _events(await self._collect())[-1]
+        assert name == "error"
+        assert data["status_code"] == 422
+
+    @pytest.mark.asyncio
+    async def test_llm_failure_emits_error(self, monkeypatch):
+        async def _broken(tenant_id, text):
+            raise RuntimeError("provider down")
+            yield
+
+        monkeypatch.setattr(admin_chat, "stream_policy_json", _broken)
+        name, data = _events(await self._collect())[-1]
+        assert name == "error"
+        assert data["status_code"] == 502
+
+
+class TestCheckPolicyConflicts:
+    """Tests for the EXISTS-based conflict probe."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("exists", [True, False])
+    async def test_reads_rpc_bool(self, monkeypatch, exists):
+        _use_db(monkeypatch, _RpcReturning(exists))
+        assert await admin_chat.check_policy_conflicts("tenant-1", "tool-1", None) is exists
+
+    @pytest.mark.asyncio
+    async def test_missing_rpc_falls_back_to_query(self, monkeypatch):
+        error = APIError({"message": "Could not find the function", "code": "PGRST202"})
+        db = FakeDb({"tool_policies": FakeResult([{"id": "policy-1"}])})
+        db.rpc = _RpcRaising(error).rpc
+        _use_db(monkeypatch, db)
+        assert await admin_chat.check_policy_conflicts("tenant-1", "tool-1", "junior")
+        assert ("tenant_id", "tenant-1") in db.calls_to("tool_policies")
+
+
+class TestRouterRegistration:
+    """Guards against duplicate Copilot route registration."""
+
+    def test_routes_are_unique(self):
+        keys = [(route.path, tuple(sorted(route.methods))) for route in admin_chat.router.routes]
+        assert len(keys) == len(set(keys))
+
+    def test_single_copilot_policy_route(self):
+        paths = [route.path for route in admin_chat.router.routes]
+        assert paths.count("/v1/admin/copilot/policy") == 1
@@ -0,0 +1,271 @@
+"""
+Tests for Admin Roles - RBAC endpoints over the async Supabase client.
+"""
+
+import asyncio
+import json
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import app.routers.admin_roles as admin_roles
+from app.services.audit_buffer import AuditLogBuffer
+from app.services.identity import Rank, VerifiedIdentity, rank_for_role
+from tests.conftest import FakeResult
+
+
+class _Identity:
+    user_id = "user-1"
+    email = "admin@acme.test"
+    tenant_id = "tenant-1"
+    role = "admin"
+
+    @property
+    def role_rank(self):
+        return rank_for_role(self.role)
+
+
+_ROLE_ROW = {
+    "id": 1,
+    "tenant_id": "tenant-1",
+    "department": "Engineering",
+    "function": "Dev",
+    "system_persona": "You write code.",
+    "pii_policy": "REDACT",
+    "allowed_modes": ["agentshield-secure"],
+    "metadata": {"active_rules": []},
+    "created_at": "2026-10-18T00:00:00+00:00",
+}
+
+
+@pytest.fixture
+def db(monkeypatch, fake_db):
+    fake_db.invalidated = []
+
+    async def _get_role_def(tenant_id, role_id):
+        return fake_db.roles.get(role_id)
+
+    async def _invalidate(tenant_id, role_id=None):
+        fake_db.invalidated.append((tenant_id, role_id))
+
+    fake_db.roles = {}
+    monkeypatch.setattr(admin_roles, "get_async_supabase", fake_db.get_async_supabase)
+    monkeypatch.setattr(admin_roles, "get_role_def", _get_role_def)
+    monkeypatch.setattr(admin_roles, "invalidate_role", _invalidate)
+    return fake_db
+
+
+@pytest.fixture
+def audit(monkeypatch):
+    buffer = AuditLogBuffer("admin_audit_logs")
+    monkeypatch.setattr(admin_roles, "audit_buffer", buffer)
+    return buffer
+
+
+class TestListRoles:
+    """Tests for list_roles."""
+
+    @pytest.mark.asyncio
+    async def test_returns_tenant_roles(self, db):
+        db.results["role_definitions"] = FakeResult([_ROLE_ROW])
+        res = await admin_roles.list_roles(identity=_Identity())
+        assert res.media_type == "application/json"
+        assert json.loads(res.body) == [_ROLE_ROW]
+        assert db.calls_to("role_definitions") == [("tenant_id", "tenant-1")]
+
+    @pytest.mark.asyncio
+    async def test_drops_columns_outside_response_model(self, db):
+        db.results["role_definitions"] = FakeResult([{**_ROLE_ROW, "source_description": "x"}])
+        res = await admin_roles.list_roles(identity=_Identity())
+        assert "source_description" not in json.loads(res.body)[0]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_polls_share_one_fetch(self, db):
+        db.results["role_definitions"] = FakeResult([_ROLE_ROW])
+        responses = await asyncio.gather(*(admin_roles.list_roles(identity=_Identity()) for _ in range(3)))
+        assert db.executed.count("role_definitions") == 1
+        assert all(json.loads(res.body) == [_ROLE_ROW] for res in responses)
+        assert admin_roles._inflight_roles == {}
+
+    @pytest.mark.asyncio
+    async def test_fetch_error_is_500(self, db, monkeypatch):
+        async def _boom(tenant_id):
+            raise RuntimeError("postgrest down")
+
+        monkeypatch.setattr(admin_roles, "_fetch_roles", _boom)
+        with pytest.raises(HTTPException) as exc:
+            await admin_roles.list_roles(identity=_Identity())
+        assert exc.value.status_code == 500
+
+    def test_row_shuttle_matches_response_model(self):
+        from dataclasses import fields
+
+        assert [f.name for f in fields(admin_roles.RoleRow)] == list(admin_roles.RoleResponse.model_fields)
+        assert not hasattr(admin_roles.RoleRow(**_ROLE_ROW), "__dict__")
+
+    @pytest.mark.asyncio
+    async def test_projects_response_columns(self, db):
+        await admin_roles.list_roles(identity=_Identity())
+        (columns,) = db.calls_to("role_definitions", "select")[0]
+        columns = columns.split(",")
+        assert "*" not in columns
+        assert set(columns) == set(admin_roles.RoleResponse.model_fields)
+
+
+class TestDeleteRole:
+    """Tests for the safe deletion protocol."""
+
+    @pytest.mark.asyncio
+    async def test_blocks_when_users_assigned(self, db):
+        db.roles[7] = {"id": 7, "function": "Dev"}
+        db.results["profiles"] = FakeResult([{"id": "user-2"}])
+        with pytest.raises(HTTPException) as exc:
+            await admin_roles.delete_role(7, identity=_Identity())
+        assert exc.value.status_code == 409
+        assert not db.calls_to("role_definitions", "delete")
+
+    @pytest.mark.asyncio
+    async def test_deletes_and_audits(self, db, audit):
+        db.roles[7] = {"id": 7, "function": "Dev"}
+        db.results["profiles"] = FakeResult([])
+        assert await admin_roles.delete_role(7, identity=_Identity()) == {"status": "deleted"}
+        assert db.calls_to("role_definitions", "delete") == [()]
+        assert ("tenant_id", "tenant-1") in db.calls_to("role_definitions")
+        assert ("tenant_id", "tenant-1") in db.calls_to("profiles")
+        assert db.invalidated == [("tenant-1", 7)]
+
+        await asyncio.sleep(0)  # audit enqueue is fire-and-forget
+        assert audit.queue.get_nowait()["action"] == "ROLE_DELETE"
+
+    @pytest.mark.asyncio
+    async def test_audit_timestamp_is_utc_iso(self, db, audit):
+        await admin_roles.log_audit_event("tenant-1", "user-1", "ROLE_DELETE", {})
+        ts = audit.queue.get_nowait()["timestamp"]
+        parsed = datetime.fromisoformat(ts)
+        assert parsed.utcoffset() == timedelta(0)
+        assert abs((datetime.now(UTC) - parsed).total_seconds()) < 5
+
+    @pytest.mark.asyncio
+    async def test_member_cannot_delete(self, db):
+        identity = _Identity()
+        identity.role = "member"
+        with pytest.raises(HTTPException) as exc:
+            await admin_roles.delete_role(7, identity=identity)
+        assert exc.value.status_code == 403
+        assert db.calls == []
+
+
+class TestSimulateAccess:
+    """Tests for the digital twin simulator."""
+
+    @pytest.mark.asyncio
+    async def test_pii_block(self, db):
+        db.roles[3] = {"function": "HR", "pii_policy": "BLOCK", "allowed_modes": [], "system_persona": "HR"}
+        payload = admin_roles.SimulationRequest(role_id=3, action_to_test="pii.bypass")
+        res = await admin_roles.simulate_access(payload, identity=_Identity())
+        assert res["allowed"] is False
+
+    @pytest.mark.asyncio
+    async def test_action_match_is_case_insensitive(self, db):
+        payload = admin_roles.SimulationRequest(
+            role_definition={"pii_policy": "BLOCK", "allowed_modes": []}, action_to_test="PII.Bypass"
+        )
+        res = await admin_roles.simulate_access(payload, identity=_Identity())
+        assert res["allowed"] is False
+
+    @pytest.mark.asyncio
+    async def test_inline_definition_skips_role_lookup(self, db, monkeypatch):
+        async def _fail(*args):
+            raise AssertionError("role lookup should be skipped")
+
+        monkeypatch.setattr(admin_roles, "get_role_def", _fail)
+        payload = admin_roles.SimulationRequest(
+            role_id=3, role_definition={"allowed_modes": ["coding"]}, action_to_test="execute_code"
+        )
+        res = await admin_roles.simulate_access(payload, identity=_Identity())
+        assert res["allowed"] is True
+
+    @pytest.mark.parametrize("action", list(admin_roles._ACTION_RULES))
+    def test_action_table_matches_fuzzy_rules(self, action):
+        lowered = action.casefold()
+        fuzzy = ("coding" if "code" in lowered else None), "pii" in lowered
+        assert admin_roles._ACTION_RULES[action] == fuzzy
+
+    @pytest.mark.asyncio
+    async def test_unknown_role_id_is_404(self, db):
+        payload = admin_roles.SimulationRequest(role_id=99, action_to_test="pii.bypass")
+        with pytest.raises(HTTPException) as exc:
+            await admin_roles.simulate_access(payload, identity=_Identity())
+        assert exc.value.status_code == 404
+
+
+class TestRoleRank:
+    """Tests for hierarchical rank resolution."""
+
+    @pytest.mark.parametrize(
+        "role,rank",
+        [("owner", 100), ("Admin", 80), ("MANAGER", 60), ("member", 20), ("observer", 10)],
+    )
+    def test_known_roles(self, role, rank):
+        assert admin_roles.get_role_rank(role) == rank
+
+    @pytest.mark.parametrize("role", [None, "", "superuser"])
+    def test_unknown_roles_have_no_rank(self, role):
+        assert admin_roles.get_role_rank(role) == 0
+
+    @pytest.mark.parametrize(
+        "function,high", [("Tenant ADMIN", True), ("co-owner", True), ("Developer", False)]
+    )
+    def test_high_rank_keyword(self, function, high):
+        assert bool(admin_roles._HIGH_RANK_RE.search(function)) is high
+
+    def test_identity_carries_rank(self):
+        identity = VerifiedIdentity("user-1", "a@acme.test", None, "tenant-1", "Owner")
+        assert identity.role_rank == Rank.OWNER
+
+    def test_integrity_check_blocks_lower_rank(self):
+        with pytest.raises(HTTPException) as exc:
+            admin_roles.check_hierarchical_integrity(Rank.MANAGER, Rank.ADMIN)
+        assert exc.value.status_code == 403
+
+
+class TestWarmUp:
+    """Tests for the startup warmup of the admin path."""
+
+    @pytest.mark.asyncio
+    async def test_touches_postgrest_once(self, db):
+        await admin_roles.warm_up()
+        assert db.executed == ["role_definitions"]
+        assert db.calls_to("role_definitions", "select") == [("id",)]
+
+    @pytest.mark.asyncio
+    async def test_failures_never_block_startup(self, monkeypatch):
+        async def _down():
+            raise RuntimeError("postgrest down")
+
+        monkeypatch.setattr(admin_roles, "get_async_supabase", _down)
+        await admin_roles.warm_up()
+
+    def test_sample_row_matches_response_model(self):
+        assert set(admin_roles._WARMUP_ROLE) == set(admin_roles.RoleResponse.model_fields)
+
+
+class TestRouter:
+    """Tests for router-level configuration."""
+
+    def test_routes_are_unique(self):
+        keys = [(route.path, tuple(sorted(route.methods))) for route in admin_roles.router.routes]
+        assert len(keys) == len(set(keys))
+
+    def test_single_provision_entry_points(self):
+        paths = [route.path for route in admin_roles.router.routes]
+        assert paths.count("/v1/admin/roles/provision") == 1
+        assert paths.count("/v1/admin/roles/ai-provision") == 1
+        assert not any("magic" in path for path in paths)
+
+    def test_routes_serialize_with_orjson(self):
+        from fastapi.responses import ORJSONResponse
+
+        for route in admin_roles.router.routes:
+            assert route.response_class is ORJSONResponse
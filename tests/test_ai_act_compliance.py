@@ -0,0 +1,896 @@
+"""
+Tests for EU AI Act Compliance - endpoints over the async Supabase client.
+"""
+
+import asyncio
+import json
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+import app.routers.ai_act_compliance as ai_act
+import app.services.human_approval_queue as approval_queue
+from tests.conftest import FakeResult
+
+
+class _Identity:
+    user_id = "user-1"
+    tenant_id = "tenant-1"
+    role = "compliance_officer"
+
+
+@pytest.fixture
+def db(monkeypatch, fake_db):
+    monkeypatch.setattr(ai_act, "get_async_supabase", fake_db.get_async_supabase)
+    monkeypatch.setattr(approval_queue, "get_async_supabase", fake_db.get_async_supabase)
+    return fake_db
+
+
+def _capture_audit_rows(monkeypatch):
+    rows = []
+    monkeypatch.setattr(ai_act, "append_async", rows.append)
+    return rows
+
+
+_AUDIT_ROW = {
+    "trace_id": "trc-1",
+    "risk_level": "HIGH_RISK",
+    "risk_category": "EMPLOYMENT",
+    "classification_confidence": 0.9,
+    "required_human_approval": True,
+    "approval_status": "APPROVED",
+    "transparency_disclosure_shown": False,
+    "audit_hash": "abc",
+    "created_at": "2026-10-18T00:00:00+00:00",
+}
+
+
+class TestTransparencyArtifact:
+    """Tests for the precomputed Article 52 artifacts."""
+
+    @pytest.mark.asyncio
+    async def test_known_type_returns_shared_instance(self):
+        from fastapi import Response
+
+        response = Response()
+        first = await ai_act.get_transparency_artifact(response, "deepfake", identity=_Identity())
+        second = await ai_act.get_transparency_artifact(Response(), "deepfake", identity=_Identity())
+        assert first is second
+        assert first.article_reference == "Article 52(3)"
+        assert response.headers["Cache-Control"] == ai_act.TRANSPARENCY_CACHE_CONTROL
+
+    @pytest.mark.asyncio
+    async def test_unknown_type_falls_back_to_chatbot_text(self):
+        from fastapi import Response
+
+        artifact = await ai_act.get_transparency_artifact(Response(), "voice_clone", identity=_Identity())
+        assert artifact.type == "voice_clone"
+        assert artifact.required_text == ai_act._TRANSPARENCY_ARTIFACTS["chatbot"].required_text
+        assert ai_act._TRANSPARENCY_ARTIFACTS["chatbot"].type == "chatbot"
+
+    def test_artifacts_are_read_only(self):
+        with pytest.raises(TypeError):
+            ai_act._TRANSPARENCY_ARTIFACTS["chatbot"] = None
+
+
+class TestTodayIso:
+    """Tests for the cached UTC date slot."""
+
+    @pytest.fixture(autouse=True)
+    def slot(self, monkeypatch):
+        monkeypatch.setattr(ai_act, "_TODAY", {"until": 0.0, "iso": ""})
+
+    def test_formats_only_once_per_day(self, monkeypatch):
+        now = [1_792_281_600.0 + 10]  # 2026-10-18T00:00:10Z
+        monkeypatch.setattr(ai_act.time, "time", lambda: now[0])
+        assert ai_act.today_iso() == "2026-10-18"
+        monkeypatch.setattr(ai_act.time, "strftime", lambda *a: pytest.fail("re-formatted same day"))
+        now[0] += 86_000
+        assert ai_act.today_iso() == "2026-10-18"
+
+    def test_rolls_over_at_utc_midnight(self, monkeypatch):
+        now = [1_792_281_600.0 - 1]  # 2026-10-17T23:59:59Z
+        monkeypatch.setattr(ai_act.time, "time", lambda: now[0])
+        assert ai_act.today_iso() == "2026-10-17"
+        now[0] += 1
+        assert ai_act.today_iso() == "2026-10-18"
+
+
+class TestRequireComplianceOfficer:
+    """Tests for the shared RBAC dependency."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("role", ["compliance_officer", "Admin", "OWNER"])
+    async def test_officers_pass(self, role):
+        identity = _Identity()
+        identity.role = role
+        assert await ai_act.require_compliance_officer(identity) is identity
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("role", [None, "", "member", "superadmin"])
+    async def test_others_are_rejected(self, role):
+        identity = _Identity()
+        identity.role = role
+        with pytest.raises(HTTPException) as exc:
+            await ai_act.require_compliance_officer(identity)
+        assert exc.value.status_code == 403
+
+    def test_officer_routes_use_the_dependency(self):
+        guarded = {
+            route.path
+            for route in ai_act.router.routes
+            if any(dep.call is ai_act.require_compliance_officer for dep in route.dependant.dependencies)
+        }
+        assert "/ai-act/audit" in guarded
+        assert "/ai-act/compliance-summary" in guarded
+        assert "/ai-act/classify" not in guarded
+
+
+class TestAuditTrail:
+    """Tests for the Article 12 audit trail reads."""
+
+    @pytest.mark.parametrize("limit", [0, -5, ai_act.AUDIT_TRAIL_MAX_LIMIT + 1])
+    def test_out_of_range_limit_is_422(self, db, limit):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        app = FastAPI()
+        app.include_router(ai_act.router)
+        app.dependency_overrides[ai_act.require_compliance_officer] = _Identity
+        res = TestClient(app).get("/ai-act/audit", params={"limit": limit})
+        assert res.status_code == 422
+        assert db.calls == []
+
+    @pytest.mark.asyncio
+    async def test_filters_are_applied_on_the_query(self, db):
+        db.results["ai_act_audit_log"] = FakeResult([_AUDIT_ROW])
+        res = await ai_act.get_audit_trail(
+            from_date=date(2026, 10, 1), to_date=None, risk_level="HIGH_RISK", limit=10,
+            accept=None, identity=_Identity(),
+        )
+        assert json.loads(res.body)[0]["trace_id"] == "trc-1"
+        assert "X-Next-Cursor" not in res.headers
+        methods = [(method, args) for _, method, args in db.calls]
+        assert ("select", (ai_act.AUDIT_COLUMNS,)) in methods
+        assert ("eq", ("tenant_id", "tenant-1")) in methods
+        assert ("gte", ("created_at", "2026-10-01")) in methods
+        assert ("eq", ("risk_level", "HIGH_RISK")) in methods
+
+    @pytest.mark.asyncio
+    async def test_full_page_cursor_round_trips(self, db):
+        db.results["ai_act_audit_log"] = FakeResult([_AUDIT_ROW])
+        first = await ai_act.get_audit_trail(limit=1, accept=None, identity=_Identity())
+        cursor = first.headers["X-Next-Cursor"]
+        assert ai_act._decode_cursor(cursor) == (_AUDIT_ROW["created_at"], "trc-1")
+
+        db.calls.clear()
+        await ai_act.get_audit_trail(limit=1, after=cursor, accept=None, identity=_Identity())
+        (keyset,) = [args[0] for _, method, args in db.calls if method == "or_"]
+        assert f'created_at.lt."{_AUDIT_ROW["created_at"]}"' in keyset
+        assert 'trace_id.lt."trc-1"' in keyset
+
+    @pytest.mark.asyncio
+    async def test_order_has_trace_id_tiebreak(self, db):
+        await ai_act.get_audit_trail(accept=None, identity=_Identity())
+        orders = [args for _, method, args in db.calls if method == "order"]
+        assert orders == [("created_at",), ("trace_id",)]
+
+    @pytest.mark.asyncio
+    async def test_malformed_cursor_is_400(self, db):
+        with pytest.raises(HTTPException) as exc:
+            await ai_act.get_audit_trail(after="not-a-cursor", accept=None, identity=_Identity())
+        assert exc.value.status_code == 400
+        assert db.calls == []
+
+    @pytest.mark.asyncio
+    async def test_ndjson_is_streamed_on_request(self, db):
+        db.results["ai_act_audit_log"] = FakeResult([_AUDIT_ROW, {**_AUDIT_ROW, "trace_id": "trc-2"}])
+        res = await ai_act.get_audit_trail(accept="application/x-ndjson", identity=_Identity())
+        assert res.media_type == "application/x-ndjson"
+        body = b"".join([chunk async for chunk in res.body_iterator])
+        assert [json.loads(line)["trace_id"] for line in body.splitlines()] == ["trc-1", "trc-2"]
+
+
+    @pytest.fixture
+    def pages(self, db, monkeypatch):
+        rows = [{**_AUDIT_ROW, "trace_id": f"trc-{i}"} for i in range(5)]
+        fetched = []
+
+        async def _fetch(db, tenant_id, cursor, limit, from_iso, to_iso, risk_level):
+            fetched.append((cursor, limit))
+            start = 0 if cursor is None else [r["trace_id"] for r in rows].index(cursor[1]) + 1
+            return rows[start:start + limit]
+
+        monkeypatch.setattr(ai_act, "AUDIT_STREAM_PAGE_SIZE", 2)
+        monkeypatch.setattr(ai_act, "_fetch_audit_page", _fetch)
+        return fetched
+
+    @pytest.mark.asyncio
+    async def test_stream_walks_keyset_pages_lazily(self, pages):
+        res = await ai_act.get_audit_trail(limit=10, stream=True, accept=None, identity=_Identity())
+        assert res.media_type == "application/x-ndjson"
+        assert pages == [(None, 2)]  # solo la primera página antes de responder
+
+        body = b"".join([chunk async for chunk in res.body_iterator])
+        assert [json.loads(line)["trace_id"] for line in body.splitlines()] == [f"trc-{i}" for i in range(5)]
+        assert [limit for _, limit in pages] == [2, 2, 2]
+        assert pages[1][0] == (_AUDIT_ROW["created_at"], "trc-1")
+
+    @pytest.mark.asyncio
+    async def test_stream_stops_at_limit(self, pages):
+        res = await ai_act.get_audit_trail(limit=3, stream=True, accept=None, identity=_Identity())
+        body = b"".join([chunk async for chunk in res.body_iterator])
+        assert len(body.splitlines()) == 3
+        assert [limit for _, limit in pages] == [2, 1]
+
+    @pytest.mark.asyncio
+    async def test_later_page_failure_ends_with_error_record(self, db, monkeypatch):
+        rows = [{**_AUDIT_ROW, "trace_id": f"trc-{i}"} for i in range(2)]
+
+        async def _fetch(db, tenant_id, cursor, limit, from_iso, to_iso, risk_level):
+            if cursor is not None:
+                raise RuntimeError("postgrest timeout")
+            return rows
+
+        monkeypatch.setattr(ai_act, "AUDIT_STREAM_PAGE_SIZE", 2)
+        monkeypatch.setattr(ai_act, "_fetch_audit_page", _fetch)
+        res = await ai_act.get_audit_trail(limit=10, stream=True, accept=None, identity=_Identity())
+        body = b"".join([chunk async for chunk in res.body_iterator])
+
+        *data, last = [json.loads(line) for line in body.splitlines()]
+        assert [row["trace_id"] for row in data] == ["trc-0", "trc-1"]
+        assert last["rows_sent"] == 2
+        assert "truncated" in last["error"]
+
+    @pytest.mark.asyncio
+    async def test_stream_first_page_error_is_500(self, db, monkeypatch):
+        async def _boom(*args):
+            raise RuntimeError("postgrest down")
+
+        monkeypatch.setattr(ai_act, "_fetch_audit_page", _boom)
+        with pytest.raises(HTTPException) as exc:
+            await ai_act.get_audit_trail(stream=True, accept=None, identity=_Identity())
+        assert exc.value.status_code == 500
+
+
+class TestAuditEntry:
+    """Tests for the single audit entry lookup."""
+
+    @pytest.fixture(autouse=True)
+    def cache(self, monkeypatch):
+        fresh = ai_act.TTLCache(maxsize=16, ttl=60)
+        monkeypatch.setattr(ai_act, "_audit_entry_cache", fresh)
+        return fresh
+
+    @pytest.mark.asyncio
+    async def test_repeat_lookup_is_served_from_cache(self, db):
+        db.results["ai_act_audit_log"] = FakeResult([_AUDIT_ROW])
+        first = await ai_act.get_audit_entry("trc-1", identity=_Identity())
+        second = await ai_act.get_audit_entry("trc-1", identity=_Identity())
+        assert second is first
+        assert [method for _, method, _ in db.calls].count("select") == 1
+
+    @pytest.mark.asyncio
+    async def test_cache_is_tenant_scoped_and_skips_misses(self, db, cache):
+        db.results["ai_act_audit_log"] = FakeResult([_AUDIT_ROW])
+        await ai_act.get_audit_entry("trc-1", identity=_Identity())
+        other = _Identity()
+        other.tenant_id = "tenant-2"
+        db.results["ai_act_audit_log"] = FakeResult([])
+        with pytest.raises(HTTPException):
+            await ai_act.get_audit_entry("trc-1", identity=other)
+        assert list(cache) == [("tenant-1", "trc-1")]
+
+    @pytest.mark.asyncio
+    async def test_projects_entry_columns(self, db):
+        db.results["ai_act_audit_log"] = FakeResult([_AUDIT_ROW])
+        entry = await ai_act.get_audit_entry("trc-1", identity=_Identity())
+        assert entry.trace_id == "trc-1"
+        assert ("ai_act_audit_log", "select", (ai_act.AUDIT_COLUMNS,)) in db.calls
+
+    @pytest.mark.asyncio
+    async def test_missing_entry_is_404(self, db):
+        with pytest.raises(HTTPException) as exc:
+            await ai_act.get_audit_entry("trc-404", identity=_Identity())
+        assert exc.value.status_code == 404
+
+
+class TestTenantIndustryCache:
+    """Tests for the FRIA tenant industry lookup cache."""
+
+    @pytest.fixture(autouse=True)
+    def cache(self, monkeypatch):
+        fresh = ai_act.TTLCache(maxsize=16, ttl=300)
+        monkeypatch.setattr(ai_act, "_tenant_industry_cache", fresh)
+        return fresh
+
+    @pytest.mark.asyncio
+    async def test_repeat_lookup_skips_db(self, db):
+        db.results["tenants"] = FakeResult([{"industry": None, "sector": "Healthcare"}])
+        assert await ai_act._get_tenant_industry("tenant-1") == "Healthcare"
+        assert await ai_act._get_tenant_industry("tenant-1") == "Healthcare"
+        assert sum(1 for name, method, _ in db.calls if name == "tenants" and method == "select") == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_forces_refetch(self, db):
+        db.results["tenants"] = FakeResult([{"industry": "Finance"}])
+        await ai_act._get_tenant_industry("tenant-1")
+        ai_act.invalidate_tenant_industry("tenant-1")
+        db.results["tenants"] = FakeResult([{"industry": "Insurance"}])
+        assert await ai_act._get_tenant_industry("tenant-1") == "Insurance"
+
+    @pytest.mark.asyncio
+    async def test_lookup_failure_is_not_cached(self, db, monkeypatch, cache):
+        async def _down():
+            raise RuntimeError("postgrest down")
+
+        monkeypatch.setattr(ai_act, "get_async_supabase", _down)
+        assert await ai_act._get_tenant_industry("tenant-1") == ai_act.DEFAULT_INDUSTRY
+        assert "tenant-1" not in cache
+
+
+class TestComplianceContext:
+    """Tests for the combined auth + tenant industry dependency."""
+
+    @pytest.fixture(autouse=True)
+    def cache(self, monkeypatch):
+        monkeypatch.setattr(ai_act, "_tenant_industry_cache", ai_act.TTLCache(maxsize=16, ttl=300))
+
+    @pytest.fixture
+    def auth(self, monkeypatch):
+        import asyncio
+
+        state = {"identity": _Identity(), "verified": False}
+
+        async def _verify(authorization):
+            await asyncio.sleep(0.01)
+            state["verified"] = True
+            return state["identity"]
+
+        monkeypatch.setattr(ai_act, "verify_identity_envelope", _verify)
+        return state
+
+    @pytest.mark.asyncio
+    async def test_lookup_starts_after_auth(self, db, auth, monkeypatch):
+        lookups = []
+
+        async def _industry(tenant_id):
+            lookups.append((tenant_id, auth["verified"]))
+            return "Finance"
+
+        monkeypatch.setattr(ai_act, "_get_tenant_industry", _industry)
+        ctx = await ai_act.compliance_ctx("Bearer t")
+        assert ctx.tenant_industry == "Finance"
+        assert ctx.identity is auth["identity"]
+        assert lookups == [("tenant-1", True)]  # tenant verificado, nunca una pista del cliente
+
+    @pytest.mark.asyncio
+    async def test_rejected_token_never_touches_the_db(self, db, auth, monkeypatch):
+        async def _reject(authorization):
+            raise HTTPException(status_code=401, detail="Invalid token")
+
+        monkeypatch.setattr(ai_act, "verify_identity_envelope", _reject)
+        with pytest.raises(HTTPException) as exc:
+            await ai_act.compliance_ctx("Bearer forged")
+        assert exc.value.status_code == 401
+        assert db.calls == []
+
+    @pytest.mark.asyncio
+    async def test_rbac_is_enforced(self, db, auth):
+        auth["identity"].role = "member"
+        with pytest.raises(HTTPException) as exc:
+            await ai_act.compliance_ctx("Bearer t")
+        assert exc.value.status_code == 403
+        assert db.calls == []
+
+    def test_fria_route_uses_context(self):
+        route = next(r for r in ai_act.router.routes if r.path == "/ai-act/fria/generate")
+        assert any(dep.call is ai_act.compliance_ctx for dep in route.dependant.dependencies)
+
+
+class TestApprovalQueue:
+    """Tests for the human approval queue service."""
+
+    @pytest.fixture(autouse=True)
+    def clear_pending_cache(self):
+        ai_act._pending_cache.clear()
+        ai_act._inflight_pending.clear()
+        yield
+        ai_act._pending_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_pending_approvals_are_scoped_to_tenant(self, db):
+        db.results["ai_act_approval_queue"] = FakeResult([{"id": "a-1"}])
+        assert await approval_queue.human_approval_queue.get_pending_approvals("tenant-1") == [{"id": "a-1"}]
+        assert ("tenant_id", "tenant-1") in db.calls_to("ai_act_approval_queue")
+
+    @pytest.mark.asyncio
+    async def test_list_projects_response_columns_without_revalidation(self, db):
+        row = dict.fromkeys(ai_act.ApprovalResponse.model_fields, "x")
+        db.results["ai_act_approval_queue"] = FakeResult([row])
+        res = await ai_act.list_pending_approvals(identity=_Identity())
+        assert json.loads(res.body) == [row]
+        assert ("ai_act_approval_queue", "select", (ai_act.APPROVAL_COLUMNS,)) in db.calls
+
+    @pytest.mark.asyncio
+    async def test_concurrent_and_repeat_polls_share_one_fetch(self, db):
+        import asyncio
+
+        db.results["ai_act_approval_queue"] = FakeResult([{"id": "a-1"}])
+        polls = await asyncio.gather(*(ai_act.list_pending_approvals(identity=_Identity()) for _ in range(3)))
+        await ai_act.list_pending_approvals(identity=_Identity())
+        assert [method for _, method, _ in db.calls].count("select") == 1
+        assert all(json.loads(res.body) == [{"id": "a-1"}] for res in polls)
+        assert ai_act._inflight_pending == {}
+
+    @pytest.mark.asyncio
+    async def test_decision_invalidates_tenant_queue(self, db):
+        from uuid import uuid4
+
+        db.results["ai_act_approval_queue"] = FakeResult([{"id": "a-1"}])
+        await ai_act.list_pending_approvals(identity=_Identity())
+        ai_act._pending_cache[("tenant-2", 50)] = []
+        await ai_act.reject_request(uuid4(), ai_act.RejectRequest(rejection_reason="Not justified."), identity=_Identity())
+        assert list(ai_act._pending_cache) == [("tenant-2", 50)]
+
+    @pytest.mark.asyncio
+    async def test_failed_fetch_is_not_cached(self, db, monkeypatch):
+        async def _boom(*args, **kwargs):
+            raise RuntimeError("postgrest down")
+
+        monkeypatch.setattr(ai_act.human_approval_queue, "get_pending_approvals", _boom)
+        with pytest.raises(HTTPException) as exc:
+            await ai_act.list_pending_approvals(identity=_Identity())
+        assert exc.value.status_code == 500
+        assert ai_act._pending_cache.currsize == 0
+
+    @pytest.mark.asyncio
+    async def test_approve_only_pending(self, db):
+        db.results["ai_act_approval_queue"] = FakeResult([])
+        assert await approval_queue.human_approval_queue.approve_request("a-1", "tenant-1", "user-1") is False
+        assert ("ai_act_approval_queue", "eq", ("status", "PENDING")) in db.calls
+
+    @pytest.mark.asyncio
+    async def test_wait_for_approval_polls_only_status(self, db):
+        db.results["ai_act_approval_queue"] = FakeResult([{"status": "APPROVED"}])
+        assert await approval_queue.human_approval_queue.wait_for_approval("a-1") is True
+        assert ("ai_act_approval_queue", "select", ("status",)) in db.calls
+
+    @pytest.mark.asyncio
+    async def test_unknown_approval_status_is_none(self, db):
+        db.results["ai_act_approval_queue"] = FakeResult([])
+        assert await approval_queue.human_approval_queue.get_approval_status("a-1") is None
+
+    @pytest.mark.asyncio
+    async def test_decisions_are_scoped_to_tenant_in_one_update(self, db):
+        db.results["ai_act_approval_queue"] = FakeResult([{"id": "a-1"}])
+        assert await approval_queue.human_approval_queue.reject_request("a-1", "tenant-1", "user-1", "no") is True
+        assert ("tenant_id", "tenant-1") in db.calls_to("ai_act_approval_queue")
+        assert [method for _, method, _ in db.calls].count("update") == 1
+        assert not any(method in ("select", "single") for _, method, _ in db.calls)
+
+    @pytest.mark.asyncio
+    async def test_details_filter_tenant_in_the_query(self, db):
+        from uuid import uuid4
+
+        db.results["ai_act_approval_queue"] = FakeResult([])
+        with pytest.raises(HTTPException) as exc:
+            await ai_act.get_approval_details(uuid4(), identity=_Identity())
+        assert exc.value.status_code == 404
+        assert ("tenant_id", "tenant-1") in db.calls_to("ai_act_approval_queue")
+        assert ("ai_act_approval_queue", "select", (ai_act.APPROVAL_COLUMNS,)) in db.calls
+
+    @pytest.mark.asyncio
+    async def test_foreign_or_decided_approval_is_404(self, db):
+        from uuid import uuid4
+
+        db.results["ai_act_approval_queue"] = FakeResult([])
+        payload = ai_act.ApprovalRequest(approval_note="ok")
+        with pytest.raises(HTTPException) as exc:
+            await ai_act.approve_request(uuid4(), payload, identity=_Identity())
+        assert exc.value.status_code == 404
+
+
+class TestComplianceSummary:
+    """Tests for the compliance summary RPC and its fallback."""
+
+    @pytest.mark.asyncio
+    async def test_rpc_result_is_authoritative(self, db):
+        db.results["rpc:get_compliance_summary"] = FakeResult({"total_requests": 7})
+        res = await ai_act.get_compliance_summary(date(2026, 10, 1), date(2026, 10, 18), identity=_Identity())
+        assert res == {"total_requests": 7}
+        assert not any(name == "ai_act_audit_log" for name, _, _ in db.calls)
+
+    @pytest.mark.asyncio
+    async def test_missing_rpc_falls_back_to_single_pass(self, db, monkeypatch):
+        from postgrest.exceptions import APIError
+
+        def _missing(name, params):
+            raise APIError({"code": ai_act.RPC_NOT_FOUND, "message": "not found"})
+
+        monkeypatch.setattr(db, "rpc", _missing)
+        db.results["ai_act_audit_log"] = FakeResult([
+            {"risk_level": "PROHIBITED", "required_human_approval": False, "approval_status": None},
+            {"risk_level": "HIGH_RISK", "required_human_approval": True, "approval_status": "APPROVED"},
+            {"risk_level": "HIGH_RISK", "required_human_approval": True, "approval_status": "REJECTED"},
+        ])
+        res = await ai_act.get_compliance_summary(date(2026, 10, 1), date(2026, 10, 18), identity=_Identity())
+        assert res == {
+            "total_requests": 3,
+            "prohibited_blocked": 1,
+            "high_risk_approvals_required": 2,
+            "high_risk_approved": 1,
+            "risk_distribution": {"PROHIBITED": 1, "HIGH_RISK": 2, "LIMITED_RISK": 0, "MINIMAL_RISK": 0},
+        }
+
+    @pytest.mark.asyncio
+    async def test_other_rpc_errors_are_500(self, db, monkeypatch):
+        from postgrest.exceptions import APIError
+
+        def _broken(name, params):
+            raise APIError({"code": "42P01", "message": "relation does not exist"})
+
+        monkeypatch.setattr(db, "rpc", _broken)
+        with pytest.raises(HTTPException) as exc:
+            await ai_act.get_compliance_summary(date(2026, 10, 1), date(2026, 10, 18), identity=_Identity())
+        assert exc.value.status_code == 500
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.ttls = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+        self.ttls[key] = ex
+
+
+class TestClassifyCache:
+    """Tests for the Redis-backed classification cache."""
+
+    @pytest.fixture
+    def redis(self, monkeypatch):
+        fake = _FakeRedis()
+        monkeypatch.setattr(ai_act, "redis_client", fake)
+        return fake
+
+    @pytest.fixture(autouse=True)
+    def audit_rows(self, monkeypatch):
+        return _capture_audit_rows(monkeypatch)
+
+    @pytest.fixture(autouse=True)
+    def clear_explain_cache(self):
+        ai_act._explain_cache.clear()
+        yield
+        ai_act._explain_cache.clear()
+
+    @pytest.fixture
+    def classifier(self, monkeypatch):
+        calls = []
+
+        async def _classify(prompt, context):
+            calls.append(prompt)
+            return ai_act.RiskLevel.LIMITED_RISK, "CHATBOT", 0.8
+
+        monkeypatch.setattr(ai_act.eu_ai_act_classifier, "classify", _classify)
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_repeated_prompt_is_served_from_cache(self, redis, classifier):
+        from fastapi import Response
+
+        payload = ai_act.ClassificationRequest(prompt="Build a support chatbot", context={"dept": "cx"})
+        first_response, second_response = Response(), Response()
+        first = await ai_act.classify_request(payload, first_response, identity=_Identity())
+        again = ai_act.ClassificationRequest(prompt="  build a SUPPORT chatbot ", context={"dept": "cx"})
+        second = await ai_act.classify_request(again, second_response, identity=_Identity())
+
+        assert classifier == ["Build a support chatbot"]
+        assert first_response.headers["X-Cache"] == "MISS"
+        assert second_response.headers["X-Cache"] == "HIT"
+        assert second == first
+        assert list(redis.ttls.values()) == [ai_act.CLASSIFY_CACHE_TTL]
+
+    @pytest.mark.asyncio
+    async def test_every_classification_is_audited(self, redis, classifier, audit_rows):
+        from fastapi import Response
+
+        payload = ai_act.ClassificationRequest(prompt="Build a support chatbot")
+        await ai_act.classify_request(payload, Response(), identity=_Identity())
+        await ai_act.classify_request(payload, Response(), identity=_Identity())
+
+        assert len(audit_rows) == 2
+        assert audit_rows[0]["trace_id"] != audit_rows[1]["trace_id"]
+        assert audit_rows[1]["tenant_id"] == "tenant-1"
+        assert audit_rows[1]["risk_level"] == "LIMITED_RISK"
+        assert audit_rows[1]["approval_status"] == "NOT_REQUIRED"
+        assert "audit_hash" not in audit_rows[1]  # lo calcula el trigger del hash chain
+
+    @pytest.mark.asyncio
+    async def test_audit_summary_never_stores_prompt_text(self, redis, classifier, audit_rows):
+        from fastapi import Response
+
+        payload = ai_act.ClassificationRequest(prompt="Email ana@example.com about her loan")
+        await ai_act.classify_request(payload, Response(), identity=_Identity())
+
+        assert "ana@example.com" not in audit_rows[0]["request_summary"]
+        assert audit_rows[0]["request_summary"] == f"[prompt withheld: {len(payload.prompt)} chars]"
+
+    @pytest.mark.parametrize(
+        "level,approval,transparency",
+        [("PROHIBITED", False, False), ("HIGH_RISK", True, False), ("LIMITED_RISK", False, True), ("MINIMAL_RISK", False, False)],
+    )
+    @pytest.mark.asyncio
+    async def test_obligations_follow_risk_level(self, monkeypatch, level, approval, transparency):
+        async def _classify(prompt, context):
+            return level, "OTHER", 0.9  # el clasificador puede devolver el valor plano
+
+        monkeypatch.setattr(ai_act.eu_ai_act_classifier, "classify", _classify)
+        result, _ = await ai_act._classify(ai_act.ClassificationRequest(prompt="p"), False, _Identity())
+        assert result.article_reference == ai_act.ARTICLE_MAP[ai_act.RiskLevel(level)]
+        assert (result.requires_approval, result.transparency_required) == (approval, transparency)
+
+    def test_key_separates_tenant_context_and_explain(self):
+        payload = ai_act.ClassificationRequest(prompt="p", context={"a": 1})
+        base = ai_act._classification_key(payload, False, "tenant-1")
+        assert base != ai_act._classification_key(payload, True, "tenant-1")
+        assert base != ai_act._classification_key(payload, False, "tenant-2")
+        other = ai_act.ClassificationRequest(prompt="p", context={"a": 2})
+        assert base != ai_act._classification_key(other, False, "tenant-1")
+
+    @pytest.mark.asyncio
+    async def test_explanation_sends_static_system_prefix(self, redis, classifier, monkeypatch):
+        from fastapi import Response
+
+        sent = []
+
+        async def _llm(**kwargs):
+            sent.append(kwargs["messages"])
+            return "Customer-facing chatbot."
+
+        monkeypatch.setattr(ai_act, "execute_with_resilience", _llm)
+        for prompt in ("Build a support chatbot", "Build a sales chatbot"):
+            payload = ai_act.ClassificationRequest(prompt=prompt)
+            await ai_act.classify_request(payload, Response(), explain=True, identity=_Identity())
+
+        assert [messages[0] for messages in sent] == [ai_act._CLASSIFY_EXPLAIN_SYSTEM] * 2
+        assert "sales chatbot" in sent[1][1]["content"]
+
+    @pytest.mark.asyncio
+    async def test_explanation_is_reused_across_contexts(self, redis, classifier, monkeypatch):
+        from fastapi import Response
+
+        calls = []
+
+        async def _llm(**kwargs):
+            calls.append(kwargs)
+            return "Customer-facing chatbot."
+
+        monkeypatch.setattr(ai_act, "execute_with_resilience", _llm)
+        for context in ({"dept": "cx"}, {"dept": "sales"}):
+            payload = ai_act.ClassificationRequest(prompt="Build a support chatbot", context=context)
+            result = await ai_act.classify_request(payload, Response(), explain=True, identity=_Identity())
+            assert result.article_reference.endswith("NOTE: Customer-facing chatbot.")
+
+        assert len(calls) == 1
+        assert classifier == ["Build a support chatbot"] * 2  # la clasificación sí depende del contexto
+
+    @pytest.mark.asyncio
+    async def test_explanation_survives_restart_via_redis(self, redis, classifier, monkeypatch):
+        async def _llm(**kwargs):
+            return "Customer-facing chatbot."
+
+        monkeypatch.setattr(ai_act, "execute_with_resilience", _llm)
+        args = ("Build a support chatbot", "LIMITED_RISK", "CHATBOT", _Identity())
+        await ai_act._explain(*args)
+        ai_act._explain_cache.clear()
+
+        async def _llm_down(**kwargs):
+            raise AssertionError("should be served from Redis")
+
+        monkeypatch.setattr(ai_act, "execute_with_resilience", _llm_down)
+        assert await ai_act._explain(*args) == "Customer-facing chatbot."
+
+    @pytest.mark.asyncio
+    async def test_failed_explanation_is_not_cached(self, redis, classifier, monkeypatch):
+        from fastapi import Response
+
+        async def _llm_down(**kwargs):
+            raise RuntimeError("llm down")
+
+        monkeypatch.setattr(ai_act, "execute_with_resilience", _llm_down)
+        payload = ai_act.ClassificationRequest(prompt="Build a support chatbot")
+        await ai_act.classify_request(payload, Response(), explain=True, identity=_Identity())
+        assert redis.store == {}
+
+
+class TestClassifyBatch:
+    """Tests for the fire-and-forget bulk classification endpoint."""
+
+    @pytest.fixture(autouse=True)
+    def redis(self, monkeypatch):
+        fake = _FakeRedis()
+        monkeypatch.setattr(ai_act, "redis_client", fake)
+        return fake
+
+    @pytest.mark.asyncio
+    async def test_returns_trace_ids_before_classifying(self, monkeypatch):
+        from fastapi import BackgroundTasks
+
+        async def _never(prompt, context):
+            raise AssertionError("classification must run after the response")
+
+        monkeypatch.setattr(ai_act.eu_ai_act_classifier, "classify", _never)
+        batch = ai_act.ClassificationBatchRequest(
+            items=[ai_act.ClassificationRequest(prompt=f"p{i}") for i in range(3)]
+        )
+        tasks = BackgroundTasks()
+        accepted = await ai_act.classify_batch(batch, tasks, identity=_Identity())
+        assert len(set(accepted.trace_ids)) == 3
+        assert len(tasks.tasks) == 1
+
+    @pytest.mark.asyncio
+    async def test_background_run_audits_each_item_under_its_trace_id(self, monkeypatch):
+        rows = _capture_audit_rows(monkeypatch)
+
+        async def _classify(prompt, context):
+            if prompt == "boom":
+                raise RuntimeError("classifier down")
+            return ai_act.RiskLevel.MINIMAL_RISK, "GENERAL", 0.7
+
+        monkeypatch.setattr(ai_act.eu_ai_act_classifier, "classify", _classify)
+        items = [ai_act.ClassificationRequest(prompt=p) for p in ("a", "boom", "c")]
+        await ai_act._classify_batch(items, ["t-a", "t-boom", "t-c"], _Identity())
+        assert [row["trace_id"] for row in rows] == ["t-a", "t-c"]
+
+    @pytest.mark.asyncio
+    async def test_fan_out_is_bounded(self, monkeypatch):
+        _capture_audit_rows(monkeypatch)
+        state = {"running": 0, "peak": 0}
+
+        async def _classify(prompt, context):
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+            await asyncio.sleep(0.001)
+            state["running"] -= 1
+            return ai_act.RiskLevel.MINIMAL_RISK, "GENERAL", 0.7
+
+        monkeypatch.setattr(ai_act.eu_ai_act_classifier, "classify", _classify)
+        items = [ai_act.ClassificationRequest(prompt=f"p{i}") for i in range(40)]
+        await ai_act._classify_batch(items, [f"t{i}" for i in range(40)], _Identity())
+        assert state["peak"] == ai_act.CLASSIFY_BATCH_CONCURRENCY
+
+    @pytest.mark.asyncio
+    async def test_items_share_the_classify_cache(self, monkeypatch, redis):
+        from fastapi import Response
+
+        rows = _capture_audit_rows(monkeypatch)
+        calls = []
+
+        async def _classify(prompt, context):
+            calls.append(prompt)
+            return ai_act.RiskLevel.LIMITED_RISK, "CHATBOT", 0.8
+
+        monkeypatch.setattr(ai_act.eu_ai_act_classifier, "classify", _classify)
+        await ai_act.classify_request(ai_act.ClassificationRequest(prompt="chatbot"), Response(), identity=_Identity())
+        items = [ai_act.ClassificationRequest(prompt=p) for p in ("chatbot", "new prompt")]
+        await ai_act._classify_batch(items, ["t-hit", "t-miss"], _Identity())
+
+        assert calls == ["chatbot", "new prompt"]  # el primer item sale de Redis
+        assert len(redis.store) == 2
+        assert [row["trace_id"] for row in rows][1:] == ["t-hit", "t-miss"]
+
+    def test_batch_size_is_capped(self):
+        from pydantic import ValidationError
+
+        items = [{"prompt": "p"}] * (ai_act.CLASSIFY_BATCH_MAX_ITEMS + 1)
+        with pytest.raises(ValidationError):
+            ai_act.ClassificationBatchRequest(items=items)
+
+
+class TestVerifyAuditChain:
+    """Tests for the server-side audit chain verification."""
+
+    @pytest.mark.asyncio
+    async def test_intact_chain(self, db):
+        db.results["rpc:verify_ai_act_audit_chain"] = FakeResult([{"checked": 42, "first_broken_trace_id": None}])
+        res = await ai_act.verify_audit_chain(identity=_Identity())
+        assert res.valid is True
+        assert res.checked == 42
+
+    @pytest.mark.asyncio
+    async def test_broken_link_is_reported(self, db):
+        db.results["rpc:verify_ai_act_audit_chain"] = FakeResult([{"checked": 3, "first_broken_trace_id": "trc-4"}])
+        res = await ai_act.verify_audit_chain(identity=_Identity())
+        assert res.valid is False
+        assert res.first_broken_trace_id == "trc-4"
+
+    def test_verify_route_is_not_shadowed_by_trace_lookup(self):
+        paths = [route.path for route in ai_act.router.routes]
+        assert paths.index("/ai-act/audit/verify") < paths.index("/ai-act/audit/{trace_id}")
+
+
+class TestConformityAssessment:
+    """Tests for the signed conformity assessment."""
+
+    @pytest.fixture
+    def redis(self, monkeypatch):
+        fake = _FakeRedis()
+        monkeypatch.setattr(ai_act, "redis_client", fake)
+        return fake
+
+    @pytest.fixture(autouse=True)
+    def clear_l1(self):
+        ai_act._conformity_cache.clear()
+        yield
+        ai_act._conformity_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_energy_factor_comes_from_snapshot(self, redis, monkeypatch):
+        from fastapi import Response
+
+        async def _no_io():
+            raise AssertionError("energy config must not be fetched per request")
+
+        monkeypatch.setattr(ai_act.carbon_governor, "get_dynamic_config", _no_io)
+        monkeypatch.setattr(ai_act.carbon_governor, "_energy_config", {"default": 0.002})
+        res = await ai_act.get_conformity_assessment(Response(), identity=_Identity())
+        metrics = res.requirements["energy_efficiency"]["metrics"]
+        assert metrics["efficiency_factor"] == "0.002 kWh/1k tokens"
+        assert res.digital_signature
+
+    @pytest.mark.asyncio
+    async def test_signed_document_is_cached_per_tenant_and_day(self, redis, monkeypatch):
+        from fastapi import Response
+
+        signed = []
+
+        def _sign(payload):
+            signed.append(payload["tenant_id"])
+            return "sig"
+
+        monkeypatch.setattr(ai_act, "sign_payload", _sign)
+        first_response, second_response = Response(), Response()
+        first = await ai_act.get_conformity_assessment(first_response, identity=_Identity())
+        second = await ai_act.get_conformity_assessment(second_response, identity=_Identity())
+
+        assert signed == ["tenant-1"]
+        assert second == first
+        assert (first_response.headers["X-Cache"], second_response.headers["X-Cache"]) == ("MISS", "HIT")
+        assert list(redis.ttls.values()) == [ai_act.CONFORMITY_CACHE_TTL]
+        assert ai_act.today_iso() in next(iter(redis.store))
+
+    @pytest.mark.asyncio
+    async def test_redis_outage_does_not_resign(self, monkeypatch):
+        from fastapi import Response
+
+        class _DownRedis:
+            async def get(self, key):
+                raise ConnectionError("redis down")
+
+            async def set(self, key, value, ex=None):
+                raise ConnectionError("redis down")
+
+        signed = []
+        monkeypatch.setattr(ai_act, "redis_client", _DownRedis())
+        monkeypatch.setattr(ai_act, "sign_payload", lambda payload: signed.append(1) or "sig")
+        second_response = Response()
+        await ai_act.get_conformity_assessment(Response(), identity=_Identity())
+        await ai_act.get_conformity_assessment(second_response, identity=_Identity())
+        assert signed == [1]
+        assert second_response.headers["X-Cache"] == "HIT"
+
+
+class TestRouter:
+    """Tests for router-level configuration."""
+
+    def test_routes_serialize_with_orjson(self):
+        from fastapi.responses import ORJSONResponse
+
+        for route in ai_act.router.routes:
+            assert route.response_class is ORJSONResponse
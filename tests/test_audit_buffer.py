@@ -0,0 +1,212 @@
+"""
+Tests for Audit Log Buffer - batched audit-log writes.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+import app.services.audit_buffer as audit_buffer
+from app.services.audit_buffer import AuditLogBuffer
+
+
+class _Result:
+    data = []
+
+
+class _AuditSink:
+    def __init__(self):
+        self.batches = []
+        self.rejected = set()  # "details" de filas que violan una constraint
+        self.gate = None  # asyncio.Event: retiene el INSERT en curso
+
+    def table(self, name):
+        self.table_name = name
+        return self
+
+    def insert(self, rows):
+        self.pending = rows if isinstance(rows, list) else [rows]
+        return self
+
+    async def execute(self):
+        if self.gate is not None:
+            await self.gate.wait()
+        if any(row["details"] in self.rejected for row in self.pending):
+            raise RuntimeError("null value in column violates not-null constraint")
+        self.batches.append(self.pending)
+        return _Result()
+
+
+class _FakeRedis:
+    def __init__(self, fail=False):
+        self.lists = {}
+        self.fail = fail
+
+    async def rpush(self, key, value):
+        if self.fail:
+            raise ConnectionError("redis down")
+        self.lists.setdefault(key, []).append(value)
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    fake = _AuditSink()
+
+    async def _get_db():
+        return fake
+
+    monkeypatch.setattr(audit_buffer, "get_async_supabase", _get_db)
+    monkeypatch.setattr(audit_buffer, "_buffers", [])
+    return fake
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = _FakeRedis()
+    monkeypatch.setattr(audit_buffer, "redis_client", fake)
+    return fake
+
+
+def _row(i):
+    return {"tenant_id": "tenant-1", "event_type": "POLICY_CREATED", "details": f"event {i}"}
+
+
+class TestAuditLogBuffer:
+    """Tests for batching, backpressure and shutdown drain."""
+
+    @pytest.mark.asyncio
+    async def test_events_are_written_in_one_insert(self, sink):
+        buffer = AuditLogBuffer("audit_logs", flush_interval=0)
+        for i in range(3):
+            await buffer.put(_row(i))
+
+        assert await buffer.flush_batch() == 3
+        assert sink.table_name == "audit_logs"
+        assert [row["details"] for row in sink.batches[0]] == ["event 0", "event 1", "event 2"]
+
+    @pytest.mark.asyncio
+    async def test_batch_is_capped(self, sink):
+        buffer = AuditLogBuffer("audit_logs", batch_size=10)
+        for i in range(15):
+            await buffer.put(_row(i))
+
+        assert await buffer.flush_batch() == 10
+        assert buffer.queue.qsize() == 5
+
+    @pytest.mark.asyncio
+    async def test_waits_for_late_events_within_interval(self, sink):
+        buffer = AuditLogBuffer("audit_logs", flush_interval=0.2)
+        await buffer.put(_row(0))
+
+        async def _late():
+            await asyncio.sleep(0.01)
+            await buffer.put(_row(1))
+
+        asyncio.create_task(_late())
+        assert await buffer.flush_batch() == 2
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_and_counts(self, sink):
+        buffer = AuditLogBuffer("audit_logs", maxsize=2, backpressure_delay=0)
+        for i in range(3):
+            await buffer.put(_row(i))
+
+        assert buffer.queue.qsize() == 2
+        assert buffer.dropped == 1
+
+    @pytest.mark.asyncio
+    async def test_lossless_buffer_waits_instead_of_dropping(self, sink):
+        buffer = AuditLogBuffer("ai_act_audit_log", batch_size=2, maxsize=2, backpressure_delay=0, lossless=True)
+        for i in range(2):
+            await buffer.put(_row(i))
+
+        blocked = asyncio.create_task(buffer.put(_row(2)))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+
+        await buffer.flush_batch()
+        await blocked
+        assert buffer.dropped == 0
+        assert buffer.queue.qsize() == 1
+
+    @pytest.mark.asyncio
+    async def test_bad_row_does_not_discard_its_batch(self, sink, redis):
+        """A failed bulk INSERT is retried row by row; only the bad row is dead-lettered."""
+        sink.rejected = {"event 1"}
+        buffer = AuditLogBuffer("ai_act_audit_log", flush_interval=0)
+        for i in range(3):
+            await buffer.put(_row(i))
+
+        await buffer.flush_batch()
+        assert [batch[0]["details"] for batch in sink.batches] == ["event 0", "event 2"]
+        assert buffer.dead_lettered == 1
+        [entry] = redis.lists["audit:dead_letter:ai_act_audit_log"]
+        assert json.loads(entry)["row"]["details"] == "event 1"
+
+    @pytest.mark.asyncio
+    async def test_dead_letter_failure_is_logged_with_payload(self, sink, monkeypatch, caplog):
+        monkeypatch.setattr(audit_buffer, "redis_client", _FakeRedis(fail=True))
+        sink.rejected = {"event 0"}
+        buffer = AuditLogBuffer("ai_act_audit_log", flush_interval=0)
+        await buffer.put(_row(0))
+
+        await buffer.flush_batch()
+        assert buffer.dead_lettered == 1
+        assert "event 0" in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_stop_drains_pending_events(self, sink):
+        buffer = AuditLogBuffer("audit_logs", batch_size=50)
+        audit_buffer.start_audit_buffers()
+        for i in range(120):
+            await buffer.put(_row(i))
+
+        await audit_buffer.stop_audit_buffers()
+        assert buffer.queue.empty()
+        assert sum(len(batch) for batch in sink.batches) == 120
+        assert all(len(batch) <= 50 for batch in sink.batches)
+
+    @pytest.mark.asyncio
+    async def test_stop_waits_for_in_flight_insert(self, sink):
+        """Shutdown cancels the worker mid-INSERT; stop() still waits for that batch to land."""
+        sink.gate = asyncio.Event()
+        buffer = AuditLogBuffer("ai_act_audit_log", flush_interval=0, lossless=True)
+        buffer.start()
+        await buffer.put(_row(0))
+        await asyncio.sleep(0.01)  # el worker ya está dentro del INSERT
+
+        stopping = asyncio.create_task(buffer.stop())
+        await asyncio.sleep(0.01)
+        assert not stopping.done()
+
+        sink.gate.set()
+        await stopping
+        assert [batch[0]["details"] for batch in sink.batches] == ["event 0"]
+
+
+class TestAiActAuditChain:
+    """Tests for the write-behind AI Act audit trail appender."""
+
+    @pytest.mark.asyncio
+    async def test_append_is_fire_and_forget(self, sink, monkeypatch):
+        import app.services.audit_chain as audit_chain
+
+        buffer = AuditLogBuffer("ai_act_audit_log", batch_size=100, flush_interval=0)
+        monkeypatch.setattr(audit_chain, "ai_act_audit_buffer", buffer)
+        for i in range(3):
+            audit_chain.append_async(_row(i))
+        assert buffer.queue.qsize() == 0  # la respuesta no espera al encolado
+
+        await asyncio.sleep(0)
+        assert await buffer.flush_batch() == 3
+        assert sink.table_name == "ai_act_audit_log"
+        assert len(sink.batches) == 1
+
+    def test_batching_follows_settings(self):
+        from app.config import settings
+        from app.services.audit_chain import ai_act_audit_buffer
+
+        assert ai_act_audit_buffer.batch_size == settings.AUDIT_TRAIL_BUFFER_BATCH_SIZE
+        assert ai_act_audit_buffer.flush_interval == settings.AUDIT_TRAIL_BUFFER_FLUSH_INTERVAL
+        assert ai_act_audit_buffer.lossless  # Article 12: las filas regulatorias nunca se descartan
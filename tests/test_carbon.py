@@ -0,0 +1,50 @@
+"""
+Tests for Carbon Governor - background energy config snapshot.
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.carbon import CarbonGovernor
+
+
+class TestEnergyConfigSnapshot:
+    """Tests for the periodically refreshed energy config."""
+
+    def test_snapshot_starts_with_default(self):
+        assert CarbonGovernor().get_dynamic_config_cached() == {"default": 0.001}
+
+    @pytest.mark.asyncio
+    async def test_refresh_loop_swaps_snapshot(self, monkeypatch):
+        governor = CarbonGovernor()
+        refreshed = asyncio.Event()
+
+        async def _load():
+            refreshed.set()
+            return {"default": 0.004, "gpt-4": 0.01}
+
+        monkeypatch.setattr(governor, "get_dynamic_config", _load)
+        task = asyncio.create_task(governor.run_refresh_loop(interval=3600))
+        await asyncio.wait_for(refreshed.wait(), 1)
+        task.cancel()
+
+        assert governor.get_dynamic_config_cached()["default"] == 0.004
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_keeps_last_snapshot(self, monkeypatch):
+        governor = CarbonGovernor()
+        attempted = asyncio.Event()
+
+        async def _broken():
+            attempted.set()
+            raise RuntimeError("redis down")
+
+        monkeypatch.setattr(governor, "get_dynamic_config", _broken)
+        task = asyncio.create_task(governor.run_refresh_loop(interval=3600))
+        await asyncio.wait_for(attempted.wait(), 1)
+        await asyncio.sleep(0)
+        assert not task.done()
+        task.cancel()
+
+        assert governor.get_dynamic_config_cached() == {"default": 0.001}
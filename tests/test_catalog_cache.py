@@ -0,0 +1,94 @@
+"""
+Tests for Catalog Cache - tool / department name -> id resolution.
+"""
+
+import asyncio
+
+import pytest
+
+import app.services.catalog_cache as catalog_cache
+from tests.conftest import FakeResult
+
+
+@pytest.fixture
+def db(monkeypatch, fake_db):
+    fake_db.results["tool_definitions"] = FakeResult([{"id": "tool-1"}])
+    fake_db.results["departments"] = FakeResult([{"id": "dept-1"}])
+    monkeypatch.setattr(catalog_cache, "get_async_supabase", fake_db.get_async_supabase)
+    monkeypatch.setattr(catalog_cache, "_cache", catalog_cache.TTLCache(maxsize=100, ttl=300))
+    monkeypatch.setattr(catalog_cache, "_inflight", {})
+    return fake_db
+
+
+class TestResolve:
+    """Tests for cached lookups."""
+
+    @pytest.mark.asyncio
+    async def test_hit_skips_database(self, db):
+        assert await catalog_cache.resolve_tool_id("tenant-1", "code-interpreter") == "tool-1"
+        assert await catalog_cache.resolve_tool_id("tenant-1", "code-interpreter") == "tool-1"
+        assert db.executed == ["tool_definitions"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_fetch_once(self, db):
+        results = await asyncio.gather(
+            *(catalog_cache.resolve_dept_id("tenant-1", "Marketing") for _ in range(5))
+        )
+        assert results == ["dept-1"] * 5
+        assert db.executed == ["departments"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_of_a_missing_name_fetch_once(self, db):
+        """Not-found results are not cached, but concurrent callers still share one lookup."""
+        db.results["tool_definitions"] = FakeResult([])
+        results = await asyncio.gather(
+            *(catalog_cache.resolve_tool_id("tenant-1", "ghost") for _ in range(5))
+        )
+        assert results == [None] * 5
+        assert db.executed == ["tool_definitions"]
+        assert catalog_cache._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_followers(self, db):
+        leader = asyncio.create_task(catalog_cache.resolve_tool_id("tenant-1", "code-interpreter"))
+        follower = asyncio.create_task(catalog_cache.resolve_tool_id("tenant-1", "code-interpreter"))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        assert await follower == "tool-1"
+        assert db.executed == ["tool_definitions"]
+
+    @pytest.mark.asyncio
+    async def test_department_key_is_case_insensitive(self, db):
+        await catalog_cache.resolve_dept_id("tenant-1", "Marketing")
+        await catalog_cache.resolve_dept_id("tenant-1", "marketing")
+        assert db.executed == ["departments"]
+
+    @pytest.mark.asyncio
+    async def test_missing_tool_is_not_cached(self, db):
+        db.results["tool_definitions"] = FakeResult([])
+        assert await catalog_cache.resolve_tool_id("tenant-1", "ghost") is None
+        db.results["tool_definitions"] = FakeResult([{"id": "tool-2"}])
+        assert await catalog_cache.resolve_tool_id("tenant-1", "ghost") == "tool-2"
+
+    @pytest.mark.asyncio
+    async def test_lookups_are_tenant_scoped(self, db):
+        await catalog_cache.resolve_tool_id("tenant-1", "code-interpreter")
+        await catalog_cache.resolve_dept_id("tenant-2", "Marketing")
+        assert ("tenant_id", "tenant-1") in db.calls_to("tool_definitions")
+        assert ("tenant_id", "tenant-2") in db.calls_to("departments")
+        assert ("tenant_id", "tenant-1") not in db.calls_to("departments")
+
+
+class TestInvalidation:
+    """Tests for per-tenant invalidation."""
+
+    @pytest.mark.asyncio
+    async def test_invalidate_local_drops_only_tenant(self, db):
+        await catalog_cache.resolve_tool_id("tenant-1", "code-interpreter")
+        await catalog_cache.resolve_tool_id("tenant-2", "code-interpreter")
+        catalog_cache.invalidate_local("tenant-1")
+
+        await catalog_cache.resolve_tool_id("tenant-1", "code-interpreter")
+        await catalog_cache.resolve_tool_id("tenant-2", "code-interpreter")
+        assert db.executed == ["tool_definitions"] * 3
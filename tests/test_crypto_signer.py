@@ -1,22 +1,29 @@
 """
 Tests for Crypto Signer - Digital Notary System
-Tests RSA signing, hash generation, and signature consistency.
+Tests Ed25519 signing (with legacy RSA keys), hash generation, and signature consistency.
 """
 
+import base64
+import json
+
 import pytest
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
 
-from app.services.crypto_signer import hash_content, sign_payload
+import app.services.crypto_signer as crypto_signer
+from app.services.crypto_signer import canonical_json, hash_content, sign_payload
 
 
 class TestSignPayload:
-    """Tests for the RSA signing functionality."""
+    """Tests for the signing functionality."""
 
     def test_sign_returns_base64_string(self):
         """Signature should be a Base64 encoded string."""
         payload = {"user": "test", "amount": 100}
         signature = sign_payload(payload)
         assert isinstance(signature, str)
-        assert len(signature) > 50  # RSA-2048 sig in Base64 is ~344 chars
+        assert len(signature) > 50  # Ed25519 sig in Base64 is 88 chars (RSA-2048: ~344)
 
     def test_sign_different_payloads(self):
         """Different payloads should produce different signatures."""
@@ -29,7 +36,7 @@ class TestSignPayload:
         payload = {"action": "purchase", "id": 123}
         sig1 = sign_payload(payload)
         sig2 = sign_payload(payload)
-        # With PSS padding, signatures may differ, but both should be valid
+        # With legacy PSS padding, signatures may differ, but both should be valid
         assert isinstance(sig1, str)
         assert isinstance(sig2, str)
 
@@ -72,3 +79,50 @@ class TestHashContent:
         hash1 = hash_content({"a": 1, "b": 2})
         hash2 = hash_content({"b": 2, "a": 1})
         assert hash1 == hash2  # sort_keys=True ensures this
+
+
+class TestEd25519Signer:
+    """Tests for the Ed25519 notary key."""
+
+    @pytest.fixture
+    def key(self, monkeypatch):
+        key = Ed25519PrivateKey.generate()
+        monkeypatch.setattr(crypto_signer, "_signer_key", key)
+        return key
+
+    def test_signature_verifies_over_canonical_bytes(self, key):
+        payload = {"b": 2, "a": {"z": 1, "y": [1, 2]}}
+        signature = base64.b64decode(sign_payload(payload))
+        assert len(signature) == 64
+        key.public_key().verify(signature, b'{"a":{"y":[1,2],"z":1},"b":2}')
+
+    def test_signature_is_deterministic(self, key):
+        assert sign_payload({"a": 1, "b": 2}) == sign_payload({"b": 2, "a": 1})
+
+    def test_canonical_json_is_compact_and_sorted(self):
+        assert canonical_json({"b": 1, "a": "x"}) == b'{"a":"x","b":1}'
+        assert canonical_json("plain text") == b'"plain text"'
+
+    def test_canonical_json_escapes_non_ascii(self):
+        """Same bytes as the historical json.dumps form: verifiers rebuilding it keep working."""
+        payload = {"país": "España", "n": 1}
+        assert canonical_json(payload) == b'{"n":1,"pa\\u00eds":"Espa\\u00f1a"}'
+        assert canonical_json(payload) == json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+
+    def test_legacy_rsa_signature_verifies_over_historical_form(self, monkeypatch):
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        monkeypatch.setattr(crypto_signer, "_signer_key", key)
+        payload = {"tenant": "España S.L.", "amount": 10}
+        legacy_bytes = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        key.public_key().verify(
+            base64.b64decode(sign_payload(payload)),
+            legacy_bytes,
+            padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH),
+            hashes.SHA256(),
+        )
+
+    def test_public_key_matches_signer(self):
+        public_key = serialization.load_pem_public_key(crypto_signer.get_public_key_pem().encode())
+        signer_public = crypto_signer._signer_key.public_key()
+        raw = serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo
+        assert public_key.public_bytes(*raw) == signer_public.public_bytes(*raw)
@@ -0,0 +1,65 @@
+"""
+Tests for Event Bus - SIEM event persistence.
+"""
+
+import pytest
+from pydantic import BaseModel
+
+import app.services.event_bus as event_bus_module
+from app.services.event_bus import EventBus
+
+
+class _Report(BaseModel):
+    description: str
+    severity: str
+
+
+class _Table:
+    def __init__(self, db):
+        self.db = db
+
+    def insert(self, row):
+        self.db.inserted.append(row)
+        return self
+
+    def execute(self):
+        return self
+
+
+class _FakeSupabase:
+    def __init__(self):
+        self.inserted = []
+
+    def table(self, name):
+        return _Table(self)
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    fake = _FakeSupabase()
+    monkeypatch.setattr(event_bus_module, "supabase", fake)
+    bus = EventBus()
+
+    async def _noop(*args):
+        pass
+
+    monkeypatch.setattr(bus, "_dispatch_notifications", _noop)
+    return bus, fake
+
+
+class TestPublish:
+    """Tests for event_bus.publish payload handling."""
+
+    @pytest.mark.asyncio
+    async def test_model_details_are_serialized_on_publish(self, bus):
+        bus, db = bus
+        report = _Report(description="Model leaked data", severity="CRITICAL")
+        await bus.publish("tenant-1", "SERIOUS_INCIDENT_REPORT", "INFO", report)
+        assert db.inserted[0]["details"] == {"description": "Model leaked data", "severity": "CRITICAL"}
+
+    @pytest.mark.asyncio
+    async def test_dict_details_pass_through(self, bus):
+        bus, db = bus
+        details = {"k": "v"}
+        await bus.publish("tenant-1", "POLICY_CHANGED", "INFO", details)
+        assert db.inserted[0]["details"] is details
@@ -0,0 +1,84 @@
+"""
+Tests for Identity - JWT verification and rank resolution.
+"""
+
+import json
+import time
+from typing import Annotated
+
+import pytest
+from fastapi import Depends
+from jose import jwt
+
+import app.services.identity as identity
+
+Verified = Annotated[identity.VerifiedIdentity, Depends(identity.verify_identity_envelope)]
+
+
+async def _rank(verified: Verified) -> int:
+    return verified.role_rank
+
+
+RoleRank = Annotated[int, Depends(_rank)]
+
+
+class _FakeRedis:
+    def __init__(self, profile):
+        self.profile = profile
+        self.gets = 0
+
+    async def get(self, key):
+        self.gets += 1
+        return json.dumps(self.profile)
+
+    async def setex(self, key, ttl, value):
+        pass
+
+
+def _bearer(exp):
+    claims = {"sub": "user-1", "exp": exp}
+    return "Bearer " + jwt.encode(claims, identity.SECRET_KEY, algorithm=identity.ALGORITHM)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = _FakeRedis({"email": "a@acme.test", "tenant_id": "tenant-1", "role": "admin"})
+    monkeypatch.setattr(identity, "redis_client", fake)
+    return fake
+
+
+class TestVerifyIdentityEnvelope:
+    """Tests for JWT verification and profile resolution."""
+
+    @pytest.mark.asyncio
+    async def test_resolves_profile_and_rank(self, redis):
+        verified = await identity.verify_identity_envelope(_bearer(int(time.time()) + 3600))
+        assert (verified.tenant_id, verified.role) == ("tenant-1", "admin")
+        assert verified.role_rank == identity.Rank.ADMIN
+
+    @pytest.mark.asyncio
+    async def test_role_change_is_seen_by_the_next_request(self, redis):
+        token = _bearer(int(time.time()) + 3600)
+        first = await identity.verify_identity_envelope(token)
+        redis.profile = {**redis.profile, "role": "member"}
+        second = await identity.verify_identity_envelope(token)
+        assert first is not second  # sin memo global: ninguna identidad se comparte entre requests
+        assert second.role_rank == identity.Rank.MEMBER
+
+
+class TestDependencyCache:
+    """Tests for per-request reuse through FastAPI's dependency cache."""
+
+    def test_identity_is_verified_once_per_request(self, redis):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        app = FastAPI()
+
+        @app.get("/probe")
+        async def _probe(rank: RoleRank, verified: Verified):
+            return {"rank": rank, "tenant": verified.tenant_id}
+
+        res = TestClient(app).get("/probe", headers={"Authorization": _bearer(int(time.time()) + 3600)})
+        assert res.json() == {"rank": int(identity.Rank.ADMIN), "tenant": "tenant-1"}
+        assert redis.gets == 1
@@ -0,0 +1,72 @@
+"""
+Tests for API Models - /v1/authorize request & response contracts.
+"""
+
+import pytest
+from pydantic import ValidationError
+
+from app.models import AIUseCase, AuthorizeRequest, AuthorizeResponse
+
+
+def _base_payload(**overrides):
+    payload = {"actor_id": "agent-1", "cost_center_id": "cc-1", "max_amount": 1.5}
+    payload.update(overrides)
+    return payload
+
+
+class TestAuthorizeRequest:
+    """Tests for AuthorizeRequest validation."""
+
+    def test_unknown_fields_are_ignored(self):
+        """Extra keys sent by old SDKs should be dropped silently."""
+        req = AuthorizeRequest(**_base_payload(legacy_flag=True))
+        assert not hasattr(req, "legacy_flag")
+
+    def test_request_is_immutable(self):
+        """Fields cannot be reassigned once validated."""
+        req = AuthorizeRequest(**_base_payload())
+        with pytest.raises(ValidationError):
+            req.model = "gpt-4"
+
+    def test_model_copy_applies_overrides(self):
+        """Overrides (Model Swapping) go through model_copy."""
+        req = AuthorizeRequest(**_base_payload(model="gpt-4"))
+        swapped = req.model_copy(update={"model": "gpt-4o-mini"})
+        assert swapped.model == "gpt-4o-mini"
+        assert req.model == "gpt-4"
+
+    def test_metadata_defaults_to_none(self):
+        """No per-request dict is allocated when metadata is omitted."""
+        req = AuthorizeRequest(**_base_payload())
+        assert req.metadata is None
+
+    def test_metadata_accepts_numeric_values(self):
+        """Estimator hints like num_images are sent as numbers."""
+        req = AuthorizeRequest(**_base_payload(metadata={"num_images": 2, "task_type": "IMG"}))
+        assert req.metadata["num_images"] == 2
+
+    def test_use_case_is_plain_string(self):
+        """use_case is validated as a Literal and stays a str (lazy Enum conversion)."""
+        req = AuthorizeRequest(**_base_payload(use_case="hr_recruitment"))
+        assert req.use_case == "hr_recruitment"
+        assert AIUseCase(req.use_case) is AIUseCase.HR_RECRUITMENT
+
+    def test_use_case_rejects_unknown_values(self):
+        """Only EU AI Act Annex III categories are accepted."""
+        with pytest.raises(ValidationError):
+            AuthorizeRequest(**_base_payload(use_case="social_scoring"))
+
+    def test_max_amount_must_be_positive(self):
+        """max_amount has a gt=0 constraint."""
+        with pytest.raises(ValidationError):
+            AuthorizeRequest(**_base_payload(max_amount=0))
+
+
+class TestAuthorizeResponse:
+    """Tests for AuthorizeResponse defaults."""
+
+    def test_defaults(self):
+        """Execution mode defaults to ACTIVE."""
+        res = AuthorizeResponse(decision="APPROVED", authorization_id="auth-1")
+        assert res.execution_mode == "ACTIVE"
+        assert res.aut_token is None
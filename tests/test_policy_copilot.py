@@ -0,0 +1,156 @@
+"""
+Tests for Policy Copilot - in-flight request coalescing & draft cache.
+"""
+
+import asyncio
+
+import pytest
+
+import app.services.policy_copilot as policy_copilot
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    calls = []
+    release = asyncio.Event()
+
+    async def _generate(tenant_id, user_prompt):
+        calls.append((tenant_id, user_prompt))
+        await release.wait()
+        return {"tool_name": "stripe_payment", "action": "BLOCK"}
+
+    monkeypatch.setattr(policy_copilot, "generate_policy_json", _generate)
+    monkeypatch.setattr(policy_copilot, "_inflight", {})
+    return calls, release
+
+
+class TestCoalescedGenerate:
+    """Tests for the singleflight wrapper around generate_policy_json."""
+
+    @pytest.mark.asyncio
+    async def test_duplicate_prompts_share_one_call(self, llm):
+        calls, release = llm
+        tasks = [
+            asyncio.create_task(policy_copilot.coalesced_generate("tenant-1", prompt))
+            for prompt in ("Block Stripe for interns", "  block stripe   FOR interns ")
+        ]
+        await asyncio.sleep(0)
+        release.set()
+
+        results = await asyncio.gather(*tasks)
+        assert len(calls) == 1
+        assert results[0] == results[1]
+        assert policy_copilot._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_tenants_are_isolated(self, llm):
+        calls, release = llm
+        release.set()
+        await asyncio.gather(
+            policy_copilot.coalesced_generate("tenant-1", "Block Stripe"),
+            policy_copilot.coalesced_generate("tenant-2", "Block Stripe"),
+        )
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_followers(self, llm):
+        calls, release = llm
+        leader = asyncio.create_task(policy_copilot.coalesced_generate("tenant-1", "Block Stripe"))
+        follower = asyncio.create_task(policy_copilot.coalesced_generate("tenant-1", "Block Stripe"))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        release.set()
+        assert (await follower)["action"] == "BLOCK"
+        assert len(calls) == 1
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    async def mget(self, *keys):
+        return [self.store.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    async def incr(self, key):
+        self.store[key] = str(int(self.store.get(key) or 0) + 1)
+        return int(self.store[key])
+
+
+class TestCachedGenerate:
+    """Tests for the Redis-backed draft cache."""
+
+    @pytest.fixture
+    def redis(self, monkeypatch):
+        fake = _FakeRedis()
+        monkeypatch.setattr(policy_copilot, "redis_client", fake)
+        return fake
+
+    @pytest.mark.asyncio
+    async def test_miss_then_hit(self, llm, redis):
+        calls, release = llm
+        release.set()
+
+        draft, hit = await policy_copilot.cached_generate("tenant-1", "Block Stripe")
+        assert not hit
+        cached, hit = await policy_copilot.cached_generate("tenant-1", "block  stripe")
+        assert hit
+        assert cached == draft
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_errors_are_not_cached(self, monkeypatch, redis):
+        async def _failing(tenant_id, user_prompt):
+            return {"error": "Failed to generate policy"}
+
+        monkeypatch.setattr(policy_copilot, "generate_policy_json", _failing)
+        monkeypatch.setattr(policy_copilot, "_inflight", {})
+        _, hit = await policy_copilot.cached_generate("tenant-1", "Block Stripe")
+        assert not hit
+        assert redis.store == {}
+
+    @pytest.mark.asyncio
+    async def test_invalid_drafts_are_not_cached(self, llm, redis):
+        calls, release = llm
+        release.set()
+
+        def _reject(draft):
+            raise ValueError("action must be ALLOW | BLOCK | REQUIRE_APPROVAL")
+
+        with pytest.raises(ValueError):
+            await policy_copilot.cached_generate("tenant-1", "Block Stripe", validate=_reject)
+        assert redis.store == {}
+
+        _, hit = await policy_copilot.cached_generate("tenant-1", "Block Stripe")
+        assert not hit
+        assert len(calls) == 2  # el prompt vuelve al LLM en lugar de servir un 422 cacheado
+
+    @pytest.mark.asyncio
+    async def test_validated_draft_is_what_gets_cached(self, llm, redis):
+        _, release = llm
+        release.set()
+
+        draft, _ = await policy_copilot.cached_generate(
+            "tenant-1", "Block Stripe", validate=lambda d: {**d, "argument_rules": {}}
+        )
+        cached, hit = await policy_copilot.cached_generate("tenant-1", "Block Stripe")
+        assert hit
+        assert cached == draft == {"tool_name": "stripe_payment", "action": "BLOCK", "argument_rules": {}}
+
+    @pytest.mark.asyncio
+    async def test_catalog_change_invalidates_drafts(self, llm, redis, monkeypatch):
+        import app.services.catalog_cache as catalog_cache
+
+        calls, release = llm
+        release.set()
+        monkeypatch.setattr(catalog_cache, "redis_client", redis)
+        redis.publish = lambda *args: asyncio.sleep(0)
+
+        await policy_copilot.cached_generate("tenant-1", "Block Stripe")
+        await catalog_cache.invalidate_catalog("tenant-1")
+        _, hit = await policy_copilot.cached_generate("tenant-1", "Block Stripe")
+        assert not hit
+        assert len(calls) == 2
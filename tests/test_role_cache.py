@@ -0,0 +1,65 @@
+"""
+Tests for Role Cache - L1 role_definitions lookups.
+"""
+
+import asyncio
+
+import pytest
+
+import app.services.role_cache as role_cache
+from tests.conftest import FakeResult
+
+
+@pytest.fixture
+def db(monkeypatch, fake_db):
+    fake_db.results["role_definitions"] = FakeResult([{"id": 7, "function": "Dev"}])
+    monkeypatch.setattr(role_cache, "get_async_supabase", fake_db.get_async_supabase)
+    monkeypatch.setattr(role_cache, "_cache", role_cache.TTLCache(maxsize=100, ttl=60))
+    return fake_db
+
+
+class TestGetRoleDef:
+    """Tests for cached role lookups."""
+
+    @pytest.mark.asyncio
+    async def test_hit_skips_database(self, db):
+        assert await role_cache.get_role_def("tenant-1", 7) == {"id": 7, "function": "Dev"}
+        assert await role_cache.get_role_def("tenant-1", 7) == {"id": 7, "function": "Dev"}
+        assert db.executed == ["role_definitions"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_fetch_once(self, db):
+        await asyncio.gather(*(role_cache.get_role_def("tenant-1", 7) for _ in range(5)))
+        assert db.executed == ["role_definitions"]
+
+    @pytest.mark.asyncio
+    async def test_missing_role_is_not_cached(self, db):
+        db.results["role_definitions"] = FakeResult([])
+        assert await role_cache.get_role_def("tenant-1", 7) is None
+        db.results["role_definitions"] = FakeResult([{"id": 7}])
+        assert await role_cache.get_role_def("tenant-1", 7) == {"id": 7}
+
+    @pytest.mark.asyncio
+    async def test_lookup_is_tenant_scoped(self, db):
+        await role_cache.get_role_def("tenant-1", 7)
+        assert db.calls_to("role_definitions") == [("id", 7), ("tenant_id", "tenant-1")]
+
+
+class TestInvalidation:
+    """Tests for local invalidation."""
+
+    @pytest.mark.asyncio
+    async def test_single_role(self, db):
+        await role_cache.get_role_def("tenant-1", 7)
+        await role_cache.get_role_def("tenant-1", 8)
+        role_cache.invalidate_local("tenant-1", 7)
+        assert ("tenant-1", 7) not in role_cache._cache
+        assert ("tenant-1", 8) in role_cache._cache
+
+    @pytest.mark.asyncio
+    async def test_whole_tenant(self, db):
+        await role_cache.get_role_def("tenant-1", 7)
+        await role_cache.get_role_def("tenant-2", 7)
+        role_cache.invalidate_local("tenant-1")
+        assert ("tenant-1", 7) not in role_cache._cache
+        assert ("tenant-2", 7) in role_cache._cache
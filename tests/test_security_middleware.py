@@ -0,0 +1,107 @@
+"""
+Tests for Security Middleware - raw ASGI header injection & global rate limit.
+"""
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import app.middleware.security as security
+from app.middleware.security import RateLimitMiddleware, SecurityMiddleware, is_fast_path
+
+
+async def _ok(request):
+    return PlainTextResponse("ok")
+
+
+def _build_app(middleware_cls):
+    inner = Starlette(
+        routes=[
+            Route("/ping", _ok, methods=["GET", "OPTIONS"]),
+            Route("/health", _ok, methods=["GET"]),
+        ]
+    )
+    return middleware_cls(inner)
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.counts = {}
+
+    async def incr(self, key):
+        self.counts[key] = self.counts.get(key, 0) + 1
+        return self.counts[key]
+
+    async def expire(self, key, ttl):
+        return True
+
+
+class TestFastPath:
+    """Tests for the scope-level OPTIONS / health short-circuit."""
+
+    def test_options_is_fast_path(self):
+        assert is_fast_path({"method": "OPTIONS", "path": "/v1/authorize"})
+
+    def test_health_is_fast_path(self):
+        assert is_fast_path({"method": "GET", "path": "/health"})
+
+    def test_regular_request_is_not_fast_path(self):
+        assert not is_fast_path({"method": "POST", "path": "/v1/authorize"})
+
+
+class TestSecurityMiddleware:
+    """Tests for header injection."""
+
+    def test_security_headers_injected(self):
+        """Every HTTP response carries the hardening headers."""
+        client = TestClient(_build_app(SecurityMiddleware))
+        res = client.get("/ping")
+        assert res.status_code == 200
+        assert res.headers["X-Frame-Options"] == "DENY"
+        assert res.headers["X-Content-Type-Options"] == "nosniff"
+        assert "max-age" in res.headers["Strict-Transport-Security"]
+        assert float(res.headers["X-Process-Time"]) >= 0
+
+    def test_health_skips_timing_but_keeps_headers(self):
+        """Health probes skip timing, yet still carry the hardening headers."""
+        client = TestClient(_build_app(SecurityMiddleware))
+        res = client.get("/health")
+        assert res.status_code == 200
+        assert "X-Process-Time" not in res.headers
+        assert res.headers["X-Frame-Options"] == "DENY"
+
+    def test_preflight_keeps_headers(self):
+        """OPTIONS responses are hardened too (HSTS, nosniff)."""
+        client = TestClient(_build_app(SecurityMiddleware))
+        res = client.options("/ping")
+        assert res.headers["X-Content-Type-Options"] == "nosniff"
+        assert "max-age" in res.headers["Strict-Transport-Security"]
+
+    def test_body_is_untouched(self):
+        """The response body is streamed through unchanged."""
+        client = TestClient(_build_app(SecurityMiddleware))
+        assert client.get("/ping").text == "ok"
+
+
+class TestRateLimitMiddleware:
+    """Tests for the global per-IP limiter."""
+
+    def test_blocks_after_limit(self, monkeypatch):
+        """Request 101 within the window gets a 429."""
+        monkeypatch.setattr(security, "redis_client", _FakeRedis())
+        client = TestClient(_build_app(RateLimitMiddleware))
+        for _ in range(100):
+            assert client.get("/ping").status_code == 200
+        res = client.get("/ping")
+        assert res.status_code == 429
+        assert res.json()["detail"] == "Too Many Requests (Global Shield)"
+
+    def test_options_not_counted(self, monkeypatch):
+        """Preflight requests never touch Redis."""
+        fake = _FakeRedis()
+        monkeypatch.setattr(security, "redis_client", fake)
+        client = TestClient(_build_app(RateLimitMiddleware))
+        client.options("/ping")
+        assert fake.counts == {}
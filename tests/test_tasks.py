@@ -0,0 +1,104 @@
+"""
+Tests for fire-and-forget task helper.
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils import tasks
+
+
+class TestFire:
+    """Tests for detached background tasks."""
+
+    @pytest.mark.asyncio
+    async def test_task_is_tracked_until_done(self):
+        release = asyncio.Event()
+
+        async def _work():
+            await release.wait()
+            return "ok"
+
+        task = tasks.fire(_work())
+        assert task in tasks._bg_tasks
+
+        release.set()
+        assert await task == "ok"
+        await asyncio.sleep(0)
+        assert task not in tasks._bg_tasks
+
+    @pytest.mark.asyncio
+    async def test_failure_is_logged_not_raised(self, caplog):
+        async def _boom():
+            raise RuntimeError("audit down")
+
+        task = tasks.fire(_boom())
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0)
+
+        assert task not in tasks._bg_tasks
+        assert "audit down" in caplog.text
+
+
+class TestGatherBackgroundTasks:
+    """Tests for concurrent post-response tasks."""
+
+    @pytest.mark.asyncio
+    async def test_tasks_run_concurrently(self):
+        started = []
+        release = asyncio.Event()
+        both_started = asyncio.Event()
+
+        async def _publish(name):
+            started.append(name)
+            if len(started) == 2:
+                both_started.set()
+            await release.wait()
+
+        group = tasks.GatherBackgroundTasks()
+        group.add_task(_publish, "siem")
+        group.add_task(_publish, "email")
+
+        run = asyncio.create_task(group())
+        # En serie, "email" no arrancaría hasta que "siem" termine
+        await asyncio.wait_for(both_started.wait(), timeout=1)
+        assert started == ["siem", "email"]
+
+        release.set()
+        await run
+
+    @pytest.mark.asyncio
+    async def test_failure_does_not_cancel_siblings(self, caplog):
+        done = []
+
+        async def _boom():
+            raise RuntimeError("siem down")
+
+        def _sync_webhook(value):
+            done.append(value)
+
+        group = tasks.GatherBackgroundTasks()
+        group.add_task(_boom)
+        group.add_task(_sync_webhook, "sent")
+        await group()
+
+        assert done == ["sent"]
+        assert "siem down" in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_runs_as_a_single_starlette_background_task(self):
+        from starlette.background import BackgroundTasks
+
+        calls = []
+
+        async def _publish():
+            calls.append("siem")
+
+        group = tasks.GatherBackgroundTasks()
+        group.add_task(_publish)
+        background = BackgroundTasks()
+        background.add_task(group)
+        await background()
+
+        assert calls == ["siem"]